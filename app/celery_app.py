@@ -22,6 +22,8 @@ celery.conf.update(
     task_time_limit=3600,  # 1 hour max per task
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # XML completions get their own queue so ingestion scales separately
+    task_routes={'process_xml_file': {'queue': Config.XML_CELERY_QUEUE}},
 )
 
 # Import tasks to register them
@@ -38,6 +38,13 @@ class Config:
     RIGHTFAX_SSL_VERIFY = os.getenv('RIGHTFAX_SSL_VERIFY', 'true').lower() in ['true', '1', 'yes']
     RIGHTFAX_FCL_DIRECTORY = os.getenv('RIGHTFAX_FCL_DIRECTORY', '/mnt/rightfax/fcl')
     RIGHTFAX_XML_DIRECTORY = os.getenv('RIGHTFAX_XML_DIRECTORY', '/mnt/rightfax/xml')
+    # Shared API client: keep-alive pool per worker process and retry backoff
+    RIGHTFAX_API_POOL_SIZE = int(os.getenv('RIGHTFAX_API_POOL_SIZE', '10'))
+    RIGHTFAX_API_MAX_RETRIES = int(os.getenv('RIGHTFAX_API_MAX_RETRIES', '3'))
+    RIGHTFAX_API_BACKOFF_SECONDS = float(os.getenv('RIGHTFAX_API_BACKOFF_SECONDS', '0.5'))
+    RIGHTFAX_API_BACKOFF_MAX_SECONDS = float(os.getenv('RIGHTFAX_API_BACKOFF_MAX_SECONDS', '30'))
+    # API attachments larger than this are base64-streamed from disk per request
+    RIGHTFAX_STREAM_THRESHOLD_BYTES = int(os.getenv('RIGHTFAX_STREAM_THRESHOLD_BYTES', str(8 * 1024 * 1024)))
 
     # Application Directories
     BASE_DIR = Path(__file__).parent.parent
@@ -54,11 +61,92 @@ class Config:
 
     # XML Processing
     XML_RETENTION_DAYS = int(os.getenv('XML_RETENTION_DAYS', '90'))
+    XML_ARCHIVE_MODE = os.getenv('XML_ARCHIVE_MODE', 'segments')  # 'segments' or 'files'
+    XML_ARCHIVE_SEGMENT = os.getenv('XML_ARCHIVE_SEGMENT', 'day')  # 'day' or 'hour'
+    XML_INGEST_MODE = os.getenv('XML_INGEST_MODE', 'batch')  # 'batch' or 'single'
+    XML_INGEST_BATCH_SIZE = int(os.getenv('XML_INGEST_BATCH_SIZE', '200'))
+    XML_INGEST_BATCH_WAIT = float(os.getenv('XML_INGEST_BATCH_WAIT', '0.5'))
+    XML_RAW_RETENTION = os.getenv('XML_RAW_RETENTION', 'all')  # 'all', 'failed' or 'none'
+    # A job ID already stored within this many days of a new completion time
+    # is a duplicate (the partitioned unique key also includes completed_at)
+    XML_DEDUPE_WINDOW_DAYS = int(os.getenv('XML_DEDUPE_WINDOW_DAYS', '7'))
+
+    # XML watcher worker pool: parse/ingest workers behind the observer
+    XML_WORKERS = int(os.getenv('XML_WORKERS', '4'))
+    XML_WORKER_MODE = os.getenv('XML_WORKER_MODE', 'thread')  # 'thread', 'process' or 'celery'
+    XML_QUEUE_SIZE = int(os.getenv('XML_QUEUE_SIZE', '10000'))
+    XML_STATS_INTERVAL = int(os.getenv('XML_STATS_INTERVAL', '5'))
+
+    # Celery worker mode: queue the watcher hands files to, and seconds a
+    # file stays claimed by one worker (or marked as queued by the watcher)
+    XML_CELERY_QUEUE = os.getenv('XML_CELERY_QUEUE', 'xml')
+    XML_CLAIM_TTL = int(os.getenv('XML_CLAIM_TTL', '600'))
+
+    # XML file detection: 'events' (inotify) or 'poll' for SMB/CIFS mounts
+    XML_WATCH_MODE = os.getenv('XML_WATCH_MODE', 'events')
+    XML_POLL_INTERVAL = float(os.getenv('XML_POLL_INTERVAL', '1.0'))
+
+    # XML backlog reconciliation: rescan for files whose events were lost
+    XML_RECONCILE_INTERVAL = int(os.getenv('XML_RECONCILE_INTERVAL', '60'))
+    XML_RECONCILE_MIN_AGE = int(os.getenv('XML_RECONCILE_MIN_AGE', '30'))
+
+    # Time partitions of completions and submissions (PostgreSQL): partition
+    # length, partitions created ahead, and days of data kept (0 keeps everything)
+    PARTITION_INTERVAL = os.getenv('PARTITION_INTERVAL', 'day')  # 'day' or 'month'
+    PARTITION_PREMAKE = int(os.getenv('PARTITION_PREMAKE', '7'))
+    PARTITION_MAINTENANCE_INTERVAL = int(os.getenv('PARTITION_MAINTENANCE_INTERVAL', '3600'))
+    DB_RETENTION_DAYS = int(os.getenv('DB_RETENTION_DAYS', '0'))
+
+    # Completion rollups: days of minute and hour counters to keep (day counters are kept)
+    ROLLUP_MINUTE_RETENTION_DAYS = int(os.getenv('ROLLUP_MINUTE_RETENTION_DAYS', '14'))
+    ROLLUP_HOUR_RETENTION_DAYS = int(os.getenv('ROLLUP_HOUR_RETENTION_DAYS', '400'))
 
     # Batch Submission Limits
     MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '100000'))
     MAX_INTERVAL_SECONDS = int(os.getenv('MAX_INTERVAL_SECONDS', '300'))
 
+    # Fan-out execution: faxes per parallel sub-task
+    BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '1000'))
+
+    # Paced fan-out: chunks running the whole schedule side by side; keep at or
+    # below the worker slots free for batches so none of them waits in the queue
+    PACED_FANOUT_SLOTS = int(os.getenv('PACED_FANOUT_SLOTS', '4'))
+
+    # Seconds a submission task runs before re-enqueueing the rest of its range
+    # (must stay below the Celery task_time_limit of 3600; 0 disables it)
+    SUBMISSION_TASK_SECONDS = int(os.getenv('SUBMISSION_TASK_SECONDS', '3000'))
+
+    # Bulk submission writes: flush after this many rows or seconds
+    SUBMISSION_FLUSH_SIZE = int(os.getenv('SUBMISSION_FLUSH_SIZE', '500'))
+    SUBMISSION_FLUSH_INTERVAL = float(os.getenv('SUBMISSION_FLUSH_INTERVAL', '1.0'))
+
+    # FCL batch generation: files written per block and writer threads
+    FCL_WRITE_BLOCK_SIZE = int(os.getenv('FCL_WRITE_BLOCK_SIZE', '256'))
+    FCL_WRITER_THREADS = int(os.getenv('FCL_WRITER_THREADS', '8'))
+
+    # FCL correlation: billing field carrying each fax's token, echoed by RightFax into the XML
+    FCL_CORRELATION_FIELD = os.getenv('FCL_CORRELATION_FIELD', 'billinfo2')  # 'billinfo1' or 'billinfo2'
+
+    # Async API engine: upper bound for a batch's in-flight requests
+    API_MAX_CONCURRENCY = int(os.getenv('API_MAX_CONCURRENCY', '200'))
+
+    # RightFax simulator (python -m app.services.rightfax_simulator)
+    SIMULATOR_PORT = int(os.getenv('SIMULATOR_PORT', '8090'))
+    SIMULATOR_LATENCY_MS = os.getenv('SIMULATOR_LATENCY_MS', 'normal:50:15')
+    SIMULATOR_SEND_SECONDS = os.getenv('SIMULATOR_SEND_SECONDS', 'uniform:20:60')
+    SIMULATOR_HTTP_ERRORS = os.getenv('SIMULATOR_HTTP_ERRORS', '')  # e.g. 503:0.01,429:0.02
+    SIMULATOR_FAILURE_RATE = float(os.getenv('SIMULATOR_FAILURE_RATE', '0.05'))
+    SIMULATOR_CHANNELS = int(os.getenv('SIMULATOR_CHANNELS', '0'))  # 0 = unlimited
+    SIMULATOR_SERVER_NAME = os.getenv('SIMULATOR_SERVER_NAME', 'RFSIM')
+    SIMULATOR_FCL_POLL_SECONDS = float(os.getenv('SIMULATOR_FCL_POLL_SECONDS', '0.5'))
+    SIMULATOR_MAX_JOBS = int(os.getenv('SIMULATOR_MAX_JOBS', '100000'))
+
+    # Per-process statistics published to Redis expire after this many seconds
+    STATS_TTL_SECONDS = int(os.getenv('STATS_TTL_SECONDS', '3600'))
+
+    # /api/stats is computed at most once per this many seconds across all web workers (0 disables the cache)
+    API_STATS_CACHE_SECONDS = float(os.getenv('API_STATS_CACHE_SECONDS', '5'))
+
     @staticmethod
     def init_app(app):
         """Initialize application with configuration"""
@@ -1,6 +1,7 @@
 """
 Database configuration and session management
 """
+from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
@@ -23,6 +24,9 @@ SessionLocal = scoped_session(
 # Base class for models
 Base = declarative_base()
 
+# Canonical PostgreSQL schema, also run by the postgres container on first start
+SCHEMA_FILE = Path(__file__).resolve().parent.parent / 'database' / 'init.sql'
+
 
 def get_db():
     """
@@ -35,12 +39,38 @@ def get_db():
         db.close()
 
 
+def create_schema(bind):
+    """
+    Create all tables that do not exist yet
+
+    On PostgreSQL the schema comes from database/init.sql: the
+    time-partitioned tables (keys that include the partition key, DEFAULT
+    partitions) cannot be expressed by metadata.create_all, which would
+    build plain tables with other keys. Other databases, such as the
+    SQLite database of the benchmarks, get their tables from the models.
+
+    Args:
+        bind: SQLAlchemy engine
+    """
+    import app.models  # Import models to register them
+
+    if bind.dialect.name == 'postgresql':
+        connection = bind.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(SCHEMA_FILE.read_text())
+            connection.commit()
+        finally:
+            connection.close()
+
+    Base.metadata.create_all(bind=bind)
+
+
 def init_db():
     """
     Initialize database - create all tables
     """
-    import app.models  # Import models to register them
-    Base.metadata.create_all(bind=engine)
+    create_schema(engine)
 
 
 def reset_db():
@@ -49,4 +79,4 @@ def reset_db():
     """
     import app.models
     Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    create_schema(engine)
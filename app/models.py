@@ -1,12 +1,14 @@
 """
 SQLAlchemy Models for RightFax Testing Platform
 """
+import json
+import zlib
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, DateTime,
-    ForeignKey, CheckConstraint, Index
+    Column, Integer, String, Text, Boolean, DateTime, LargeBinary,
+    ForeignKey, CheckConstraint, UniqueConstraint, Index, text
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.database import Base
 
 
@@ -22,22 +24,30 @@ class SubmissionBatch(Base):
     submission_method = Column(String(10), nullable=False)
     timing_type = Column(String(20), nullable=False)
     interval_seconds = Column(Integer)
+    load_profile = Column(Text)  # JSON, see app.services.rate_scheduler.LoadProfile
+    execution_mode = Column(String(10), nullable=False, default='serial')
+    api_concurrency = Column(Integer)  # >1 selects the async API engine
     recipient_phone = Column(String(50), nullable=False)
     recipient_name = Column(String(255))
     account_name = Column(String(100), nullable=False)
     attachment_filename = Column(String(255))
     status = Column(String(20), nullable=False, default='pending')
     submitted_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    started_at = Column(DateTime)
     completed_at = Column(DateTime)
     notes = Column(Text)
 
     # Relationships
     submissions = relationship('FaxSubmission', back_populates='batch', cascade='all, delete-orphan')
+    checkpoints = relationship('BatchCheckpoint', back_populates='batch', cascade='all, delete-orphan',
+                               order_by='BatchCheckpoint.chunk_start')
 
     __table_args__ = (
         CheckConstraint("submission_method IN ('FCL', 'API')", name='check_submission_method'),
-        CheckConstraint("timing_type IN ('immediate', 'interval')", name='check_timing_type'),
-        CheckConstraint("status IN ('pending', 'in_progress', 'completed', 'cancelled', 'failed')", name='check_status'),
+        CheckConstraint("timing_type IN ('immediate', 'interval', 'profile')", name='check_timing_type'),
+        CheckConstraint("execution_mode IN ('serial', 'fanout')", name='check_execution_mode'),
+        CheckConstraint("status IN ('pending', 'in_progress', 'paused', 'completed', 'cancelled', 'failed')", name='check_status'),
         Index('idx_batches_status_time', 'status', 'created_at'),
     )
 
@@ -52,22 +62,68 @@ class SubmissionBatch(Base):
             'submission_method': self.submission_method,
             'timing_type': self.timing_type,
             'interval_seconds': self.interval_seconds,
+            'load_profile': json.loads(self.load_profile) if self.load_profile else None,
+            'execution_mode': self.execution_mode,
+            'api_concurrency': self.api_concurrency,
             'recipient_phone': self.recipient_phone,
             'recipient_name': self.recipient_name,
             'account_name': self.account_name,
             'attachment_filename': self.attachment_filename,
             'status': self.status,
             'submitted_count': self.submitted_count,
+            'failed_count': self.failed_count,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'notes': self.notes
         }
 
 
+class BatchCheckpoint(Base):
+    """Model for batch_checkpoints table (resume position of one batch chunk)"""
+    __tablename__ = 'batch_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(Integer, ForeignKey('submission_batches.id', ondelete='CASCADE'), nullable=False)
+    chunk_start = Column(Integer, nullable=False)
+    chunk_stop = Column(Integer, nullable=False)
+    chunk_step = Column(Integer, nullable=False, default=1)
+    next_index = Column(Integer, nullable=False)  # first index not yet confirmed in the database
+    status = Column(String(20), nullable=False, default='pending')
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    batch = relationship('SubmissionBatch', back_populates='checkpoints')
+
+    __table_args__ = (
+        CheckConstraint("status IN ('pending', 'in_progress', 'completed', 'failed')", name='check_checkpoint_status'),
+        Index('idx_checkpoints_batch', 'batch_id'),
+    )
+
+    @property
+    def remaining(self):
+        """Number of faxes in this chunk not yet confirmed"""
+        return len(range(self.next_index, self.chunk_stop, self.chunk_step))
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'batch_id': self.batch_id,
+            'chunk_start': self.chunk_start,
+            'chunk_stop': self.chunk_stop,
+            'chunk_step': self.chunk_step,
+            'next_index': self.next_index,
+            'remaining': self.remaining,
+            'status': self.status,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
 class FaxSubmission(Base):
     """Model for fax_submissions table"""
     __tablename__ = 'fax_submissions'
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True)  # (id, submitted_at) in the partitioned schema of init.sql
     batch_id = Column(Integer, ForeignKey('submission_batches.id', ondelete='CASCADE'))
     submitted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     submission_method = Column(String(10), nullable=False)
@@ -76,13 +132,15 @@ class FaxSubmission(Base):
     recipient_name = Column(String(255))
     account_name = Column(String(100), nullable=False)
     fcl_filename = Column(String(255))
+    correlation_token = Column(String(50))  # FCL only; echoed by RightFax into the completion XML
     api_response_code = Column(Integer)
     submission_status = Column(String(20), nullable=False, default='submitted')
     error_message = Column(Text)
 
     # Relationships
     batch = relationship('SubmissionBatch', back_populates='submissions')
-    completion = relationship('FaxCompletion', back_populates='submission', uselist=False)
+    completion = relationship('FaxCompletion', back_populates='submission', uselist=False,
+                              primaryjoin='FaxSubmission.id == foreign(FaxCompletion.submission_id)')
 
     __table_args__ = (
         CheckConstraint("submission_method IN ('FCL', 'API')", name='check_fax_submission_method'),
@@ -91,6 +149,9 @@ class FaxSubmission(Base):
         Index('idx_submissions_job_id', 'rightfax_job_id'),
         Index('idx_submissions_timestamp', 'submitted_at'),
         Index('idx_submissions_job_lookup', 'rightfax_job_id', 'batch_id'),
+        Index('idx_submissions_correlation', 'correlation_token'),
+        Index('idx_submissions_unlinked', 'id',
+              postgresql_where=text('rightfax_job_id IS NULL AND correlation_token IS NOT NULL')),
     )
 
     def to_dict(self):
@@ -105,6 +166,7 @@ class FaxSubmission(Base):
             'recipient_name': self.recipient_name,
             'account_name': self.account_name,
             'fcl_filename': self.fcl_filename,
+            'correlation_token': self.correlation_token,
             'api_response_code': self.api_response_code,
             'submission_status': self.submission_status,
             'error_message': self.error_message
@@ -115,9 +177,9 @@ class FaxCompletion(Base):
     """Model for fax_completions table"""
     __tablename__ = 'fax_completions'
 
-    id = Column(Integer, primary_key=True)
-    rightfax_job_id = Column(String(100), unique=True, nullable=False)
-    submission_id = Column(Integer, ForeignKey('fax_submissions.id'))
+    id = Column(Integer, primary_key=True)  # (id, completed_at) in the partitioned schema of init.sql
+    rightfax_job_id = Column(String(100), nullable=False)
+    submission_id = Column(Integer)  # fax_submissions.id, not enforced across partitions
     submitted_at = Column(DateTime)
     completed_at = Column(DateTime, nullable=False)
     duration_seconds = Column(Integer)
@@ -130,7 +192,8 @@ class FaxCompletion(Base):
     call_attempts = Column(Integer)
     xml_filename = Column(String(255))
     xml_parsed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    raw_xml = Column(Text)
+    correlation_token = Column(String(50))  # from the XML billing field of FCL submissions
+    raw_xml = deferred(Column(Text))  # rows stored before fax_completion_xml existed
 
     # Additional fields from XML
     fax_handle = Column(String(50))
@@ -145,15 +208,26 @@ class FaxCompletion(Base):
     bad_page_count = Column(Integer)
 
     # Relationships
-    submission = relationship('FaxSubmission', back_populates='completion')
+    submission = relationship('FaxSubmission', back_populates='completion',
+                              primaryjoin='FaxSubmission.id == foreign(FaxCompletion.submission_id)')
+    xml = relationship('FaxCompletionXML', uselist=False, back_populates='completion',
+                       primaryjoin='FaxCompletion.rightfax_job_id == foreign(FaxCompletionXML.rightfax_job_id)',
+                       cascade='all, delete-orphan')
+    stages = relationship('FaxJobStage', back_populates='completion', order_by='FaxJobStage.sequence',
+                          primaryjoin='FaxCompletion.rightfax_job_id == foreign(FaxJobStage.rightfax_job_id)',
+                          cascade='all, delete-orphan')
 
     __table_args__ = (
+        # A re-read XML file repeats its completion time, so duplicates conflict
+        UniqueConstraint('rightfax_job_id', 'completed_at', name='fax_completions_rightfax_job_id_completed_at_key'),
         Index('idx_completions_job_id', 'rightfax_job_id'),
         Index('idx_completions_completed_at', 'completed_at'),
         Index('idx_completions_success', 'success'),
         Index('idx_completions_account', 'account_name'),
         Index('idx_completions_time_range', 'completed_at', 'success'),
         Index('idx_completions_account_time', 'account_name', 'completed_at'),
+        Index('idx_completions_unlinked', 'correlation_token',
+              postgresql_where=text('submission_id IS NULL AND correlation_token IS NOT NULL')),
     )
 
     def to_dict(self):
@@ -173,6 +247,7 @@ class FaxCompletion(Base):
             'account_name': self.account_name,
             'call_attempts': self.call_attempts,
             'xml_filename': self.xml_filename,
+            'correlation_token': self.correlation_token,
             'fax_handle': self.fax_handle,
             'fax_channel': self.fax_channel,
             'job_type': self.job_type,
@@ -183,6 +258,145 @@ class FaxCompletion(Base):
         }
 
 
+class FaxCompletionXML(Base):
+    """Model for fax_completion_xml table (compressed raw XML, loaded only on demand)"""
+    __tablename__ = 'fax_completion_xml'
+
+    rightfax_job_id = Column(String(100), primary_key=True)  # fax_completions.rightfax_job_id
+    completed_at = Column(DateTime, primary_key=True)  # partition key, copied from fax_completions
+    compressed_xml = Column(LargeBinary, nullable=False)  # zlib-compressed file bytes
+    stored_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    completion = relationship('FaxCompletion', back_populates='xml',
+                              primaryjoin='FaxCompletion.rightfax_job_id == foreign(FaxCompletionXML.rightfax_job_id)')
+
+    @staticmethod
+    def compress(content):
+        """Compress raw XML file bytes for storage"""
+        return zlib.compress(content)
+
+    @property
+    def raw_xml(self):
+        """Decompressed XML text"""
+        return zlib.decompress(self.compressed_xml).decode('ISO-8859-1')
+
+
+class FaxJobStage(Base):
+    """Model for fax_job_stages table (per-stage timings from the job's History TXT)"""
+    __tablename__ = 'fax_job_stages'
+
+    id = Column(Integer, primary_key=True)  # (id, completed_at) in the partitioned schema of init.sql
+    rightfax_job_id = Column(String(100), nullable=False)  # fax_completions.rightfax_job_id
+    completed_at = Column(DateTime, nullable=False)  # partition key, copied from fax_completions
+    sequence = Column(Integer, nullable=False)
+    event_type = Column(String(50), nullable=False)  # Origin, Conversion, Transmission
+    event_time = Column(DateTime)
+    stage = Column(String(100), nullable=False)  # e.g. 'G3 to TIFF', 'INSO', 'Transmission'
+    attempt = Column(Integer)
+    result = Column(String(255))
+    success = Column(Boolean)
+    output_type = Column(String(100))
+    duration_ms = Column(Integer)
+    server_name = Column(String(100))  # work server for conversions, fax server for transmissions
+    channel = Column(Integer)
+    status_code = Column(String(50))
+
+    # Relationships
+    completion = relationship('FaxCompletion', back_populates='stages',
+                              primaryjoin='FaxCompletion.rightfax_job_id == foreign(FaxJobStage.rightfax_job_id)')
+
+    __table_args__ = (
+        Index('idx_job_stages_job_id', 'rightfax_job_id'),
+        Index('idx_job_stages_event_time', 'event_time'),
+        Index('idx_job_stages_stage_server', 'stage', 'server_name'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'sequence': self.sequence,
+            'event_type': self.event_type,
+            'event_time': self.event_time.isoformat() if self.event_time else None,
+            'stage': self.stage,
+            'attempt': self.attempt,
+            'result': self.result,
+            'success': self.success,
+            'output_type': self.output_type,
+            'duration_ms': self.duration_ms,
+            'server_name': self.server_name,
+            'channel': self.channel,
+            'status_code': self.status_code
+        }
+
+
+class CompletionRollupColumns:
+    """
+    Columns shared by the completion rollup tables
+
+    One row per time bucket, account, fax server and channel, kept up to
+    date at ingest (see app.services.rollups). Missing keys are stored as
+    '' so they take part in the primary key. Duration columns and the
+    duration histogram (non-cumulative bucket counts, in seconds) cover
+    successful completions only, like the call duration panels.
+    """
+    bucket_start = Column(DateTime, primary_key=True)
+    account_name = Column(String(100), primary_key=True, default='')
+    fax_server = Column(String(100), primary_key=True, default='')
+    fax_channel = Column(String(10), primary_key=True, default='')
+
+    completions = Column(Integer, nullable=False, default=0)
+    successes = Column(Integer, nullable=False, default=0)
+    duration_count = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Integer, nullable=False, default=0)
+    duration_min = Column(Integer)
+    duration_max = Column(Integer)
+    duration_le_30 = Column(Integer, nullable=False, default=0)
+    duration_le_60 = Column(Integer, nullable=False, default=0)
+    duration_le_120 = Column(Integer, nullable=False, default=0)
+    duration_le_300 = Column(Integer, nullable=False, default=0)
+    duration_gt_300 = Column(Integer, nullable=False, default=0)
+    pages_transmitted = Column(Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'account_name': self.account_name,
+            'fax_server': self.fax_server,
+            'fax_channel': self.fax_channel,
+            'completions': self.completions,
+            'successes': self.successes,
+            'duration_count': self.duration_count,
+            'duration_sum': self.duration_sum,
+            'duration_min': self.duration_min,
+            'duration_max': self.duration_max,
+            'duration_histogram': {
+                'le_30': self.duration_le_30,
+                'le_60': self.duration_le_60,
+                'le_120': self.duration_le_120,
+                'le_300': self.duration_le_300,
+                'gt_300': self.duration_gt_300
+            },
+            'pages_transmitted': self.pages_transmitted
+        }
+
+
+class CompletionRollupMinute(CompletionRollupColumns, Base):
+    """Model for fax_completion_rollup_minute table (per-minute completion counters)"""
+    __tablename__ = 'fax_completion_rollup_minute'
+
+
+class CompletionRollupHour(CompletionRollupColumns, Base):
+    """Model for fax_completion_rollup_hour table (per-hour completion counters)"""
+    __tablename__ = 'fax_completion_rollup_hour'
+
+
+class CompletionRollupDay(CompletionRollupColumns, Base):
+    """Model for fax_completion_rollup_day table (per-day completion counters)"""
+    __tablename__ = 'fax_completion_rollup_day'
+
+
 class SystemConfig(Base):
     """Model for system_config table"""
     __tablename__ = 'system_config'
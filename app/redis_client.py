@@ -0,0 +1,166 @@
+"""
+Redis Client for Runtime Statistics
+Workers publish short-lived per-process statistics that the web app reads back,
+claim shared work so that only one process handles it, and share short-lived
+cached results
+"""
+import os
+import time
+import json
+import uuid
+import socket
+import logging
+import redis
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+# Deletes a claim only if it still holds the caller's token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def get_redis():
+    """
+    Get the process-wide Redis client
+
+    redis-py pools connections and re-creates the pool after a fork,
+    so one client per process is enough.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True,
+                                       socket_connect_timeout=2, socket_timeout=2)
+    return _client
+
+
+def publish_stats(namespace, stats, ttl=None):
+    """
+    Publish a statistics snapshot for this process
+
+    Snapshots expire after ttl seconds so that dead processes drop out.
+    Errors are logged and swallowed; statistics must never fail a task.
+
+    Args:
+        namespace: Statistics group, e.g. 'api_pool'
+        stats: JSON-serializable dict
+        ttl: Seconds to keep the snapshot (defaults to config)
+    """
+    key = f"stats:{namespace}:{socket.gethostname()}:{os.getpid()}"
+    try:
+        get_redis().set(key, json.dumps(stats), ex=ttl or Config.STATS_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Could not publish {namespace} statistics: {e}")
+
+
+def read_stats(namespace):
+    """
+    Read the snapshots published by every live process
+
+    Args:
+        namespace: Statistics group
+
+    Returns:
+        dict: Snapshot per '<hostname>:<pid>'
+    """
+    client = get_redis()
+    prefix = f"stats:{namespace}:"
+    keys = sorted(client.scan_iter(match=prefix + '*'))
+    if not keys:
+        return {}
+
+    return {
+        key[len(prefix):]: json.loads(value)
+        for key, value in zip(keys, client.mget(keys))
+        if value is not None
+    }
+
+
+def claim(name, ttl):
+    """
+    Claim a piece of shared work for this process (SET NX with an expiry)
+
+    The claim expires after ttl seconds, so a process that dies while
+    holding it does not block the work forever.
+
+    Args:
+        name: Claim name, e.g. 'xml:file:/mnt/rightfax/xml/ABC_Fax Server.XML'
+        ttl: Seconds the claim lasts
+
+    Returns:
+        str: Token to release the claim with, or None if another process holds it
+    """
+    token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    if get_redis().set(f"claim:{name}", token, nx=True, ex=ttl):
+        return token
+    return None
+
+
+def release(name, token):
+    """
+    Release a claim, unless it expired and another process has taken it since
+
+    Args:
+        name: Claim name
+        token: Token returned by claim()
+    """
+    try:
+        get_redis().eval(_RELEASE_SCRIPT, 1, f"claim:{name}", token)
+    except Exception as e:
+        logger.warning(f"Could not release claim {name}: {e}")
+
+
+def cached(name, ttl, compute, wait=2.0):
+    """
+    Read a JSON result from the shared cache, computing it on a miss
+
+    Single flight: on a miss, one process claims the computation and
+    stores the result for ttl seconds, while the others poll for it for
+    up to wait seconds instead of running the same query. Without Redis,
+    or with a ttl of 0, the result is computed directly.
+
+    Args:
+        name: Cache entry name, e.g. 'api_stats'
+        ttl: Seconds to keep the result
+        compute: Callable returning a JSON-serializable result
+        wait: Seconds to wait for another process's result
+
+    Returns:
+        The cached or computed result
+    """
+    if ttl <= 0:
+        return compute()
+
+    key = f"cache:{name}"
+    try:
+        client = get_redis()
+        value = client.get(key)
+        if value is not None:
+            return json.loads(value)
+        token = claim(key, max(int(wait) + 1, 5))
+    except Exception as e:
+        logger.warning(f"Cache {name} unavailable, computing directly: {e}")
+        return compute()
+
+    if token:
+        try:
+            result = compute()
+            client.set(key, json.dumps(result), px=max(int(ttl * 1000), 1))
+            return result
+        finally:
+            release(key, token)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = client.get(key)
+        if value is not None:
+            return json.loads(value)
+
+    return compute()
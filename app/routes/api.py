@@ -2,13 +2,18 @@
 API Routes for RightFax Testing Platform
 """
 from flask import Blueprint, request, jsonify, current_app
+from app.config import Config
 from app.database import SessionLocal
+from app.redis_client import cached
 from app.models import (
-    SubmissionBatch, FaxSubmission, FaxCompletion,
-    RightFaxAccount, SystemConfig
+    SubmissionBatch, FaxSubmission, FaxCompletion, FaxCompletionXML, FaxJobStage,
+    RightFaxAccount, SystemConfig, BatchCheckpoint,
+    CompletionRollupMinute, CompletionRollupHour, CompletionRollupDay
 )
-from sqlalchemy import desc, func
+from app.services.rate_scheduler import LoadProfile, batch_rate_report
+from sqlalchemy import desc, func, case, select, true
 from datetime import datetime, timedelta
+import json
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -66,6 +71,8 @@ def get_batch(batch_id):
 
         return jsonify({
             'batch': batch.to_dict(),
+            'rate': batch_rate_report(batch),
+            'checkpoints': [cp.to_dict() for cp in batch.checkpoints],
             'submissions': [s.to_dict() for s in submissions]
         }), 200
     except Exception as e:
@@ -75,6 +82,27 @@ def get_batch(batch_id):
         db.close()
 
 
+@bp.route('/batches/<int:batch_id>/rate', methods=['GET'])
+def get_batch_rate(batch_id):
+    """Get achieved versus target submission rate for a batch"""
+    db = SessionLocal()
+    try:
+        batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+
+        return jsonify({
+            'batch_id': batch_id,
+            'status': batch.status,
+            'rate': batch_rate_report(batch)
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching rate for batch {batch_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
 @bp.route('/batches', methods=['POST'])
 def create_batch():
     """Create a new fax submission batch"""
@@ -89,6 +117,28 @@ def create_batch():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
+        if data.get('execution_mode', 'serial') not in ['serial', 'fanout']:
+            return jsonify({'error': 'execution_mode must be serial or fanout'}), 400
+
+        api_concurrency = data.get('api_concurrency')
+        if api_concurrency is not None:
+            if not isinstance(api_concurrency, int) or not 1 <= api_concurrency <= Config.API_MAX_CONCURRENCY:
+                return jsonify({
+                    'error': f'api_concurrency must be an integer between 1 and {Config.API_MAX_CONCURRENCY}'
+                }), 400
+
+        load_profile = None
+        if data['timing_type'] == 'profile':
+            if not data.get('load_profile'):
+                return jsonify({'error': 'load_profile is required for profile timing'}), 400
+            try:
+                LoadProfile.from_dict(data['load_profile'])
+            except ValueError as e:
+                return jsonify({'error': f'Invalid load_profile: {e}'}), 400
+            load_profile = data['load_profile']
+            if not isinstance(load_profile, str):
+                load_profile = json.dumps(load_profile)
+
         # Create batch record
         batch = SubmissionBatch(
             batch_name=data.get('batch_name'),
@@ -97,6 +147,9 @@ def create_batch():
             submission_method=data['submission_method'],
             timing_type=data['timing_type'],
             interval_seconds=data.get('interval_seconds'),
+            load_profile=load_profile,
+            execution_mode=data.get('execution_mode', 'serial'),
+            api_concurrency=api_concurrency,
             recipient_phone=data['recipient_phone'],
             recipient_name=data.get('recipient_name'),
             account_name=data['account_name'],
@@ -136,7 +189,11 @@ def create_batch():
 
 @bp.route('/batches/<int:batch_id>/trigger', methods=['POST'])
 def trigger_batch(batch_id):
-    """Manually trigger a batch submission (for pending or failed batches)"""
+    """
+    Manually trigger a batch submission (for pending or failed batches)
+
+    Starts over from the first fax; use /resume to continue from checkpoints.
+    """
     db = SessionLocal()
     try:
         batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
@@ -149,6 +206,7 @@ def trigger_batch(batch_id):
         # Reset batch to pending
         batch.status = 'pending'
         batch.submitted_count = 0
+        batch.failed_count = 0
         db.commit()
 
         # Trigger Celery task
@@ -171,6 +229,135 @@ def trigger_batch(batch_id):
         db.close()
 
 
+@bp.route('/batches/<int:batch_id>/pause', methods=['POST'])
+def pause_batch(batch_id):
+    """Pause a running batch; workers stop at their next status check"""
+    db = SessionLocal()
+    try:
+        batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+
+        if batch.status != 'in_progress':
+            return jsonify({'error': f'Cannot pause batch with status: {batch.status}'}), 400
+
+        batch.status = 'paused'
+        db.commit()
+
+        current_app.logger.info(f"Paused batch {batch_id}")
+
+        return jsonify({'message': 'Batch paused', 'batch': batch.to_dict()}), 200
+
+    except Exception as e:
+        db.rollback()
+        current_app.logger.error(f"Error pausing batch {batch_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
+@bp.route('/batches/<int:batch_id>/resume', methods=['POST'])
+def resume_batch(batch_id):
+    """
+    Resume a paused or failed batch from its checkpoints
+
+    The batch is switched to in_progress with a conditional UPDATE before
+    the task is queued, so of two concurrent requests only one gets
+    through. A batch left in_progress by a dead worker can be resumed with
+    {"force": true}, which also releases the chunks the worker held.
+    """
+    db = SessionLocal()
+    try:
+        batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+
+        data = request.get_json(silent=True) or {}
+        force = bool(data.get('force'))
+
+        if batch.status not in ['paused', 'failed'] and not (force and batch.status == 'in_progress'):
+            return jsonify({'error': f'Cannot resume batch with status: {batch.status}'}), 400
+
+        # Workers flip their checkpoint back to pending once they have stopped
+        running = [cp for cp in batch.checkpoints if cp.status == 'in_progress']
+        if running and not force:
+            return jsonify({
+                'error': f'{len(running)} chunks are still stopping, retry shortly'
+            }), 409
+
+        # Claim the batch; a concurrent resume finds the status already changed
+        resumable = ['paused', 'failed'] + (['in_progress'] if force else [])
+        previous_status = batch.status
+        claimed = db.query(SubmissionBatch).filter(
+            SubmissionBatch.id == batch_id,
+            SubmissionBatch.status.in_(resumable)
+        ).update({'status': 'in_progress', 'completed_at': None}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            return jsonify({'error': 'Batch is already being resumed'}), 409
+
+        if force:
+            db.query(BatchCheckpoint).filter(
+                BatchCheckpoint.batch_id == batch_id,
+                BatchCheckpoint.status == 'in_progress'
+            ).update({'status': 'pending', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+
+        submit_batch_task = get_celery()
+        try:
+            task = submit_batch_task.delay(batch_id, resume=True)
+        except Exception:
+            # Nothing will run the batch; hand it back for another resume
+            db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).update(
+                {'status': previous_status}, synchronize_session=False)
+            db.commit()
+            raise
+
+        current_app.logger.info(f"Triggered resume task {task.id} for batch {batch_id}")
+
+        return jsonify({
+            'message': 'Batch resume triggered',
+            'task_id': task.id,
+            'batch_id': batch_id,
+            'remaining': sum(cp.remaining for cp in batch.checkpoints if cp.status != 'completed')
+        }), 200
+
+    except Exception as e:
+        db.rollback()
+        current_app.logger.error(f"Error resuming batch {batch_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
+@bp.route('/batches/<int:batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    """Cancel a batch; workers stop at their next status check"""
+    db = SessionLocal()
+    try:
+        batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+
+        if batch.status not in ['pending', 'in_progress', 'paused']:
+            return jsonify({'error': f'Cannot cancel batch with status: {batch.status}'}), 400
+
+        batch.status = 'cancelled'
+        batch.completed_at = datetime.utcnow()
+        db.commit()
+
+        current_app.logger.info(f"Cancelled batch {batch_id}")
+
+        return jsonify({'message': 'Batch cancelled', 'batch': batch.to_dict()}), 200
+
+    except Exception as e:
+        db.rollback()
+        current_app.logger.error(f"Error cancelling batch {batch_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
 @bp.route('/batches/<int:batch_id>', methods=['DELETE'])
 def delete_batch(batch_id):
     """Delete a batch (and all related submissions)"""
@@ -215,43 +402,58 @@ def get_accounts():
 
 @bp.route('/stats', methods=['GET'])
 def get_stats():
-    """Get overall statistics"""
-    db = SessionLocal()
+    """
+    Get overall statistics
+
+    Computed by one aggregate statement over submission_batches,
+    fax_submissions and fax_completions. The result is shared through
+    Redis for API_STATS_CACHE_SECONDS, so polling dashboards run the query
+    at most once per interval across all web workers.
+    """
     try:
-        # Total batches
-        total_batches = db.query(func.count(SubmissionBatch.id)).scalar()
+        return jsonify(cached('api_stats', Config.API_STATS_CACHE_SECONDS, _compute_stats)), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching stats: {e}")
+        return jsonify({'error': str(e)}), 500
 
-        # Total submissions
-        total_submissions = db.query(func.count(FaxSubmission.id)).scalar()
 
-        # Total completions
-        total_completions = db.query(func.count(FaxCompletion.id)).scalar()
+def _compute_stats():
+    """Run the single aggregate query behind /api/stats"""
+    yesterday = datetime.utcnow() - timedelta(days=1)
 
-        # Success rate
-        successful = db.query(func.count(FaxCompletion.id)).filter(
-            FaxCompletion.success == True
-        ).scalar()
-        success_rate = (successful / total_completions * 100) if total_completions > 0 else 0
+    batches = select(
+        func.count().label('total_batches'),
+        func.coalesce(func.sum(case((SubmissionBatch.created_at >= yesterday, 1), else_=0)), 0)
+        .label('recent_batches_24h')
+    ).subquery()
 
-        # Recent activity (last 24 hours)
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_batches = db.query(func.count(SubmissionBatch.id)).filter(
-            SubmissionBatch.created_at >= yesterday
-        ).scalar()
+    submissions = select(func.count().label('total_submissions')).select_from(FaxSubmission).subquery()
 
-        return jsonify({
-            'total_batches': total_batches,
-            'total_submissions': total_submissions,
-            'total_completions': total_completions,
-            'success_rate': round(success_rate, 2),
-            'recent_batches_24h': recent_batches
-        }), 200
-    except Exception as e:
-        current_app.logger.error(f"Error fetching stats: {e}")
-        return jsonify({'error': str(e)}), 500
+    completions = select(
+        func.count().label('total_completions'),
+        func.coalesce(func.sum(case((FaxCompletion.success == True, 1), else_=0)), 0).label('successful')
+    ).subquery()
+
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            select(batches, submissions, completions)
+            .select_from(batches.join(submissions, true()).join(completions, true()))
+        ).one()
     finally:
         db.close()
 
+    total_completions = int(row.total_completions)
+    success_rate = (int(row.successful) / total_completions * 100) if total_completions > 0 else 0
+
+    return {
+        'total_batches': int(row.total_batches),
+        'total_submissions': int(row.total_submissions),
+        'total_completions': total_completions,
+        'success_rate': round(success_rate, 2),
+        'recent_batches_24h': int(row.recent_batches_24h)
+    }
+
 
 @bp.route('/completions', methods=['GET'])
 def get_completions():
@@ -272,7 +474,9 @@ def get_completions():
             since = datetime.utcnow() - timedelta(hours=hours)
             query = query.filter(FaxCompletion.completed_at >= since)
 
-        total = query.count()
+        # The ordering only matters for the page; counting the ordered
+        # query would sort every matching row first
+        total = query.order_by(None).count()
         completions = query.limit(limit).offset(offset).all()
 
         return jsonify({
@@ -288,6 +492,98 @@ def get_completions():
         db.close()
 
 
+@bp.route('/completions/<job_id>/xml', methods=['GET'])
+def get_completion_xml(job_id):
+    """Get the raw completion XML of one job (loaded only here, never by the list queries)"""
+    db = SessionLocal()
+    try:
+        stored = db.query(FaxCompletionXML).filter(FaxCompletionXML.rightfax_job_id == job_id).first()
+        if stored:
+            raw_xml = stored.raw_xml
+        else:
+            # Rows stored before compression keep their XML in fax_completions.raw_xml
+            raw_xml = db.query(FaxCompletion.raw_xml).filter(FaxCompletion.rightfax_job_id == job_id).scalar()
+
+        if raw_xml is None:
+            return jsonify({'error': 'No raw XML stored for this job'}), 404
+
+        return current_app.response_class(raw_xml, mimetype='application/xml')
+    except Exception as e:
+        current_app.logger.error(f"Error fetching XML for job {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
+@bp.route('/completions/<job_id>/stages', methods=['GET'])
+def get_completion_stages(job_id):
+    """Get the conversion and transmission stages of one job from its History TXT"""
+    db = SessionLocal()
+    try:
+        stages = db.query(FaxJobStage).filter(
+            FaxJobStage.rightfax_job_id == job_id
+        ).order_by(FaxJobStage.sequence).all()
+
+        return jsonify({
+            'rightfax_job_id': job_id,
+            'stages': [stage.to_dict() for stage in stages]
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching stages for job {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
+@bp.route('/stages/summary', methods=['GET'])
+def get_stage_summary():
+    """
+    Conversion and transmission timings per stage and server
+
+    Query parameters:
+        hours: Only stages from the last N hours (default: 24)
+    """
+    db = SessionLocal()
+    try:
+        hours = request.args.get('hours', 24, type=int)
+        since = datetime.now() - timedelta(hours=hours)  # History timestamps are RightFax local time
+
+        rows = db.query(
+            FaxJobStage.event_type,
+            FaxJobStage.stage,
+            FaxJobStage.server_name,
+            func.count(FaxJobStage.id).label('count'),
+            func.sum(case((FaxJobStage.success == False, 1), else_=0)).label('failures'),
+            func.avg(FaxJobStage.duration_ms).label('avg_ms'),
+            func.max(FaxJobStage.duration_ms).label('max_ms')
+        ).filter(
+            FaxJobStage.event_type != 'Origin',
+            FaxJobStage.event_time >= since,
+            # A job completes after its stages; this lets Postgres skip older partitions
+            FaxJobStage.completed_at >= since
+        ).group_by(
+            FaxJobStage.event_type, FaxJobStage.stage, FaxJobStage.server_name
+        ).order_by(desc('avg_ms')).all()
+
+        return jsonify({
+            'hours': hours,
+            'stages': [{
+                'event_type': row.event_type,
+                'stage': row.stage,
+                'server_name': row.server_name,
+                'count': row.count,
+                'failures': int(row.failures or 0),
+                'avg_ms': round(float(row.avg_ms), 1) if row.avg_ms is not None else None,
+                'max_ms': row.max_ms
+            } for row in rows]
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching stage summary: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+
 @bp.route('/celery/status', methods=['GET'])
 def celery_status():
     """Check Celery worker status"""
@@ -333,6 +629,78 @@ def celery_status():
         }), 500
 
 
+@bp.route('/rightfax/pool', methods=['GET'])
+def rightfax_pool_stats():
+    """
+    RightFax API connection pool statistics per worker process
+
+    A low reuse ratio means requests are paying for new TCP/TLS handshakes.
+    """
+    try:
+        from app.redis_client import read_stats
+
+        processes = {
+            'sync': read_stats('api_pool'),
+            'async': read_stats('api_pool_async')
+        }
+
+        totals = {}
+        for engine, stats in processes.items():
+            sent = sum(s['requests'] for s in stats.values())
+            opened = sum(s['connections_opened'] for s in stats.values())
+            totals[engine] = {
+                'processes': len(stats),
+                'requests': sent,
+                'connections_opened': opened,
+                'reuse_ratio': round(1 - opened / sent, 4) if sent else None,
+                'retries': sum(s['retries'] for s in stats.values())
+            }
+
+        return jsonify({'totals': totals, 'processes': processes}), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error reading API pool statistics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/xml/backlog', methods=['GET'])
+def xml_backlog_stats():
+    """
+    XML watcher backpressure: queue depth and age of the oldest pending file
+
+    A growing oldest_pending_age_seconds means the workers are not keeping
+    up with RightFax; raise XML_WORKERS or switch XML_WORKER_MODE. In
+    'celery' mode a growing celery_queue_depth means more XML workers are
+    needed.
+    """
+    try:
+        from app.redis_client import read_stats
+
+        processes = read_stats('xml_watcher')
+
+        totals = {
+            'processes': len(processes),
+            'queue_depth': sum(s['queue_depth'] for s in processes.values()),
+            'in_progress': sum(s['in_progress'] for s in processes.values()),
+            'awaiting_batch': sum(s['awaiting_batch'] for s in processes.values()),
+            'oldest_pending_age_seconds': max(
+                (s['oldest_pending_age_seconds'] for s in processes.values()), default=0
+            ),
+            'processed': sum(s['processed'] for s in processes.values()),
+            'errors': sum(s['errors'] for s in processes.values()),
+            # Every watcher reports the same shared queue
+            'celery_queue_depth': max(
+                (s.get('celery_queue_depth', 0) for s in processes.values()), default=0
+            )
+        }
+
+        return jsonify({'totals': totals, 'processes': processes}), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error reading XML watcher statistics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/database/reset', methods=['POST'])
 def reset_database():
     """
@@ -349,8 +717,13 @@ def reset_database():
             }), 400
 
         # Delete all records (in order to respect foreign keys)
+        db.query(FaxJobStage).delete()
+        for rollup in (CompletionRollupMinute, CompletionRollupHour, CompletionRollupDay):
+            db.query(rollup).delete()
+        db.query(FaxCompletionXML).delete()
         db.query(FaxCompletion).delete()
         db.query(FaxSubmission).delete()
+        db.query(BatchCheckpoint).delete()
         db.query(SubmissionBatch).delete()
         db.commit()
 
@@ -0,0 +1,206 @@
+"""
+Micro-batching Writer for Fax Completion Records
+Collects parsed XML completions and stores them with one set-based INSERT
+per micro-batch instead of three round-trips and a commit per file
+"""
+import time
+import logging
+import threading
+from app.config import Config
+from app.database import SessionLocal
+from app.services.xml_parser import XMLParser
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionWriter:
+    """
+    Buffers parsed completions and stores them in micro-batches
+
+    A batch is written when batch_size completions are waiting or the
+    oldest one has waited max_wait seconds, whichever comes first. Files
+    are archived only after their batch is committed, so a crash leaves
+    them in the XML directory to be picked up again. If a batch fails,
+    its rows are retried one at a time so a single bad row does not hold
+    back the others.
+
+    Usage:
+        writer = CompletionWriter()
+        writer.add(parser.parse_xml_file(path), path)
+        ...
+        writer.close()
+    """
+
+    def __init__(self, batch_size=None, max_wait=None, clock=time.monotonic, on_complete=None, on_failed=None):
+        """
+        Initialize writer and start its flush thread
+
+        Args:
+            batch_size: Completions per INSERT (defaults to config)
+            max_wait: Longest a completion waits for its batch, in seconds (defaults to config)
+            clock: Monotonic time source
+            on_complete: Called with (xml_filepath, stamps) once a file with
+                stage timestamps is stored and archived
+            on_failed: Called with xml_filepath for a file that was not
+                stored and stays in the XML directory
+        """
+        self.batch_size = batch_size or Config.XML_INGEST_BATCH_SIZE
+        self.max_wait = max_wait if max_wait is not None else Config.XML_INGEST_BATCH_WAIT
+        self.clock = clock
+        self.on_complete = on_complete
+        self.on_failed = on_failed
+
+        self.stored = 0
+        self.duplicates = 0
+        self.errors = 0
+        self._pending = []  # (completion_data, xml_filepath, stamps)
+        self._oldest = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='completion-writer', daemon=True)
+        self._thread.start()
+
+    def add(self, completion_data, xml_filepath, stamps=None):
+        """
+        Queue a parsed completion for the next batch
+
+        Args:
+            completion_data: Completion data from XMLParser.parse_xml_file
+            xml_filepath: Source file, archived once the row is committed
+            stamps: Stage timestamps; 'stored' and 'archived' are added
+        """
+        with self._condition:
+            self._pending.append((completion_data, xml_filepath, stamps))
+            closed = self._closed
+            # Wake the flush thread to start the wait timer or write a full batch
+            if self._oldest is None or len(self._pending) >= self.batch_size:
+                if self._oldest is None:
+                    self._oldest = self.clock()
+                self._condition.notify()
+
+        # Late arrivals after close() are written straight away
+        if closed:
+            self.flush()
+
+    def pending(self):
+        """Number of completions waiting for a batch"""
+        with self._condition:
+            return len(self._pending)
+
+    def _run(self):
+        """Flush thread: write a batch when it is full or has waited long enough"""
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._oldest is not None:
+                        remaining = self.max_wait - (self.clock() - self._oldest)
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+
+            # Keep the thread alive whatever a batch does, or nothing
+            # added later would ever be written
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing completion batch: {e}")
+
+    def flush(self):
+        """Write every waiting completion"""
+        with self._flush_lock:
+            with self._condition:
+                items, self._pending = self._pending, []
+                self._oldest = None
+
+            for start in range(0, len(items), self.batch_size):
+                self._write(items[start:start + self.batch_size])
+
+    def _write(self, items):
+        """
+        Store one micro-batch and archive its files
+
+        If the batch cannot be written at all (e.g. the database is down),
+        its files stay in the XML directory for the next sweep.
+
+        Args:
+            items: List of (completion_data, xml_filepath, stamps)
+        """
+        failed = set()
+        db = SessionLocal()
+        try:
+            parser = XMLParser(db)
+            try:
+                inserted = parser.store_completions([data for data, _, _ in items])
+            except Exception as e:
+                logger.error(f"Error storing batch of {len(items)} completions, retrying one at a time: {e}")
+                inserted = set()
+                for data, filepath, _ in items:
+                    try:
+                        inserted |= parser.store_completions([data])
+                    except Exception as row_error:
+                        logger.error(f"Error storing completion from {filepath}: {row_error}")
+                        self.errors += 1
+                        failed.add(filepath)
+
+            stored_at = time.time()
+
+            done = [item for item in items if item[1] not in failed]
+            for data, filepath, stamps in done:
+                if data['rightfax_job_id'] in inserted:
+                    inserted.discard(data['rightfax_job_id'])
+                    self.stored += 1
+                else:
+                    logger.info(f"Duplicate job ID {data['rightfax_job_id']}, skipping")
+                    self.duplicates += 1
+
+            # One archive append for the whole batch
+            parser.archive_files([(data['rightfax_job_id'], filepath) for data, filepath, _ in done])
+            archived_at = time.time()
+
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(items)} completions, leaving files for the next sweep: {e}")
+            self.errors += len(items) - len(failed)
+            self._report_failed([filepath for _, filepath, _ in items])
+            return
+
+        finally:
+            db.close()
+
+        self._report_failed(failed)
+
+        for data, filepath, stamps in done:
+            if stamps is not None:
+                stamps['stored'] = stored_at
+                stamps['archived'] = archived_at
+                if self.on_complete:
+                    try:
+                        self.on_complete(filepath, stamps)
+                    except Exception as e:
+                        logger.error(f"Error in completion callback for {filepath}: {e}")
+
+        logger.info(f"Stored batch of {len(items)} completions")
+
+    def _report_failed(self, filepaths):
+        """Pass files that were not stored to on_failed"""
+        if not self.on_failed:
+            return
+        for filepath in filepaths:
+            try:
+                self.on_failed(filepath)
+            except Exception as e:
+                logger.error(f"Error in failure callback for {filepath}: {e}")
+
+    def close(self):
+        """Stop the flush thread and write anything still waiting"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
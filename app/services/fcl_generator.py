@@ -3,13 +3,122 @@ FCL (Fax Command Language) File Generator
 Generates FCL files for RightFax submission
 """
 import os
+import re
+import uuid
 import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Process-wide naming state. The token keeps names unique across processes
+# and hosts writing to the same share; the counter keeps them unique across
+# threads. Both are reset in forked children (Celery prefork workers).
+_process_token = uuid.uuid4().hex[:8]
+_sequence = itertools.count(1)
+
+_write_pool = None
+_write_pool_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _process_token, _sequence, _write_pool, _write_pool_lock
+    _process_token = uuid.uuid4().hex[:8]
+    _sequence = itertools.count(1)
+    _write_pool = None
+    _write_pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+# Correlation tokens are echoed by RightFax into the completion XML billing
+# field; the prefix tells them apart from billing codes set by other senders
+CORRELATION_TOKEN_PREFIX = 'RFLT-'
+CORRELATION_TOKEN_PATTERN = re.compile(r'^RFLT-[0-9a-f]{16}$')
+
+
+def new_correlation_token():
+    """
+    Generate a token that links an FCL submission to its completion
+
+    Returns:
+        str: Token such as 'RFLT-9f86d081884c7d65'
+    """
+    return f"{CORRELATION_TOKEN_PREFIX}{uuid.uuid4().hex[:16]}"
+
+
+def correlation_field_name(fcl_field=None):
+    """
+    Completion XML IndexField that echoes an FCL billing field
+
+    Args:
+        fcl_field: 'billinfo1' or 'billinfo2' (defaults to config)
+
+    Returns:
+        str: 'BillingInfo 1' or 'BillingInfo 2'
+    """
+    fcl_field = (fcl_field or Config.FCL_CORRELATION_FIELD).lower()
+    return f"BillingInfo {fcl_field[-1]}"
+
+
+def _get_write_pool():
+    """Get the process-wide thread pool used for batch FCL writes"""
+    global _write_pool
+    with _write_pool_lock:
+        if _write_pool is None:
+            _write_pool = ThreadPoolExecutor(
+                max_workers=Config.FCL_WRITER_THREADS,
+                thread_name_prefix='fcl-writer'
+            )
+        return _write_pool
+
+
+class FCLTemplate:
+    """
+    FCL content for a batch, rendered once with slots for the correlation
+    token and the recipient name
+
+    Every fax in a batch shares the same fields except those two, so
+    per-fax rendering is a few string joins.
+    """
+
+    _SLOT = '\x00'
+    _TOKEN_SLOT = '\x01'
+
+    def __init__(self, generator, **fields):
+        """
+        Initialize template
+
+        Args:
+            generator: FCLGenerator used to build the content
+            **fields: _build_fcl_content arguments other than recipient_name
+                and correlation_token
+        """
+        named = generator._build_fcl_content(recipient_name=self._SLOT, correlation_token=self._TOKEN_SLOT, **fields)
+        unnamed = generator._build_fcl_content(recipient_name=None, correlation_token=self._TOKEN_SLOT, **fields)
+        self._named = [part.split(self._SLOT) for part in named.split(self._TOKEN_SLOT)]
+        self._unnamed = unnamed.split(self._TOKEN_SLOT)
+
+    def render(self, recipient_name=None, correlation_token=None):
+        """
+        Render FCL content for one fax
+
+        Args:
+            recipient_name: Recipient name (optional)
+            correlation_token: Token from new_correlation_token (generated if omitted)
+
+        Returns:
+            str: FCL file content
+        """
+        correlation_token = correlation_token or new_correlation_token()
+        if recipient_name:
+            return correlation_token.join(recipient_name.join(parts) for parts in self._named)
+        return correlation_token.join(self._unnamed)
+
 
 class FCLGenerator:
     """
@@ -36,7 +145,7 @@ class FCLGenerator:
 
     def generate_fcl(self, recipient_phone, account_name, attachment_filename=None,
                     recipient_name=None, subject=None, priority='NORMAL',
-                    coverpage=None):
+                    coverpage=None, correlation_token=None):
         """
         Generate an FCL file for fax submission
 
@@ -48,6 +157,7 @@ class FCLGenerator:
             subject: Fax subject (optional)
             priority: Priority level (LOW, NORMAL, HIGH)
             coverpage: Cover page template name (optional)
+            correlation_token: Token RightFax echoes into the completion XML (optional)
 
         Returns:
             str: Filename of generated FCL file
@@ -62,12 +172,6 @@ class FCLGenerator:
         if not account_name:
             raise ValueError("account_name is required")
 
-        # Generate unique filename
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-        sequence = os.getpid() % 10000  # Use process ID for uniqueness
-        fcl_filename = f"fax_{timestamp}_{sequence:04d}.fcl"
-        fcl_path = os.path.join(self.fcl_directory, fcl_filename)
-
         # Build FCL content
         fcl_content = self._build_fcl_content(
             recipient_phone=recipient_phone,
@@ -76,21 +180,122 @@ class FCLGenerator:
             attachment_filename=attachment_filename,
             subject=subject,
             priority=priority,
+            coverpage=coverpage,
+            correlation_token=correlation_token
+        )
+
+        fcl_filename = self.write_fcl(fcl_content)
+
+        logger.info(f"Generated FCL file: {fcl_filename}")
+        logger.debug(f"FCL content:\n{fcl_content}")
+
+        return fcl_filename
+
+    def prepare_template(self, recipient_phone, account_name, attachment_filename=None,
+                         subject=None, priority='NORMAL', coverpage=None):
+        """
+        Render the FCL content shared by every fax in a batch
+
+        Args:
+            recipient_phone: Recipient fax number (required)
+            account_name: RightFax account/user ID (required)
+            attachment_filename: Path to attachment file
+            subject: Fax subject (optional)
+            priority: Priority level (LOW, NORMAL, HIGH)
+            coverpage: Cover page template name (optional)
+
+        Returns:
+            FCLTemplate: Pass to generate_batch
+
+        Raises:
+            ValueError: If required parameters are missing
+        """
+        if not recipient_phone:
+            raise ValueError("recipient_phone is required")
+        if not account_name:
+            raise ValueError("account_name is required")
+
+        return FCLTemplate(
+            self,
+            recipient_phone=recipient_phone,
+            account_name=account_name,
+            attachment_filename=attachment_filename,
+            subject=subject,
+            priority=priority,
             coverpage=coverpage
         )
 
+    def generate_batch(self, template, recipient_names, correlation_tokens):
+        """
+        Write one FCL file per recipient name through the writer thread pool
+
+        Args:
+            template: FCLTemplate from prepare_template
+            recipient_names: Recipient name (or None) for each fax
+            correlation_tokens: Correlation token for each fax
+
+        Returns:
+            list: (fcl_filename, error) per fax, in input order; exactly one
+            of the two is None
+        """
+        contents = [template.render(name, token) for name, token in zip(recipient_names, correlation_tokens)]
+
+        if len(contents) == 1:
+            results = [self._write_result(contents[0])]
+        else:
+            pool = _get_write_pool()
+            futures = [pool.submit(self._write_result, content) for content in contents]
+            results = [future.result() for future in futures]
+
+        written = sum(1 for filename, error in results if filename)
+        logger.debug(f"Wrote {written}/{len(results)} FCL files to {self.fcl_directory}")
+
+        return results
+
+    def _write_result(self, fcl_content):
+        """write_fcl wrapper returning (filename, error) instead of raising"""
+        try:
+            return self.write_fcl(fcl_content), None
+        except Exception as e:
+            return None, e
+
+    def next_filename(self):
+        """
+        Get a unique FCL filename
+
+        Format: fax_<timestamp>_<process token>-<sequence>.fcl
+
+        Returns:
+            str: FCL filename
+        """
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        return f"fax_{timestamp}_{_process_token}-{next(_sequence):08d}.fcl"
+
+    def write_fcl(self, fcl_content):
+        """
+        Write FCL content atomically under a new unique filename
+
+        Args:
+            fcl_content: FCL file content
+
+        Returns:
+            str: Filename of the written FCL file
+
+        Raises:
+            IOError: If FCL file cannot be written
+        """
+        fcl_filename = self.next_filename()
+        fcl_path = os.path.join(self.fcl_directory, fcl_filename)
+        temp_path = fcl_path + '.tmp'
+
         # Write FCL file atomically
         try:
             # Write to temporary file first
-            temp_path = fcl_path + '.tmp'
             with open(temp_path, 'w') as f:
                 f.write(fcl_content)
 
             # Rename to final name (atomic operation)
-            os.rename(temp_path, fcl_path)
-
-            logger.info(f"Generated FCL file: {fcl_filename}")
-            logger.debug(f"FCL content:\n{fcl_content}")
+            os.replace(temp_path, fcl_path)
 
             return fcl_filename
 
@@ -103,7 +308,7 @@ class FCLGenerator:
 
     def _build_fcl_content(self, recipient_phone, account_name, attachment_filename=None,
                           recipient_name=None, subject=None, priority='NORMAL',
-                          coverpage=None):
+                          coverpage=None, correlation_token=None):
         """
         Build FCL file content according to RightFax FCL specification
 
@@ -137,6 +342,10 @@ class FCLGenerator:
         # Account/User ID (winsecid)
         lines.append(f"{{{{winsecid {account_name}}}}}")
 
+        # Correlation token, echoed into the completion XML billing field
+        if correlation_token:
+            lines.append(f"{{{{{Config.FCL_CORRELATION_FIELD} {correlation_token}}}}}")
+
         lines.append("")
 
         # Additional optional parameters
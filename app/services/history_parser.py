@@ -0,0 +1,158 @@
+"""
+History TXT Parser for RightFax Jobs
+Parses the _History.TXT file RightFax writes next to each completion XML
+into per-stage rows (conversion steps with their timings and work server,
+and transmission attempts with their status codes)
+"""
+import os
+import re
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# "11/14/2025 3:56 AM Conversion" starts an event block
+EVENT_PATTERN = re.compile(r'^\s*(\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2} [AP]M) (\w+)\s*$')
+
+# "INSO #1: Success [image/tiff] (553ms)"
+STEP_PATTERN = re.compile(
+    r'^(?P<stage>.+?) #(?P<attempt>\d+): (?P<result>.*?)(?: \[(?P<output_type>[^\]]+)\])? \((?P<ms>\d+)ms\)$'
+)
+
+# "(RF24DOT4:WORKSRV2)" closes a conversion block
+WORK_SERVER_PATTERN = re.compile(r'^\((?P<server>[^()\s]+)\)$')
+
+ELAPSED_PATTERN = re.compile(r'^Elapsed time: (?P<minutes>\d+) minutes?, (?P<seconds>\d+) seconds?\.?$')
+CHANNEL_PATTERN = re.compile(r'^Used channel (?P<channel>\d+) on server "(?P<server>[^"]*)"\.?$')
+STATUS_PATTERN = re.compile(r'^Resulting status code \((?P<code>[^)]*)\): (?P<result>.*)$')
+
+HISTORY_SUFFIX = '_History.TXT'
+
+# fax_job_stages columns filled from a parsed stage (rightfax_job_id is added on insert)
+STAGE_FIELDS = (
+    'sequence', 'event_type', 'event_time', 'stage', 'attempt', 'result', 'success',
+    'output_type', 'duration_ms', 'server_name', 'channel', 'status_code'
+)
+
+
+def history_path_for(xml_filepath):
+    """
+    Path of the History TXT RightFax writes next to a completion XML
+
+    Args:
+        xml_filepath: Path to XML file ("<id>_<server>.XML")
+
+    Returns:
+        str: Path to "<id>_<server>_History.TXT", or None if there is none
+    """
+    path = os.path.splitext(xml_filepath)[0] + HISTORY_SUFFIX
+    return path if os.path.exists(path) else None
+
+
+def parse_history(content):
+    """
+    Parse History TXT contents into stage rows
+
+    Each conversion step becomes one row with its duration and the work
+    server that ran it. Each transmission becomes one row with the elapsed
+    time, channel, fax server and resulting status code. Lines that are
+    not recognised are ignored, so new RightFax wording only loses detail.
+
+    Args:
+        content: History TXT contents (str)
+
+    Returns:
+        list: Stage dicts in file order
+    """
+    stages = []
+    event_time = event_type = None
+    block = []
+
+    for line in content.splitlines():
+        event = EVENT_PATTERN.match(line)
+        if event:
+            stages.extend(_close_block(event_type, event_time, block))
+            event_time = _parse_event_time(event.group(1))
+            event_type = event.group(2)
+            block = []
+            continue
+
+        line = line.strip()
+        if line and event_type:
+            block.append(line)
+
+    stages.extend(_close_block(event_type, event_time, block))
+
+    for sequence, stage in enumerate(stages, start=1):
+        stage['sequence'] = sequence
+    return stages
+
+
+def _close_block(event_type, event_time, lines):
+    """
+    Turn the lines of one event block into stage rows
+
+    Args:
+        event_type: 'Origin', 'Conversion', 'Transmission', ...
+        event_time: Block timestamp
+        lines: Stripped non-empty lines of the block
+
+    Returns:
+        list: Stage dicts
+    """
+    if event_type == 'Conversion':
+        steps = []
+        server_name = None
+        for line in lines:
+            step = STEP_PATTERN.match(line)
+            server = WORK_SERVER_PATTERN.match(line)
+            if step:
+                steps.append({
+                    'event_type': event_type,
+                    'event_time': event_time,
+                    'stage': step.group('stage'),
+                    'attempt': int(step.group('attempt')),
+                    'result': step.group('result')[:255],
+                    'success': step.group('result') == 'Success',
+                    'output_type': step.group('output_type'),
+                    'duration_ms': int(step.group('ms'))
+                })
+            elif server:
+                server_name = server.group('server')
+
+        for step in steps:
+            step['server_name'] = server_name
+        return steps
+
+    if event_type == 'Transmission':
+        stage = {'event_type': event_type, 'event_time': event_time, 'stage': event_type}
+        for line in lines:
+            elapsed = ELAPSED_PATTERN.match(line)
+            channel = CHANNEL_PATTERN.match(line)
+            status = STATUS_PATTERN.match(line)
+            if elapsed:
+                stage['duration_ms'] = (int(elapsed.group('minutes')) * 60 + int(elapsed.group('seconds'))) * 1000
+            elif channel:
+                stage['channel'] = int(channel.group('channel'))
+                stage['server_name'] = channel.group('server')
+            elif status:
+                stage['status_code'] = status.group('code')
+                stage['result'] = status.group('result')[:255]
+                # "(disposition/line status; ...)": disposition 0 is a successful send
+                stage['success'] = status.group('code').split('/')[0].strip() == '0'
+        return [stage]
+
+    if event_type:
+        return [{'event_type': event_type, 'event_time': event_time, 'stage': event_type,
+                 'result': lines[0][:255] if lines else None}]
+
+    return []
+
+
+def _parse_event_time(timestamp_str):
+    """Parse a block timestamp like '11/14/2025 3:56 AM'"""
+    try:
+        return datetime.strptime(timestamp_str, '%m/%d/%Y %I:%M %p')
+    except ValueError:
+        logger.warning(f"Could not parse history timestamp: {timestamp_str}")
+        return None
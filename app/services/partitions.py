@@ -0,0 +1,246 @@
+"""
+Time Partition Maintenance
+Creates the daily or monthly range partitions of fax_completions,
+fax_submissions and the completion side tables ahead of time, and enforces
+database retention by detaching and dropping whole partitions instead of
+DELETE and vacuum
+
+Usage:
+    python -m app.services.partitions
+    python -m app.services.partitions --since 2025-10-01 --retention-days 90
+"""
+import re
+import sys
+import argparse
+import logging
+from datetime import datetime, date, timedelta
+from sqlalchemy import text
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition key (see database/init.sql)
+PARTITIONED_TABLES = {
+    'fax_submissions': 'submitted_at',
+    'fax_completions': 'completed_at',
+    'fax_completion_xml': 'completed_at',
+    'fax_job_stages': 'completed_at',
+}
+
+# "FOR VALUES FROM ('2025-11-14 00:00:00') TO ('2025-11-15 00:00:00')"
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+# Serializes partition DDL between the watcher, Celery and the CLI
+_LOCK_KEY = 'rightfax_partition_maintenance'
+
+
+def period_start(day, interval):
+    """Start of the day or month partition a date falls in"""
+    if interval == 'month':
+        return datetime(day.year, day.month, 1)
+    return datetime(day.year, day.month, day.day)
+
+
+def next_period(start, interval):
+    """Start of the following partition"""
+    if interval == 'month':
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def partition_name(table, start, interval):
+    """Partition table name, e.g. fax_completions_20251114 or fax_completions_202511"""
+    return f"{table}_{start:%Y%m}" if interval == 'month' else f"{table}_{start:%Y%m%d}"
+
+
+def partitioned_tables(connection):
+    """
+    Tables of PARTITIONED_TABLES that are partitioned in this database
+
+    Databases created before partitioning keep plain tables; they are
+    skipped, so maintenance is a no-op there.
+    """
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = ANY(:names)"
+    ), {'names': list(PARTITIONED_TABLES)})
+    return [name for name in PARTITIONED_TABLES if name in {row[0] for row in rows}]
+
+
+def list_partitions(connection, table):
+    """
+    Partitions of a table
+
+    Args:
+        connection: Database connection
+        table: Partitioned table name
+
+    Returns:
+        list: (name, start, end) tuples; the DEFAULT partition has start and end None
+    """
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class parent ON parent.oid = i.inhparent "
+        "WHERE parent.relname = :table ORDER BY c.relname"
+    ), {'table': table})
+
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_PATTERN.search(bound or '')
+        if match:
+            partitions.append((name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))))
+        else:
+            partitions.append((name, None, None))
+    return partitions
+
+
+def ensure_partitions(engine, since=None, until=None, ahead=None, interval=None):
+    """
+    Create missing partitions from since up to ahead periods past until
+
+    A partition whose range already has rows in the DEFAULT partition
+    cannot be created; it is logged and skipped, and those rows stay in
+    the DEFAULT partition.
+
+    Args:
+        engine: SQLAlchemy engine
+        since: First day to cover (defaults to today)
+        until: Last day to cover before the ones created ahead (defaults to today)
+        ahead: Extra periods to create past until (defaults to config)
+        interval: 'day' or 'month' (defaults to config)
+
+    Returns:
+        list: Partitions created
+    """
+    if engine.dialect.name != 'postgresql':
+        return []
+
+    interval = interval or Config.PARTITION_INTERVAL
+    ahead = Config.PARTITION_PREMAKE if ahead is None else ahead
+    today = date.today()
+
+    starts = []
+    start = period_start(since or today, interval)
+    last = period_start(until or today, interval)
+    for _ in range(ahead):
+        last = next_period(last, interval)
+    while start <= last:
+        starts.append(start)
+        start = next_period(start, interval)
+
+    created = []
+    with engine.connect() as connection:
+        tables = partitioned_tables(connection)
+        existing = {name for table in tables for name, _, _ in list_partitions(connection, table)}
+        connection.rollback()
+
+        for table in tables:
+            for start in starts:
+                name = partition_name(table, start, interval)
+                if name in existing:
+                    continue
+                try:
+                    with connection.begin():
+                        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {'key': _LOCK_KEY})
+                        connection.execute(text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                            f"FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{next_period(start, interval).isoformat(' ')}')"
+                        ))
+                    created.append(name)
+                except Exception as e:
+                    logger.warning(f"Could not create partition {name}: {e}")
+
+    if created:
+        logger.info(f"Created {len(created)} partitions: {', '.join(created)}")
+    return created
+
+
+def drop_expired_partitions(engine, retention_days=None):
+    """
+    Detach and drop partitions whose whole range is older than the retention
+
+    Rows older than the retention that ended up in a DEFAULT partition are
+    deleted; there are only a few, from days no partition existed for.
+
+    Args:
+        engine: SQLAlchemy engine
+        retention_days: Days of data to keep; 0 keeps everything (defaults to config)
+
+    Returns:
+        list: Partitions dropped
+    """
+    retention_days = Config.DB_RETENTION_DAYS if retention_days is None else retention_days
+    if engine.dialect.name != 'postgresql' or not retention_days:
+        return []
+
+    cutoff = datetime.combine(date.today() - timedelta(days=retention_days), datetime.min.time())
+    dropped = []
+
+    with engine.connect() as connection:
+        tables = partitioned_tables(connection)
+        partitions = {table: list_partitions(connection, table) for table in tables}
+        connection.rollback()
+
+        for table, entries in partitions.items():
+            key = PARTITIONED_TABLES[table]
+            for name, start, end in entries:
+                if end is not None and end > cutoff:
+                    continue
+                try:
+                    with connection.begin():
+                        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {'key': _LOCK_KEY})
+                        if end is None:
+                            connection.execute(text(f"DELETE FROM {name} WHERE {key} < :cutoff"), {'cutoff': cutoff})
+                        else:
+                            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                            connection.execute(text(f"DROP TABLE {name}"))
+                            dropped.append(name)
+                except Exception as e:
+                    logger.error(f"Error dropping partition {name}: {e}")
+
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} expired partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def maintain_partitions(engine=None):
+    """
+    Create upcoming partitions and drop expired ones
+
+    Returns:
+        dict: Partitions created and dropped
+    """
+    if engine is None:
+        from app.database import engine
+
+    return {
+        'created': ensure_partitions(engine),
+        'dropped': drop_expired_partitions(engine)
+    }
+
+
+def main(argv=None):
+    """Create partitions (optionally back to --since) and apply the retention"""
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description='Create upcoming partitions and drop expired ones')
+    parser.add_argument('--since', help='Also create partitions back to this day (YYYY-MM-DD)')
+    parser.add_argument('--retention-days', type=int, help='Days of data to keep (0 keeps everything)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        since = date.fromisoformat(args.since) if args.since else None
+    except ValueError as e:
+        print(f"Invalid date: {e}", file=sys.stderr)
+        return 2
+
+    created = ensure_partitions(engine, since=since)
+    dropped = drop_expired_partitions(engine, args.retention_days)
+    print(f"Created {len(created)} partitions, dropped {len(dropped)}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,341 @@
+"""
+Rate Scheduler for Paced Fax Submission
+Paces submissions against a target rate (faxes per minute) using
+absolute deadlines so that send latency does not cause rate drift
+"""
+import json
+import math
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class LoadProfile:
+    """
+    Target submission rate over time, as piecewise-linear segments
+
+    Each segment is (duration_seconds, start_rate, end_rate) with rates in
+    faxes per minute. The final segment's end rate holds indefinitely.
+
+    Supported shapes (see from_dict):
+        soak:  {"shape": "soak", "rate": 100}
+        ramp:  {"shape": "ramp", "start_rate": 100, "end_rate": 600, "duration_minutes": 20}
+        step:  {"shape": "step", "start_rate": 100, "step_rate": 100, "step_minutes": 5, "steps": 6}
+        spike: {"shape": "spike", "base_rate": 100, "spike_rate": 1000,
+                "spike_at_minutes": 10, "spike_minutes": 2}
+    """
+
+    SHAPES = ('soak', 'ramp', 'step', 'spike')
+
+    def __init__(self, segments):
+        """
+        Initialize load profile
+
+        Args:
+            segments: List of (duration_seconds, start_rate, end_rate) tuples
+
+        Raises:
+            ValueError: If segments are empty or invalid
+        """
+        if not segments:
+            raise ValueError("Load profile needs at least one segment")
+
+        for duration, start_rate, end_rate in segments:
+            if duration < 0 or start_rate < 0 or end_rate < 0:
+                raise ValueError("Load profile durations and rates must not be negative")
+
+        if segments[-1][2] <= 0:
+            raise ValueError("Load profile must end with a positive rate")
+
+        self.segments = [(float(d), float(r0), float(r1)) for d, r0, r1 in segments]
+
+    @classmethod
+    def from_dict(cls, spec):
+        """
+        Build a load profile from its stored JSON form
+
+        Args:
+            spec: dict (or JSON string) with a 'shape' key and shape parameters
+
+        Returns:
+            LoadProfile
+
+        Raises:
+            ValueError: If the shape is unknown or parameters are missing
+        """
+        if isinstance(spec, str):
+            spec = json.loads(spec)
+        if not isinstance(spec, dict):
+            raise ValueError("Load profile must be a JSON object")
+
+        shape = spec.get('shape')
+        try:
+            if shape == 'soak':
+                rate = float(spec['rate'])
+                return cls([(0, rate, rate)])
+
+            if shape == 'ramp':
+                return cls([
+                    (float(spec['duration_minutes']) * 60,
+                     float(spec['start_rate']), float(spec['end_rate'])),
+                    (0, float(spec['end_rate']), float(spec['end_rate'])),
+                ])
+
+            if shape == 'step':
+                step_seconds = float(spec['step_minutes']) * 60
+                segments = []
+                for step in range(int(spec['steps'])):
+                    rate = float(spec['start_rate']) + step * float(spec['step_rate'])
+                    segments.append((step_seconds, rate, rate))
+                last_rate = segments[-1][1]
+                segments.append((0, last_rate, last_rate))
+                return cls(segments)
+
+            if shape == 'spike':
+                base = float(spec['base_rate'])
+                peak = float(spec['spike_rate'])
+                return cls([
+                    (float(spec['spike_at_minutes']) * 60, base, base),
+                    (float(spec['spike_minutes']) * 60, peak, peak),
+                    (0, base, base),
+                ])
+
+        except (KeyError, TypeError, IndexError) as e:
+            raise ValueError(f"Invalid {shape} load profile: missing or bad parameter {e}")
+
+        raise ValueError(f"Unknown load profile shape: {shape} (expected one of {', '.join(cls.SHAPES)})")
+
+    @classmethod
+    def for_batch(cls, batch):
+        """
+        Get the load profile for a batch
+
+        Interval batches are a soak at 60 / interval_seconds per minute.
+
+        Args:
+            batch: SubmissionBatch
+
+        Returns:
+            LoadProfile, or None for immediate batches
+        """
+        if batch.timing_type == 'profile' and batch.load_profile:
+            return cls.from_dict(batch.load_profile)
+
+        if batch.timing_type == 'interval' and batch.interval_seconds:
+            rate = 60.0 / batch.interval_seconds
+            return cls([(0, rate, rate)])
+
+        return None
+
+    def rate_at(self, elapsed):
+        """
+        Target rate (faxes per minute) at elapsed seconds from start
+        """
+        for duration, start_rate, end_rate in self.segments[:-1]:
+            if elapsed < duration:
+                return start_rate + (end_rate - start_rate) * elapsed / duration
+            elapsed -= duration
+
+        return self.segments[-1][2]
+
+    def expected_count(self, elapsed):
+        """
+        Number of faxes the profile expects to be sent by elapsed seconds
+        """
+        count = 0.0
+        for duration, start_rate, end_rate in self.segments[:-1]:
+            span = min(elapsed, duration)
+            if duration > 0:
+                rate_at_span = start_rate + (end_rate - start_rate) * span / duration
+            else:
+                rate_at_span = start_rate
+            count += (start_rate + rate_at_span) / 2 * span / 60
+            elapsed -= span
+            if elapsed <= 0:
+                return count
+
+        return count + self.segments[-1][2] * elapsed / 60
+
+    def time_for_count(self, n):
+        """
+        Elapsed seconds at which the n-th fax (0-based) is due
+
+        Inverts expected_count analytically, segment by segment.
+        """
+        offset = 0.0
+        remaining = float(n)
+
+        for duration, start_rate, end_rate in self.segments[:-1]:
+            segment_count = (start_rate + end_rate) / 2 * duration / 60
+            if remaining <= segment_count:
+                return offset + self._solve_segment(remaining, duration, start_rate, end_rate)
+            remaining -= segment_count
+            offset += duration
+
+        return offset + remaining * 60 / self.segments[-1][2]
+
+    @staticmethod
+    def _solve_segment(count, duration, start_rate, end_rate):
+        """
+        Seconds into a linear segment at which count faxes are due
+
+        Solves a*t + b*t^2/2 = count with a, b in faxes per second.
+        """
+        if count <= 0:
+            return 0.0
+
+        a = start_rate / 60
+        b = (end_rate - start_rate) / 60 / duration
+
+        if abs(b) < 1e-12:
+            return count / a
+
+        discriminant = max(a * a + 2 * b * count, 0.0)
+        return (math.sqrt(discriminant) - a) / b
+
+
+class RateScheduler:
+    """
+    Paces a submission loop against absolute deadlines
+
+    Deadlines are wall-clock so that parallel chunks on different workers
+    share the batch start time.
+    """
+
+    def __init__(self, profile, start_time=None, clock=time.time, sleep=time.sleep):
+        """
+        Initialize scheduler
+
+        Args:
+            profile: LoadProfile to follow
+            start_time: Epoch seconds when the schedule starts (defaults to now)
+            clock: Time source returning epoch seconds
+            sleep: Sleep function
+        """
+        self.profile = profile
+        self.clock = clock
+        self.sleep = sleep
+        self.start_time = start_time if start_time is not None else clock()
+        self.max_lag = 0.0
+
+    @classmethod
+    def for_batch(cls, batch):
+        """
+        Create a scheduler for a batch, or None if it is not paced
+
+        Args:
+            batch: SubmissionBatch (started_at is used as the schedule start)
+
+        Returns:
+            RateScheduler or None
+        """
+        profile = LoadProfile.for_batch(batch)
+        if profile is None:
+            return None
+
+        start_time = None
+        if batch.started_at:
+            start_time = batch.started_at.replace(tzinfo=timezone.utc).timestamp()
+
+        return cls(profile, start_time=start_time)
+
+    def deadline(self, n):
+        """Epoch seconds at which the n-th fax (0-based) is due"""
+        return self.start_time + self.profile.time_for_count(n)
+
+    def wait_for(self, n, should_stop=None, poll_interval=1.0):
+        """
+        Block until the n-th fax (0-based) is due
+
+        Args:
+            n: Position of the fax in this scheduler's sequence
+            should_stop: Optional callable polled while waiting; returning
+                True aborts the wait
+            poll_interval: Seconds between should_stop polls
+
+        Returns:
+            bool: True when the deadline was reached, False if aborted
+        """
+        deadline = self.deadline(n)
+
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                self.max_lag = max(self.max_lag, -remaining)
+                return True
+
+            if should_stop is not None and should_stop():
+                return False
+
+            self.sleep(min(remaining, poll_interval) if should_stop else remaining)
+
+    async def wait_for_async(self, n, should_stop=None, poll_interval=1.0):
+        """
+        Asyncio version of wait_for, for the async submission engine
+
+        Args:
+            n: Position of the fax in this scheduler's sequence
+            should_stop: Optional callable polled while waiting; returning
+                True aborts the wait
+            poll_interval: Seconds between should_stop polls
+
+        Returns:
+            bool: True when the deadline was reached, False if aborted
+        """
+        deadline = self.deadline(n)
+
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                self.max_lag = max(self.max_lag, -remaining)
+                return True
+
+            if should_stop is not None and should_stop():
+                return False
+
+            await asyncio.sleep(min(remaining, poll_interval) if should_stop else remaining)
+
+
+def batch_rate_report(batch, now=None):
+    """
+    Achieved versus target rate for a whole batch
+
+    Args:
+        batch: SubmissionBatch
+        now: Current UTC datetime (defaults to utcnow)
+
+    Returns:
+        dict: Rate report, or None if the batch has not started
+    """
+    if not batch.started_at:
+        return None
+
+    end = batch.completed_at or now or datetime.utcnow()
+    elapsed = max((end - batch.started_at).total_seconds(), 1e-9)
+    submitted = batch.submitted_count or 0
+
+    report = {
+        'elapsed_seconds': round(elapsed, 3),
+        'submitted': submitted,
+        'achieved_rate_per_minute': round(submitted / elapsed * 60, 2),
+        'target_rate_per_minute': None,
+        'current_target_rate_per_minute': None,
+        'expected_submitted': None
+    }
+
+    try:
+        profile = LoadProfile.for_batch(batch)
+    except ValueError as e:
+        logger.error(f"Invalid load profile on batch {batch.id}: {e}")
+        profile = None
+
+    if profile is not None:
+        expected = min(profile.expected_count(elapsed), batch.total_count)
+        report['expected_submitted'] = round(expected, 1)
+        report['target_rate_per_minute'] = round(expected / elapsed * 60, 2)
+        report['current_target_rate_per_minute'] = round(profile.rate_at(elapsed), 2)
+
+    return report
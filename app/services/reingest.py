@@ -0,0 +1,379 @@
+"""
+Archive Reingest
+Rebuilds fax_completions (with raw XML and History TXT stages) from archived
+completion files. Files are parsed in a process pool and loaded in chunks:
+on PostgreSQL each chunk is COPYed into temporary tables and moved into
+place by one INSERT ... ON CONFLICT DO NOTHING, so job IDs already present
+are skipped
+
+Usage:
+    python -m app.services.reingest
+    python -m app.services.reingest --since 2025-11-01 --until 2025-11-30 --workers 8
+    python -m app.services.reingest /mnt/rightfax/xml_old /mnt/rightfax/xml_archive
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import Config
+from app.services.history_parser import HISTORY_SUFFIX, STAGE_FIELDS, history_path_for, parse_history
+from app.services.xml_archive import SegmentArchive, segment_end
+from app.services.xml_parser import XMLParser, INGEST_COLUMNS
+from app.services.rollups import rebuild_rollups
+from app.services.partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Completions per parse task and per COPY/INSERT
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def find_tasks(directories, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split the archived files into parse tasks
+
+    Each directory is searched for archive segments, per-day folders of the
+    file-per-fax archive, and loose XML files.
+
+    Args:
+        directories: Directories to read
+        since: First day to include ('YYYY-MM-DD', optional)
+        until: Last day to include ('YYYY-MM-DD', optional)
+        chunk_size: Completions per task
+
+    Yields:
+        tuple: ('segment', directory, name, [(xml entry, history entry or None), ...])
+            or ('files', [(xml path, history path or None), ...])
+    """
+    def in_range(name):
+        day = name[:10]
+        return (not since or day >= since) and (not until or day <= until)
+
+    for directory in directories:
+        archive = SegmentArchive(directory)
+        for name in sorted(archive.segments()):
+            if not in_range(name):
+                continue
+
+            # History files share the job ID of their XML
+            jobs = OrderedDict()
+            for entry in archive.read_index(name):
+                job_id, filename = entry[0], entry[1]
+                slot = 1 if filename.lower().endswith(HISTORY_SUFFIX.lower()) else 0
+                if slot == 0 and not filename.lower().endswith('.xml'):
+                    continue
+                jobs.setdefault(job_id, [None, None])[slot] = entry
+
+            pairs = [tuple(pair) for pair in jobs.values() if pair[0]]
+            for start in range(0, len(pairs), chunk_size):
+                yield 'segment', directory, name, pairs[start:start + chunk_size]
+
+        folders = [directory] + sorted(
+            entry.path for entry in os.scandir(directory)
+            if entry.is_dir() and segment_end(entry.name) and in_range(entry.name)
+        )
+        for folder in folders:
+            with os.scandir(folder) as entries:
+                paths = sorted(entry.path for entry in entries
+                               if entry.is_file() and entry.name.lower().endswith('.xml'))
+            pairs = [(path, history_path_for(path)) for path in paths]
+            for start in range(0, len(pairs), chunk_size):
+                yield 'files', pairs[start:start + chunk_size]
+
+
+def parse_task(task):
+    """
+    Parse one task's files (runs in pool processes)
+
+    Args:
+        task: Task from find_tasks
+
+    Returns:
+        tuple: (completion data list, files rejected)
+    """
+    parser = XMLParser(None)
+    completions = []
+    rejected = 0
+
+    if task[0] == 'segment':
+        _, directory, name, pairs = task
+        archive = SegmentArchive(directory)
+        with open(archive.segment_path(name), 'rb') as segment:
+            for xml_entry, history_entry in pairs:
+                _, filename, offset, length = xml_entry
+                data = parser.parse_content(archive.read_member(segment, offset, length), filename)
+                if not data:
+                    rejected += 1
+                    continue
+                if history_entry:
+                    history = archive.read_member(segment, history_entry[2], history_entry[3])
+                    data['stages'] = parse_history(history.decode('ISO-8859-1'))
+                completions.append(data)
+    else:
+        _, pairs = task
+        for xml_path, history_path in pairs:
+            with open(xml_path, 'rb') as f:
+                data = parser.parse_content(f.read(), xml_path)
+            if not data:
+                rejected += 1
+                continue
+            if history_path:
+                with open(history_path, 'r', encoding='ISO-8859-1') as f:
+                    data['stages'] = parse_history(f.read())
+            completions.append(data)
+
+    return completions, rejected
+
+
+class CompletionLoader:
+    """
+    Loads parsed completions in chunks, skipping job IDs already present
+
+    On PostgreSQL a chunk is COPYed into three ON COMMIT DELETE ROWS
+    temporary tables (completions, compressed XML, stages) and moved into
+    place by one statement whose INSERT ... ON CONFLICT DO NOTHING feeds
+    the side-table inserts through RETURNING. Other databases fall back to
+    XMLParser.store_completions.
+    """
+
+    def __init__(self, engine):
+        """
+        Initialize loader
+
+        Args:
+            engine: SQLAlchemy engine to load into
+        """
+        self.engine = engine
+        self.connection = engine.connect()
+        self.postgres = engine.dialect.name == 'postgresql'
+        if self.postgres:
+            self._create_staging_tables()
+
+    def load(self, completions):
+        """
+        Load one chunk
+
+        Args:
+            completions: Completion data dicts
+
+        Returns:
+            int: Completions inserted (the others already existed)
+        """
+        rows = OrderedDict()
+        for completion in completions:
+            rows.setdefault(completion['rightfax_job_id'], completion)
+        if not rows:
+            return 0
+
+        if not self.postgres:
+            with Session(bind=self.connection) as db:
+                return len(XMLParser(db).store_completions(list(rows.values())))
+
+        parsed_at = datetime.utcnow()
+        for row in rows.values():
+            row['xml_parsed_at'] = parsed_at
+
+        # Old days get their own partitions instead of filling the DEFAULT one
+        days = [row['completed_at'] for row in rows.values() if row.get('completed_at')]
+        if days:
+            ensure_partitions(self.engine, since=min(days), until=max(days), ahead=0)
+
+        with self.connection.begin():
+            cursor = self.connection.connection.cursor()
+            cursor.copy_expert(
+                f"COPY reingest_completions ({', '.join(INGEST_COLUMNS)}) FROM STDIN",
+                _copy_buffer([row.get(name) for name in INGEST_COLUMNS] for row in rows.values())
+            )
+            cursor.copy_expert(
+                "COPY reingest_xml (rightfax_job_id, compressed_xml) FROM STDIN",
+                _copy_buffer([job_id, row['compressed_xml']] for job_id, row in rows.items()
+                             if row.get('compressed_xml'))
+            )
+            cursor.copy_expert(
+                f"COPY reingest_stages (rightfax_job_id, {', '.join(STAGE_FIELDS)}) FROM STDIN",
+                _copy_buffer([job_id] + [stage.get(name) for name in STAGE_FIELDS]
+                             for job_id, row in rows.items() for stage in row.get('stages') or ())
+            )
+
+            inserted = self.connection.execute(text(_MOVE_SQL), {'window': Config.XML_DEDUPE_WINDOW_DAYS}).scalar()
+
+        return inserted
+
+    def close(self):
+        self.connection.close()
+
+    def _create_staging_tables(self):
+        """Temporary tables shaped like the targets, emptied at every commit"""
+        statements = [
+            f"CREATE TEMP TABLE IF NOT EXISTS reingest_completions ON COMMIT DELETE ROWS AS "
+            f"SELECT {', '.join(INGEST_COLUMNS)} FROM fax_completions WITH NO DATA",
+            "CREATE TEMP TABLE IF NOT EXISTS reingest_xml ON COMMIT DELETE ROWS AS "
+            "SELECT rightfax_job_id, compressed_xml FROM fax_completion_xml WITH NO DATA",
+            f"CREATE TEMP TABLE IF NOT EXISTS reingest_stages ON COMMIT DELETE ROWS AS "
+            f"SELECT rightfax_job_id, {', '.join(STAGE_FIELDS)} FROM fax_job_stages WITH NO DATA",
+        ]
+        with self.connection.begin():
+            for statement in statements:
+                self.connection.execute(text(statement))
+
+
+# Moves a staged chunk into place; side rows are written only for new completions.
+# Job IDs stored within XML_DEDUPE_WINDOW_DAYS are skipped, as in store_completions
+_MOVE_SQL = f"""
+WITH inserted AS (
+    INSERT INTO fax_completions ({', '.join(INGEST_COLUMNS)}, submission_id)
+    SELECT {', '.join('r.' + name for name in INGEST_COLUMNS)},
+           COALESCE(
+               (SELECT min(s.id) FROM fax_submissions s WHERE s.rightfax_job_id = r.rightfax_job_id),
+               (SELECT min(s.id) FROM fax_submissions s WHERE s.correlation_token = r.correlation_token)
+           )
+    FROM reingest_completions r
+    WHERE NOT EXISTS (
+        SELECT 1 FROM fax_completions f
+        WHERE f.rightfax_job_id = r.rightfax_job_id
+          AND f.completed_at BETWEEN r.completed_at - make_interval(days => :window)
+                                 AND r.completed_at + make_interval(days => :window)
+    )
+    ON CONFLICT DO NOTHING
+    RETURNING rightfax_job_id, completed_at
+), raw_xml AS (
+    INSERT INTO fax_completion_xml (rightfax_job_id, completed_at, compressed_xml, stored_at)
+    SELECT x.rightfax_job_id, i.completed_at, x.compressed_xml, NOW()
+    FROM reingest_xml x JOIN inserted i USING (rightfax_job_id)
+), stages AS (
+    INSERT INTO fax_job_stages (rightfax_job_id, completed_at, {', '.join(STAGE_FIELDS)})
+    SELECT st.rightfax_job_id, i.completed_at, {', '.join('st.' + name for name in STAGE_FIELDS)}
+    FROM reingest_stages st JOIN inserted i USING (rightfax_job_id)
+)
+SELECT COUNT(*) FROM inserted
+"""
+
+
+def _copy_buffer(rows):
+    """COPY text-format buffer for rows of Python values"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_value(value):
+    """One value in COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def reingest(directories, since=None, until=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, engine=None):
+    """
+    Parse archived completion files and load them into the database
+
+    Args:
+        directories: Directories to read (see find_tasks)
+        since: First day to include ('YYYY-MM-DD', optional)
+        until: Last day to include ('YYYY-MM-DD', optional)
+        workers: Parser processes (defaults to the CPU count)
+        chunk_size: Completions per task and per load
+        engine: SQLAlchemy engine (defaults to the application's)
+
+    Returns:
+        dict: Counts, elapsed seconds and rows per second
+    """
+    if engine is None:
+        from app.database import engine
+
+    workers = workers or os.cpu_count() or 1
+    loader = CompletionLoader(engine)
+    counts = {'parsed': 0, 'rejected': 0, 'inserted': 0}
+    days = set()  # completion days loaded, for the rollup rebuild
+    started = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded number of parsed chunks in flight
+            in_flight = deque()
+            tasks = find_tasks(directories, since, until, chunk_size)
+
+            def drain_one():
+                completions, rejected = in_flight.popleft().result()
+                counts['parsed'] += len(completions)
+                counts['rejected'] += rejected
+                counts['inserted'] += loader.load(completions)
+                days.update(c['completed_at'].date() for c in completions if c.get('completed_at'))
+                elapsed = time.perf_counter() - started
+                logger.info(f"Parsed {counts['parsed']}, inserted {counts['inserted']} "
+                            f"({counts['parsed'] / elapsed:.0f} rows/s)")
+
+            for task in tasks:
+                in_flight.append(executor.submit(parse_task, task))
+                if len(in_flight) >= workers * 2:
+                    drain_one()
+            while in_flight:
+                drain_one()
+    finally:
+        loader.close()
+
+    with Session(bind=engine) as db:
+        XMLParser(db).reconcile_submission_links()
+        # COPY bypasses the ingest-time rollup updates
+        if counts['inserted'] and days:
+            rebuild_rollups(db, min(days), max(days))
+
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        'skipped': counts['parsed'] - counts['inserted'],
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(counts['parsed'] / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.services.reingest',
+                                     description='Rebuild fax_completions from archived completion XML')
+    parser.add_argument('directories', nargs='*',
+                        help='Archive or XML directories to read (default: XML_ARCHIVE_FOLDER)')
+    parser.add_argument('--since', help='First day to reingest (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Last day to reingest (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, help='Parser processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Completions per COPY/INSERT (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--verbose', action='store_true', help='Log per-file parse errors')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        logging.getLogger('app.services.xml_parser').setLevel(logging.CRITICAL)
+
+    directories = args.directories or [Config.XML_ARCHIVE_FOLDER]
+    missing = [directory for directory in directories if not os.path.isdir(directory)]
+    if missing:
+        print(f"Not a directory: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    result = reingest(directories, args.since, args.until, args.workers, args.chunk_size)
+
+    print(f"Parsed {result['parsed']} completions ({result['rejected']} files rejected)")
+    print(f"Inserted {result['inserted']}, skipped {result['skipped']} already present")
+    print(f"{result['seconds']}s, {result['rows_per_second']} rows/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,21 +2,145 @@
 RightFax REST API Client
 Handles communication with RightFax REST API for fax submission
 """
+import os
+import time
+import random
 import requests
 import logging
 import base64
+import json
+import threading
 from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
 
+class PreparedAttachment:
+    """
+    Attachment read and base64-encoded once, then shared by every send
+
+    Documents larger than the stream threshold are never held in memory;
+    their base64 is produced from the file chunk by chunk as each request
+    body is sent.
+    """
+
+    # Multiple of 3 so each chunk encodes to base64 without padding
+    READ_CHUNK_BYTES = 3 * 16384
+    BODY_CHUNK_BYTES = 65536
+
+    def __init__(self, path, content_type, stream_threshold=None):
+        """
+        Initialize prepared attachment
+
+        Args:
+            path: Path to attachment file
+            content_type: MIME content type
+            stream_threshold: Size in bytes above which the file is streamed
+                (defaults to config)
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        threshold = stream_threshold if stream_threshold is not None else Config.RIGHTFAX_STREAM_THRESHOLD_BYTES
+
+        self.path = path
+        self.filename = path.split('/')[-1]
+        self.content_type = content_type
+        self.size = os.path.getsize(path)
+        self.encoded_size = 4 * ((self.size + 2) // 3)
+        self.streaming = self.size > threshold
+        self._encoded = None
+
+        if not self.streaming:
+            with open(path, 'rb') as f:
+                self._encoded = base64.b64encode(f.read())
+
+        logger.info(f"Prepared attachment {self.filename} ({self.size} bytes, "
+                    f"{'streamed' if self.streaming else 'encoded once'})")
+
+    def body(self, payload: Dict) -> 'JSONBodyReader':
+        """
+        Build a request body for payload with this attachment as its document
+
+        Args:
+            payload: Request payload without a 'document' key
+
+        Returns:
+            JSONBodyReader: Streamable body with a known length
+        """
+        document_head = json.dumps({
+            'filename': self.filename,
+            'contentType': self.content_type
+        })[:-1] + ', "base64": "'
+
+        prefix = (json.dumps(payload)[:-1] + ', "document": ' + document_head).encode('utf-8')
+        suffix = b'"}}'
+
+        return JSONBodyReader(prefix, self._iter_encoded(), suffix,
+                              len(prefix) + self.encoded_size + len(suffix))
+
+    def _iter_encoded(self):
+        """Yield the base64 document in chunks"""
+        if self._encoded is not None:
+            view = memoryview(self._encoded)
+            for offset in range(0, len(view), self.BODY_CHUNK_BYTES):
+                yield view[offset:offset + self.BODY_CHUNK_BYTES]
+            return
+
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(self.READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+
+
+class JSONBodyReader:
+    """
+    File-like request body assembled from a prefix, document chunks and a suffix
+
+    Exposes read() and __len__ so requests sends it with a Content-Length
+    header instead of building the whole body in memory.
+    """
+
+    def __init__(self, prefix, chunks, suffix, length):
+        self._length = length
+        self._chunks = self._iter_all(prefix, chunks, suffix)
+
+    @staticmethod
+    def _iter_all(prefix, chunks, suffix):
+        yield prefix
+        yield from chunks
+        yield suffix
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield bytes(chunk)
+
+    def read(self, size=-1):
+        """Return the next chunk of the body, or b'' at the end"""
+        return bytes(next(self._chunks, b''))
+
+
 class RightFaxAPIClient:
     """
     Client for RightFax REST API
+
+    Use get_api_client() to share one client, and its keep-alive connection
+    pool, across every batch a worker process submits.
     """
 
-    def __init__(self, api_url=None, username=None, password=None, ssl_verify=None):
+    # Throttling and transient server errors worth retrying
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_url=None, username=None, password=None, ssl_verify=None,
+                 pool_size=None, max_retries=None):
         """
         Initialize API client
 
@@ -25,12 +149,35 @@ class RightFaxAPIClient:
             username: RightFax API username (defaults to config)
             password: RightFax API password (defaults to config)
             ssl_verify: Whether to verify SSL certificates (defaults to config)
+            pool_size: Keep-alive connections kept per host (defaults to config)
+            max_retries: Retries per request (defaults to config)
         """
         self.api_url = (api_url or Config.RIGHTFAX_API_URL).rstrip('/')
         self.username = username or Config.RIGHTFAX_USERNAME
         self.password = password or Config.RIGHTFAX_PASSWORD
         self.ssl_verify = ssl_verify if ssl_verify is not None else Config.RIGHTFAX_SSL_VERIFY
+        self.pool_size = pool_size or Config.RIGHTFAX_API_POOL_SIZE
+        self.max_retries = max_retries if max_retries is not None else Config.RIGHTFAX_API_MAX_RETRIES
+        self.retries = 0
+
+        # urllib3 only retries failed connects, where nothing has been sent.
+        # Status and connection-reset retries happen in submit_fax, which
+        # rebuilds streamed attachment bodies for every attempt.
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=Retry(
+                total=self.max_retries,
+                connect=self.max_retries,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=Config.RIGHTFAX_API_BACKOFF_SECONDS
+            )
+        )
         self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
         self.session.headers.update({
             'Content-Type': 'application/json',
             'Accept': 'application/json'
@@ -57,7 +204,8 @@ class RightFaxAPIClient:
                   recipient_name: Optional[str] = None,
                   subject: Optional[str] = None,
                   priority: str = 'NORMAL',
-                  coverpage: Optional[str] = None) -> Dict:
+                  coverpage: Optional[str] = None,
+                  attachment: Optional[PreparedAttachment] = None) -> Dict:
         """
         Submit a fax via RightFax REST API
 
@@ -69,6 +217,8 @@ class RightFaxAPIClient:
             subject: Fax subject
             priority: Priority level (LOW, NORMAL, HIGH)
             coverpage: Cover page template name
+            attachment: Attachment from prepare_attachment, used instead of
+                attachment_path to avoid re-reading and re-encoding the file
 
         Returns:
             dict: API response with job_id and status_code
@@ -77,6 +227,142 @@ class RightFaxAPIClient:
             ValueError: If required parameters missing
             requests.RequestException: If API call fails
         """
+        payload = self.build_payload(
+            recipient_phone=recipient_phone,
+            account_name=account_name,
+            attachment_path=None if attachment else attachment_path,
+            recipient_name=recipient_name,
+            subject=subject,
+            priority=priority,
+            coverpage=coverpage
+        )
+
+        endpoint = f"{self.api_url}/faxes"
+
+        logger.info(f"Submitting fax to {recipient_phone} via API")
+        logger.debug(f"API endpoint: {endpoint}")
+
+        # Make API request, retrying throttling, server errors and resets
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Session already has auth configured in __init__
+                if attachment:
+                    response = self.session.post(
+                        endpoint,
+                        data=attachment.body(payload),
+                        timeout=30,
+                        verify=self.ssl_verify
+                    )
+                else:
+                    response = self.session.post(
+                        endpoint,
+                        json=payload,
+                        timeout=30,
+                        verify=self.ssl_verify
+                    )
+
+            except requests.exceptions.ConnectionError as e:
+                if attempt < self.max_retries:
+                    self._backoff(attempt, reason=str(e))
+                    continue
+                logger.error(f"API request failed: {e}")
+                raise
+            except requests.exceptions.Timeout:
+                logger.error("API request timed out")
+                raise
+            except requests.exceptions.RequestException as e:
+                logger.error(f"API request failed: {e}")
+                raise
+
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                self._backoff(attempt, response.headers.get('Retry-After'),
+                              reason=f"HTTP {response.status_code}")
+                continue
+
+            return self.parse_submit_response(response.status_code, response.text)
+
+    def retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Seconds to wait before retry number attempt + 1
+
+        Exponential backoff with full jitter, so that many workers throttled
+        at once do not retry in lockstep. A numeric Retry-After header is
+        honoured as a minimum. Both are capped at the configured maximum.
+
+        Args:
+            attempt: Zero-based number of the failed attempt
+            retry_after: Retry-After response header, if any
+
+        Returns:
+            float: Delay in seconds
+        """
+        ceiling = min(Config.RIGHTFAX_API_BACKOFF_MAX_SECONDS,
+                      Config.RIGHTFAX_API_BACKOFF_SECONDS * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+
+        return min(delay, Config.RIGHTFAX_API_BACKOFF_MAX_SECONDS)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None, reason: str = ''):
+        """Count a retry and sleep for its backoff delay"""
+        delay = self.retry_delay(attempt, retry_after)
+        self.retries += 1
+        logger.warning(f"Retrying fax submission in {delay:.2f}s "
+                       f"(attempt {attempt + 2}/{self.max_retries + 1}): {reason}")
+        time.sleep(delay)
+
+    def pool_stats(self) -> Dict:
+        """
+        Connection pool and reuse statistics
+
+        Every opened connection costs a TCP (and TLS) handshake; a reuse
+        ratio near 1 means keep-alive is working.
+
+        Returns:
+            dict: Pool statistics
+        """
+        poolmanager = self.adapter.poolmanager
+        pools = [poolmanager.pools[key] for key in poolmanager.pools.keys()]
+        sent = sum(pool.num_requests for pool in pools)
+        opened = sum(pool.num_connections for pool in pools)
+
+        return {
+            'engine': 'sync',
+            'pool_size': self.pool_size,
+            'requests': sent,
+            'connections_opened': opened,
+            'connections_reused': max(sent - opened, 0),
+            'reuse_ratio': round(1 - opened / sent, 4) if sent else None,
+            'idle_connections': sum(
+                1 for pool in pools if pool.pool is not None
+                for conn in list(pool.pool.queue) if conn is not None
+            ),
+            'retries': self.retries
+        }
+
+    def build_payload(self, recipient_phone: str, account_name: str,
+                      attachment_path: Optional[str] = None,
+                      recipient_name: Optional[str] = None,
+                      subject: Optional[str] = None,
+                      priority: str = 'NORMAL',
+                      coverpage: Optional[str] = None) -> Dict:
+        """
+        Build the JSON payload for a fax submission
+
+        Shared by the synchronous client and the asyncio engine so both
+        send identical requests.
+
+        Returns:
+            dict: Request payload
+
+        Raises:
+            ValueError: If required parameters missing
+        """
         if not recipient_phone:
             raise ValueError("recipient_phone is required")
         if not account_name:
@@ -121,49 +407,55 @@ class RightFaxAPIClient:
                 logger.error(f"Error encoding attachment {attachment_path}: {e}")
                 raise
 
-        # Make API request
+        return payload
+
+    def prepare_attachment(self, attachment_path: str) -> PreparedAttachment:
+        """
+        Read and encode an attachment once for a whole batch
+
+        Args:
+            attachment_path: Path to attachment file
+
+        Returns:
+            PreparedAttachment: Pass to submit_fax(attachment=...)
+        """
         try:
-            endpoint = f"{self.api_url}/faxes"
+            return PreparedAttachment(attachment_path, self._get_content_type(attachment_path))
+        except Exception as e:
+            logger.error(f"Error encoding attachment {attachment_path}: {e}")
+            raise
 
-            logger.info(f"Submitting fax to {recipient_phone} via API")
-            logger.debug(f"API endpoint: {endpoint}")
+    def parse_submit_response(self, status_code: int, body: str) -> Dict:
+        """
+        Convert a fax submission HTTP response into the result dict
 
-            # Session already has auth configured in __init__
-            response = self.session.post(
-                endpoint,
-                json=payload,
-                timeout=30,
-                verify=self.ssl_verify
-            )
+        Args:
+            status_code: HTTP status code
+            body: Response body text
 
-            # Check response
-            if response.status_code in [200, 201]:
-                response_data = response.json()
-                job_id = response_data.get('jobId') or response_data.get('id')
+        Returns:
+            dict: API response with job_id and status_code
+        """
+        if status_code in [200, 201]:
+            response_data = json.loads(body)
+            job_id = response_data.get('jobId') or response_data.get('id')
 
-                logger.info(f"Fax submitted successfully: Job ID {job_id}")
+            logger.info(f"Fax submitted successfully: Job ID {job_id}")
 
-                return {
-                    'success': True,
-                    'job_id': job_id,
-                    'status_code': response.status_code,
-                    'response': response_data
-                }
-            else:
-                logger.error(f"API request failed: {response.status_code} - {response.text}")
-                return {
-                    'success': False,
-                    'job_id': None,
-                    'status_code': response.status_code,
-                    'error': response.text
-                }
+            return {
+                'success': True,
+                'job_id': job_id,
+                'status_code': status_code,
+                'response': response_data
+            }
 
-        except requests.exceptions.Timeout:
-            logger.error("API request timed out")
-            raise
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            raise
+        logger.error(f"API request failed: {status_code} - {body}")
+        return {
+            'success': False,
+            'job_id': None,
+            'status_code': status_code,
+            'error': body
+        }
 
     def get_fax_status(self, job_id: str) -> Dict:
         """
@@ -230,3 +522,32 @@ class RightFaxAPIClient:
         except Exception as e:
             logger.error(f"API connection test failed: {e}")
             return False
+
+
+# One client per process, so keep-alive connections outlive a single batch
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_api_client() -> RightFaxAPIClient:
+    """
+    Get this process's shared API client, creating it on first use
+
+    Returns:
+        RightFaxAPIClient: Client configured from Config
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = RightFaxAPIClient()
+        return _shared_client
+
+
+def _reset_after_fork():
+    # Pooled sockets must not be shared with the parent process
+    global _shared_client, _shared_client_lock
+    _shared_client = None
+    _shared_client_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,191 @@
+"""
+Asynchronous RightFax REST API Client
+Submits faxes with many requests in flight using asyncio and aiohttp
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+import aiohttp
+from app.services.rightfax_api import RightFaxAPIClient, PreparedAttachment, get_api_client
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRightFaxAPIClient:
+    """
+    asyncio client for the RightFax REST API
+
+    Payloads, results and retry backoff come from RightFaxAPIClient, so
+    submissions are indistinguishable from the synchronous path.
+
+    Usage:
+        async with AsyncRightFaxAPIClient(concurrency=50) as client:
+            result = await client.submit_fax(...)
+    """
+
+    def __init__(self, concurrency=10, api_url=None, username=None, password=None,
+                 ssl_verify=None, timeout=30):
+        """
+        Initialize async API client
+
+        Args:
+            concurrency: Maximum simultaneous connections to RightFax
+            api_url: RightFax API base URL (defaults to config)
+            username: RightFax API username (defaults to config)
+            password: RightFax API password (defaults to config)
+            ssl_verify: Whether to verify SSL certificates (defaults to config)
+            timeout: Total request timeout in seconds
+        """
+        if api_url is None and username is None and password is None and ssl_verify is None:
+            self.sync_client = get_api_client()
+        else:
+            self.sync_client = RightFaxAPIClient(
+                api_url=api_url,
+                username=username,
+                password=password,
+                ssl_verify=ssl_verify
+            )
+        self.api_url = self.sync_client.api_url
+        self.max_retries = self.sync_client.max_retries
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = None
+
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.retries = 0
+
+    async def _on_connection_create(self, session, context, params):
+        self.connections_opened += 1
+
+    async def _on_connection_reuse(self, session, context, params):
+        self.connections_reused += 1
+
+    def pool_stats(self) -> Dict:
+        """
+        Connection reuse statistics for this session
+
+        Returns:
+            dict: Pool statistics in the same shape as RightFaxAPIClient.pool_stats
+        """
+        sent = self.connections_opened + self.connections_reused
+        return {
+            'engine': 'async',
+            'pool_size': self.concurrency,
+            'requests': sent,
+            'connections_opened': self.connections_opened,
+            'connections_reused': self.connections_reused,
+            'reuse_ratio': round(self.connections_reused / sent, 4) if sent else None,
+            'retries': self.retries
+        }
+
+    async def __aenter__(self):
+        auth = None
+        if self.sync_client.username and self.sync_client.password:
+            auth = aiohttp.BasicAuth(self.sync_client.username, self.sync_client.password)
+
+        self.session = aiohttp.ClientSession(
+            auth=auth,
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency,
+                ssl=None if self.sync_client.ssl_verify else False
+            ),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Accept': 'application/json'},
+            trace_configs=[self._trace_config()]
+        )
+        return self
+
+    def _trace_config(self):
+        """Count new and reused connections"""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        return trace_config
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.session.close()
+        self.session = None
+        return False
+
+    async def submit_fax(self, recipient_phone: str, account_name: str,
+                         attachment_path: Optional[str] = None,
+                         recipient_name: Optional[str] = None,
+                         subject: Optional[str] = None,
+                         priority: str = 'NORMAL',
+                         coverpage: Optional[str] = None,
+                         attachment: Optional[PreparedAttachment] = None) -> Dict:
+        """
+        Submit a fax via RightFax REST API
+
+        Args match RightFaxAPIClient.submit_fax.
+
+        Returns:
+            dict: API response with job_id and status_code
+
+        Raises:
+            ValueError: If required parameters missing
+            aiohttp.ClientError, asyncio.TimeoutError: If API call fails
+        """
+        payload = self.sync_client.build_payload(
+            recipient_phone=recipient_phone,
+            account_name=account_name,
+            attachment_path=None if attachment else attachment_path,
+            recipient_name=recipient_name,
+            subject=subject,
+            priority=priority,
+            coverpage=coverpage
+        )
+
+        endpoint = f"{self.api_url}/faxes"
+        logger.debug(f"Submitting fax to {recipient_phone} via async API")
+
+        # Retry throttling, server errors and resets like the sync client
+        for attempt in range(self.max_retries + 1):
+            if attachment:
+                body = attachment.body(payload)
+                request = self.session.post(endpoint, data=_aiter_body(body), headers={
+                    'Content-Type': 'application/json',
+                    'Content-Length': str(len(body))
+                })
+            else:
+                request = self.session.post(endpoint, json=payload)
+
+            try:
+                async with request as response:
+                    text = await response.text()
+                    retry_after = response.headers.get('Retry-After')
+                    status = response.status
+
+            except asyncio.TimeoutError:
+                logger.error("API request timed out")
+                raise
+            except aiohttp.ClientConnectionError as e:
+                if attempt < self.max_retries:
+                    await self._backoff(attempt, reason=str(e) or type(e).__name__)
+                    continue
+                logger.error(f"API request failed: {e}")
+                raise
+            except aiohttp.ClientError as e:
+                logger.error(f"API request failed: {e}")
+                raise
+
+            if status in RightFaxAPIClient.RETRY_STATUSES and attempt < self.max_retries:
+                await self._backoff(attempt, retry_after, reason=f"HTTP {status}")
+                continue
+
+            return self.sync_client.parse_submit_response(status, text)
+
+    async def _backoff(self, attempt, retry_after=None, reason=''):
+        """Count a retry and sleep for its backoff delay"""
+        delay = self.sync_client.retry_delay(attempt, retry_after)
+        self.retries += 1
+        logger.warning(f"Retrying fax submission in {delay:.2f}s "
+                       f"(attempt {attempt + 2}/{self.max_retries + 1}): {reason}")
+        await asyncio.sleep(delay)
+
+
+async def _aiter_body(body):
+    """Adapt a JSONBodyReader to the async iterable aiohttp streams from"""
+    for chunk in body:
+        yield chunk
@@ -0,0 +1,508 @@
+"""
+RightFax Simulator
+Stand-in RightFax server for offline end-to-end load tests: serves the REST
+endpoints RightFaxAPIClient calls, consumes FCL files, and writes completion
+XML (and History TXT) files in the RightFax format after a simulated send
+"""
+import os
+import re
+import heapq
+import random
+import uuid
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from aiohttp import web
+from app.config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Completion XML, laid out like the GenText template output in samples/
+XML_TEMPLATE = '''<?xml version="1.0" encoding="ISO-8859-1"?>
+
+<!-- Written by the RightFax simulator (app/services/rightfax_simulator.py) -->
+
+<ImportSession>
+   <Batches>
+      <Batch BatchClassName="{user_id}" Processed="0">
+         <Documents>
+            <Document FormTypeName="Fax DocumentRecieved">
+               <IndexFields>
+                  <IndexField Name="User ID" Value="{user_id}" />
+                  <IndexField Name="Group ID" Value="SIMULATOR" />
+                  <IndexField Name="UniqueID" Value="{unique_id}" />
+                  <IndexField Name="Fax Handle" Value="{fax_handle}" />
+                  <IndexField Name="New Fax Handle" Value="" />
+                  <IndexField Name="Fax Channel" Value="{channel}" />
+                  <IndexField Name="Job Create Time" Value="{completed_at}" />
+                  <IndexField Name="Fax Create Time" Value="{created_at}" />
+                  <IndexField Name="Fax Completion Time" Value="{completed_at}" />
+                  <IndexField Name="Fax Server" Value="{server}" />
+                  <IndexField Name="Type" Value="SENDJob" />
+                  <IndexField Name="DID Number" Value="" />
+                  <IndexField Name="Send Duration" Value="{duration}" />
+
+                  <IndexField Name="To Fax Number" Value="{to_number}" />
+                  <IndexField Name="To Voice Number" Value="" />
+                  <IndexField Name="To Name" Value="{to_name}" />
+                  <IndexField Name="To Company" Value="" />
+                  <IndexField Name="To Location" Value="" />
+
+                  <IndexField Name="From Fax Number" Value="" />
+                  <IndexField Name="From Voice Number" Value="" />
+                  <IndexField Name="From Name" Value="" />
+                  <IndexField Name="From Company Voice Number" Value="" />
+                  <IndexField Name="From Company Fax Number" Value="" />
+                  <IndexField Name="BillingInfo 1" Value="{billing_1}" />
+                  <IndexField Name="BillingInfo 2" Value="{billing_2}" />
+                  <IndexField Name="Comments" Value="" />
+                  <IndexField Name="DelegateID" Value="{user_id}" />
+
+                  <IndexField Name="GenericFlag1" Value="False" />
+
+                  <IndexField Name="Board Type" Value="3" />
+                  <IndexField Name="Board Type String" Value="New Brooktrout" />
+                  <IndexField Name="Remote ID" Value="{remote_id}" />
+                  <IndexField Name="Elapsed Time" Value="{duration}" />
+                  <IndexField Name="Bad Page Count" Value="{bad_pages}" />
+                  <IndexField Name="Good Page Count" Value="{good_pages}" />
+                  <IndexField Name="Channel Used" Value="{channel}" />
+                  <IndexField Name="Disposition" Value="{disposition}" />
+                  <IndexField Name="TermStat" Value="{term_stat}" />
+                  <IndexField Name="Remote Server" Value="{server}" />
+
+                  <IndexField Name="ANI is valid" Value="False" />
+                  <IndexField Name="ANI data" Value="" />
+                  <IndexField Name="AOC is valid" Value="False" />
+                  <IndexField Name="AOC data 0" Value="0" />
+                  <IndexField Name="AOC data 1" Value="0" />
+                  <IndexField Name="AOC data 2" Value="0" />
+
+                  <IndexField Name="ISDN Cause is Valid" Value="False" />
+                  <IndexField Name="ISDN Cause Value" Value="0" />
+                  <IndexField Name="Brooktrout Call Status" Value="0" />
+                  <IndexField Name="Brooktrout Call Line Status" Value="339" />
+                  <IndexField Name="Brooktrout Fax Status" Value="0" />
+                  <IndexField Name="Brooktrout Fax Line Status" Value="0" />
+
+                  <IndexField Name="Gamma Error" Value="0" />
+
+                  <IndexField Name="RFConnect JobID" Value="" />
+                  <IndexField Name="TransferDelegateID" Value="{user_id}" />
+               </IndexFields>
+               <Pages>
+                  <Page ImportFileName="{unique_id}_{remote_id}.tif" />
+                  <Page HistoryFilename="{unique_id}_{remote_id}_History.TXT" />
+               </Pages>
+            </Document>
+         </Documents>
+      </Batch>
+   </Batches>
+</ImportSession>
+'''
+
+HISTORY_TEMPLATE = '''{created_short} Origin
+ Created by {user_id}
+
+ {created_short} Conversion
+	Successfully created cover sheet.
+	Type: application/postscript
+	G3 to TIFF #1: Success [image/g3] ({g3_ms}ms)
+	GhostScript TIFF #1: Success [image/tiff] ({ghostscript_ms}ms)
+	({server}:{work_server})
+
+ {completed_short} Transmission
+	Sent to: {to_name}
+	Phone: {to_number}
+	Billing information: '{billing_1}', '{billing_2}'
+	Remote ID: {remote_id}
+	Unique ID: "{unique_id}"
+	Elapsed time: {minutes} minutes, {seconds} seconds.
+	Used channel {channel} on server "{server}".
+	No ANI data.
+	No AOC data.
+	ECM
+	Resulting status code ({disposition}/{term_stat}; 0/0): {status_text}
+	Pages sent: 1 - {good_pages}
+	Sent by: "{user_id}"
+'''
+
+# (Disposition, TermStat, description) of simulated failed sends
+FAILURE_CODES = [
+    (1, 2, 'No answer'),
+    (1, 3, 'Busy'),
+    (1, 17, 'No fax tone detected'),
+    (1, 40, 'Transmission error'),
+]
+
+FCL_COMMAND = re.compile(r'\{\{\s*([\w-]+)\s*(.*?)\s*\}\}')
+
+
+class Distribution:
+    """
+    Random value distribution parsed from a spec string
+
+    Specs:
+        fixed:<value>
+        uniform:<low>:<high>
+        normal:<mean>:<stddev>        (clipped at zero)
+        exponential:<mean>
+    """
+
+    KINDS = ('fixed', 'uniform', 'normal', 'exponential')
+
+    def __init__(self, kind, params):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution {kind} (expected one of {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parse a distribution spec such as 'normal:50:15'
+
+        Raises:
+            ValueError: If the spec is malformed
+        """
+        kind, *params = str(spec).split(':')
+        try:
+            params = [float(p) for p in params]
+        except ValueError:
+            raise ValueError(f"Invalid distribution parameters in {spec}")
+
+        expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'exponential': 1}.get(kind)
+        if expected is not None and len(params) != expected:
+            raise ValueError(f"Distribution {kind} takes {expected} parameters: {spec}")
+
+        return cls(kind, params)
+
+    def sample(self):
+        """Draw one non-negative value"""
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return random.uniform(*self.params)
+        if self.kind == 'normal':
+            return max(random.gauss(*self.params), 0.0)
+        return random.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+
+
+def parse_http_errors(spec):
+    """
+    Parse an HTTP error mix such as '503:0.01,429:0.02'
+
+    Returns:
+        list: (status_code, probability) tuples
+    """
+    errors = []
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        status, probability = item.split(':')
+        errors.append((int(status), float(probability)))
+    return errors
+
+
+class RightFaxSimulator:
+    """
+    Simulated RightFax server
+
+    Jobs come in through POST /faxes or FCL files and complete after a send
+    duration drawn from send_seconds. With a channel limit, jobs queue for
+    the next free channel like on a real fax board.
+    """
+
+    def __init__(self, fcl_directory=None, xml_directory=None, latency_ms=None,
+                 send_seconds=None, http_errors=None, failure_rate=None,
+                 channels=None, server_name=None, write_history=True):
+        """
+        Initialize simulator
+
+        Args:
+            fcl_directory: Directory to consume FCL files from (defaults to config)
+            xml_directory: Directory to write completion files to (defaults to config)
+            latency_ms: API response latency distribution spec (defaults to config)
+            send_seconds: Fax send duration distribution spec (defaults to config)
+            http_errors: API error mix spec, e.g. '503:0.01' (defaults to config)
+            failure_rate: Fraction of sends that fail (defaults to config)
+            channels: Simultaneous sends, 0 for unlimited (defaults to config)
+            server_name: Fax server name written to XML (defaults to config)
+            write_history: Also write a History TXT per job
+        """
+        self.fcl_directory = fcl_directory or Config.RIGHTFAX_FCL_DIRECTORY
+        self.xml_directory = xml_directory or Config.RIGHTFAX_XML_DIRECTORY
+        self.latency = Distribution.parse(latency_ms or Config.SIMULATOR_LATENCY_MS)
+        self.send_seconds = Distribution.parse(send_seconds or Config.SIMULATOR_SEND_SECONDS)
+        self.http_errors = parse_http_errors(http_errors if http_errors is not None else Config.SIMULATOR_HTTP_ERRORS)
+        self.failure_rate = failure_rate if failure_rate is not None else Config.SIMULATOR_FAILURE_RATE
+        self.channels = channels if channels is not None else Config.SIMULATOR_CHANNELS
+        self.server_name = server_name or Config.SIMULATOR_SERVER_NAME
+        self.write_history = write_history
+
+        self.jobs = OrderedDict()
+        self.counters = {'api_submitted': 0, 'api_errors': 0, 'fcl_consumed': 0,
+                         'completed': 0, 'failed': 0}
+        self._handles = itertools.count(1)
+        self._channel_free = [(0.0, channel) for channel in range(1, self.channels + 1)]
+        self._loop = None
+
+        for directory in (self.fcl_directory, self.xml_directory):
+            Path(directory).mkdir(parents=True, exist_ok=True)
+
+    def create_app(self):
+        """Build the aiohttp application"""
+        app = web.Application(client_max_size=Config.MAX_CONTENT_LENGTH * 2)
+        app.router.add_post('/faxes', self.handle_submit)
+        app.router.add_get('/faxes/{job_id}', self.handle_get)
+        app.router.add_get('/health', self.handle_health)
+        app.on_startup.append(self._start_background)
+        app.on_cleanup.append(self._stop_background)
+        return app
+
+    async def _start_background(self, app):
+        self._loop = asyncio.get_running_loop()
+        app['fcl_consumer'] = asyncio.create_task(self.consume_fcl())
+
+    async def _stop_background(self, app):
+        app['fcl_consumer'].cancel()
+
+    async def handle_submit(self, request):
+        """POST /faxes"""
+        await asyncio.sleep(self.latency.sample() / 1000)
+
+        roll = random.random()
+        for status, probability in self.http_errors:
+            if roll < probability:
+                self.counters['api_errors'] += 1
+                headers = {'Retry-After': '1'} if status in (429, 503) else None
+                return web.json_response({'error': 'Simulated error'}, status=status, headers=headers)
+            roll -= probability
+
+        try:
+            payload = await request.json()
+            number = payload['recipient']['number']
+            account = payload['sender']['account']
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({'error': 'recipient.number and sender.account are required'}, status=400)
+
+        job = self.accept_job(
+            prefix='API',
+            to_number=number,
+            user_id=account,
+            to_name=payload['recipient'].get('name', '')
+        )
+        self.counters['api_submitted'] += 1
+
+        return web.json_response({'id': job['unique_id'], 'jobId': job['unique_id'],
+                                  'status': job['status']}, status=201)
+
+    async def handle_get(self, request):
+        """GET /faxes/<id>"""
+        job = self.jobs.get(request.match_info['job_id'])
+        if not job:
+            return web.json_response({'error': 'Job not found'}, status=404)
+        return web.json_response({
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in job.items()
+        })
+
+    async def handle_health(self, request):
+        """GET /health"""
+        return web.json_response({'status': 'ok', 'jobs_tracked': len(self.jobs), **self.counters})
+
+    async def consume_fcl(self):
+        """Pick up FCL files the way RightFax does: parse, then delete"""
+        logger.info(f"Consuming FCL files from {self.fcl_directory}")
+
+        while True:
+            try:
+                with os.scandir(self.fcl_directory) as entries:
+                    names = [entry.name for entry in entries
+                             if entry.is_file() and entry.name.lower().endswith('.fcl')]
+
+                for name in names:
+                    self._consume_fcl_file(os.path.join(self.fcl_directory, name))
+
+            except Exception as e:
+                logger.error(f"Error scanning FCL directory {self.fcl_directory}: {e}")
+
+            await asyncio.sleep(Config.SIMULATOR_FCL_POLL_SECONDS)
+
+    def _consume_fcl_file(self, path):
+        """Turn one FCL file into a job"""
+        try:
+            with open(path, 'r') as f:
+                commands = {name.lower(): value for name, value in FCL_COMMAND.findall(f.read())}
+            os.remove(path)
+        except OSError as e:
+            logger.error(f"Error reading FCL file {path}: {e}")
+            return
+
+        if 'fax' not in commands:
+            logger.warning(f"FCL file {path} has no fax command, ignored")
+            return
+
+        self.accept_job(
+            prefix='FCL',
+            to_number=commands['fax'],
+            user_id=commands.get('winsecid', ''),
+            to_name=commands.get('to-name', ''),
+            billing_1=commands.get('billinfo1', ''),
+            billing_2=commands.get('billinfo2', '')
+        )
+        self.counters['fcl_consumed'] += 1
+
+    def accept_job(self, prefix, to_number, user_id, to_name='', billing_1='', billing_2=''):
+        """
+        Queue a fax and schedule its completion
+
+        Returns:
+            dict: Job record
+        """
+        now = datetime.now()
+        duration = self.send_seconds.sample()
+        start_delay, channel = self._reserve_channel(duration)
+
+        job = {
+            'unique_id': f"{prefix}{uuid.uuid4().hex[:12].upper()}",
+            'fax_handle': f"{next(self._handles):08d}",
+            'status': 'Queued',
+            'to_number': to_number,
+            'to_name': to_name,
+            'user_id': user_id,
+            'billing_1': billing_1,
+            'billing_2': billing_2,
+            'channel': channel,
+            'created_at': now,
+            'completed_at': now + timedelta(seconds=start_delay + duration),
+            'duration_seconds': int(round(duration))
+        }
+
+        self.jobs[job['unique_id']] = job
+        while len(self.jobs) > Config.SIMULATOR_MAX_JOBS:
+            self.jobs.popitem(last=False)
+
+        self._loop.call_later(start_delay + duration, self._complete, job)
+        return job
+
+    def _reserve_channel(self, duration):
+        """
+        Book the next free channel
+
+        Returns:
+            tuple: (seconds until the send starts, channel number)
+        """
+        if not self.channels:
+            return 0.0, random.randint(1, 24)
+
+        now = self._loop.time()
+        free_at, channel = heapq.heappop(self._channel_free)
+        start = max(now, free_at)
+        heapq.heappush(self._channel_free, (start + duration, channel))
+        return start - now, channel
+
+    def _complete(self, job):
+        """Finish a job and write its completion files"""
+        if random.random() < self.failure_rate:
+            disposition, term_stat, status_text = random.choice(FAILURE_CODES)
+            good_pages = 0
+            self.counters['failed'] += 1
+        else:
+            disposition, term_stat, status_text = 0, 32, 'Success'
+            good_pages = random.randint(1, 3)
+            self.counters['completed'] += 1
+
+        job['status'] = 'Succeeded' if disposition == 0 else 'Failed'
+
+        xml, history = render_completion(job, self.server_name, disposition, term_stat,
+                                         status_text, good_pages)
+
+        # Written in place like RightFax does, so the watcher's handling of
+        # files still being written is exercised too
+        base = os.path.join(self.xml_directory, f"{job['unique_id']}_Fax Server")
+        try:
+            if self.write_history:
+                _write_file(base + '_History.TXT', history)
+            _write_file(base + '.XML', xml)
+        except OSError as e:
+            logger.error(f"Error writing completion for job {job['unique_id']}: {e}")
+
+
+def render_completion(job, server_name, disposition=0, term_stat=32, status_text='Success',
+                      good_pages=1):
+    """
+    Render the completion XML and History TXT for a job
+
+    Args:
+        job: Job record as built by RightFaxSimulator.accept_job
+        server_name: Fax server name
+        disposition: RightFax Disposition code (0 = sent)
+        term_stat: RightFax TermStat code
+        status_text: Result description for the history file
+        good_pages: Pages sent
+
+    Returns:
+        tuple: (xml, history) file contents
+    """
+    minutes, seconds = divmod(job['duration_seconds'], 60)
+    fields = {
+        **job,
+        'server': server_name,
+        'remote_id': 'Fax Server',
+        'created_at': job['created_at'].strftime('%m/%d/%Y %I:%M:%S %p'),
+        'completed_at': job['completed_at'].strftime('%m/%d/%Y %I:%M:%S %p'),
+        'created_short': job['created_at'].strftime('%m/%d/%Y %I:%M %p'),
+        'completed_short': job['completed_at'].strftime('%m/%d/%Y %I:%M %p'),
+        'duration': f"{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}",
+        'minutes': minutes,
+        'seconds': seconds,
+        'disposition': disposition,
+        'term_stat': term_stat,
+        'status_text': status_text,
+        'good_pages': good_pages,
+        'bad_pages': 0,
+        # Conversion timings and work server for the History TXT
+        'work_server': f"WORKSRV{random.randint(1, 3)}",
+        'g3_ms': random.randint(2, 400),
+        'ghostscript_ms': random.randint(50, 600)
+    }
+    for key in ('to_number', 'to_name', 'user_id', 'billing_1', 'billing_2'):
+        fields[key] = _xml_escape(fields[key])
+
+    return XML_TEMPLATE.format(**fields), HISTORY_TEMPLATE.format(**fields)
+
+
+def _xml_escape(value):
+    """Escape a value for an XML attribute"""
+    return (str(value).replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def _write_file(path, content):
+    """Write a completion file in RightFax's encoding"""
+    with open(path, 'w', encoding='ISO-8859-1', errors='replace') as f:
+        f.write(content)
+
+
+def run_simulator(port=None):
+    """
+    Run the simulator until interrupted
+    """
+    simulator = RightFaxSimulator()
+    port = port or Config.SIMULATOR_PORT
+
+    logger.info(f"Starting RightFax simulator on port {port}: "
+                f"FCL {simulator.fcl_directory} -> XML {simulator.xml_directory}")
+
+    web.run_app(simulator.create_app(), port=port, print=None, access_log=None)
+
+
+if __name__ == '__main__':
+    run_simulator()
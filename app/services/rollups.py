@@ -0,0 +1,335 @@
+"""
+Completion Rollups
+Per-minute, per-hour and per-day completion counters by account, fax server
+and channel, updated as completions are stored, so dashboards read a few
+rollup rows per bucket instead of grouping raw fax_completions
+
+Usage:
+    python -m app.services.rollups --since 2025-11-01 --until 2025-11-30
+"""
+import sys
+import argparse
+import logging
+from datetime import datetime, date, timedelta
+from sqlalchemy import select, delete, func, case, and_, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app.config import Config
+from app.models import FaxCompletion, CompletionRollupMinute, CompletionRollupHour, CompletionRollupDay
+
+logger = logging.getLogger(__name__)
+
+# Rollup table per level, finest first
+ROLLUP_LEVELS = {
+    'minute': CompletionRollupMinute,
+    'hour': CompletionRollupHour,
+    'day': CompletionRollupDay,
+}
+
+# Grouping columns besides the bucket; missing values are stored as ''
+ROLLUP_KEYS = ('account_name', 'fax_server', 'fax_channel')
+
+# Upper bounds (seconds) of the duration histogram buckets; longer calls
+# are counted in duration_gt_<last bound>
+DURATION_BUCKETS = (30, 60, 120, 300)
+HISTOGRAM_COLUMNS = tuple(f"duration_le_{bound}" for bound in DURATION_BUCKETS) + (
+    f"duration_gt_{DURATION_BUCKETS[-1]}",
+)
+
+# Columns added together when rows of the same bucket meet
+COUNTER_COLUMNS = ('completions', 'successes', 'duration_count', 'duration_sum',
+                   *HISTOGRAM_COLUMNS, 'pages_transmitted')
+
+# Advisory lock: ingest holds it shared while adding to the counters, a
+# rebuild holds it exclusively while it replaces a day
+_LOCK_KEY = 'rightfax_completion_rollups'
+
+# SQLite stores DateTime as text in this layout, so truncated buckets must match it
+_SQLITE_BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M:00.000000',
+    'hour': '%Y-%m-%d %H:00:00.000000',
+    'day': '%Y-%m-%d 00:00:00.000000',
+}
+
+
+def bucket_start(timestamp, level):
+    """Start of the minute, hour or day a timestamp falls in"""
+    if level == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if level == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def histogram_column(duration_seconds):
+    """Histogram column counting a call of this duration"""
+    for bound in DURATION_BUCKETS:
+        if duration_seconds <= bound:
+            return f"duration_le_{bound}"
+    return HISTOGRAM_COLUMNS[-1]
+
+
+def aggregate(completions, level):
+    """
+    Sum completions into rollup rows
+
+    Args:
+        completions: Completion data dicts (as stored by XMLParser)
+        level: 'minute', 'hour' or 'day'
+
+    Returns:
+        list: Rollup row dicts, sorted by key so concurrent writers lock
+            rows in the same order
+    """
+    buckets = {}
+    for completion in completions:
+        completed_at = completion.get('completed_at')
+        if completed_at is None:
+            continue
+
+        key = (bucket_start(completed_at, level), *((completion.get(name) or '') for name in ROLLUP_KEYS))
+        row = buckets.get(key)
+        if row is None:
+            row = buckets[key] = {
+                'bucket_start': key[0], **dict(zip(ROLLUP_KEYS, key[1:])),
+                **dict.fromkeys(COUNTER_COLUMNS, 0), 'duration_min': None, 'duration_max': None
+            }
+
+        row['completions'] += 1
+        row['pages_transmitted'] += completion.get('pages_transmitted') or 0
+        if not completion.get('success'):
+            continue
+
+        row['successes'] += 1
+        duration = completion.get('duration_seconds')
+        if duration is not None:
+            row['duration_count'] += 1
+            row['duration_sum'] += duration
+            row[histogram_column(duration)] += 1
+            row['duration_min'] = duration if row['duration_min'] is None else min(row['duration_min'], duration)
+            row['duration_max'] = duration if row['duration_max'] is None else max(row['duration_max'], duration)
+
+    return [buckets[key] for key in sorted(buckets)]
+
+
+def apply_rollups(db, completions):
+    """
+    Add newly stored completions to every rollup level
+
+    Runs in the caller's transaction, so the counters commit or roll back
+    together with the completions. Each level takes one multi-row
+    INSERT ... ON CONFLICT DO UPDATE that adds to the existing counters.
+    On PostgreSQL the shared rollup lock is held until that transaction
+    ends, so a concurrent rebuild_rollups never deletes counters that an
+    uncommitted ingest is about to add to.
+
+    Args:
+        db: Database session
+        completions: Completion data dicts that were inserted
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql' and completions:
+        db.execute(text("SELECT pg_advisory_xact_lock_shared(hashtext(:key))"), {'key': _LOCK_KEY})
+    for level, model in ROLLUP_LEVELS.items():
+        rows = aggregate(completions, level)
+        if rows:
+            db.execute(_upsert(model, dialect), rows)
+
+
+def _upsert(model, dialect):
+    """INSERT ... ON CONFLICT DO UPDATE adding to the counters of a rollup table"""
+    table = model.__table__
+    statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table)
+    excluded = statement.excluded
+
+    # least/greatest skip NULLs on Postgres; SQLite's min/max do not, hence coalesce
+    least, greatest = (func.least, func.greatest) if dialect == 'postgresql' else (func.min, func.max)
+    current_min, current_max = table.c.duration_min, table.c.duration_max
+
+    updates = {name: table.c[name] + excluded[name] for name in COUNTER_COLUMNS}
+    updates['duration_min'] = least(func.coalesce(current_min, excluded.duration_min),
+                                    func.coalesce(excluded.duration_min, current_min))
+    updates['duration_max'] = greatest(func.coalesce(current_max, excluded.duration_max),
+                                       func.coalesce(excluded.duration_max, current_max))
+
+    return statement.on_conflict_do_update(index_elements=['bucket_start', *ROLLUP_KEYS], set_=updates)
+
+
+def _truncate(column, level, dialect):
+    """SQL expression truncating a timestamp column to a rollup bucket"""
+    if dialect == 'postgresql':
+        return func.date_trunc(level, column)
+    return func.strftime(_SQLITE_BUCKET_FORMATS[level], column)
+
+
+def _minute_rollup_query(start, end, dialect):
+    """GROUP BY over fax_completions producing minute rollup rows for [start, end)"""
+    c = FaxCompletion.__table__.c
+    succeeded = c.success.is_(True)
+    timed = and_(succeeded, c.duration_seconds.isnot(None))
+
+    def count_if(condition):
+        return func.sum(case((condition, 1), else_=0))
+
+    histogram = []
+    low = None
+    for high in DURATION_BUCKETS:
+        in_bucket = [timed, c.duration_seconds <= high]
+        if low is not None:
+            in_bucket.append(c.duration_seconds > low)
+        histogram.append(count_if(and_(*in_bucket)))
+        low = high
+    histogram.append(count_if(and_(timed, c.duration_seconds > low)))
+
+    minute = _truncate(c.completed_at, 'minute', dialect)
+    keys = [func.coalesce(c[name], '') for name in ROLLUP_KEYS]
+    columns = [
+        func.count(),
+        count_if(succeeded),
+        count_if(timed),
+        func.coalesce(func.sum(case((timed, c.duration_seconds), else_=0)), 0),
+        *histogram,
+        func.coalesce(func.sum(c.pages_transmitted), 0),
+        func.min(case((timed, c.duration_seconds))),
+        func.max(case((timed, c.duration_seconds))),
+    ]
+
+    return (
+        select(minute, *keys, *columns)
+        .where(c.completed_at >= start, c.completed_at < end)
+        .group_by(minute, *keys)
+    )
+
+
+def _coarser_rollup_query(level, start, end, dialect):
+    """GROUP BY over the minute rollups producing hour or day rollup rows for [start, end)"""
+    minute = CompletionRollupMinute.__table__.c
+    bucket = _truncate(minute.bucket_start, level, dialect)
+    keys = [minute[name] for name in ROLLUP_KEYS]
+
+    return (
+        select(bucket, *keys,
+               *[func.sum(minute[name]) for name in COUNTER_COLUMNS],
+               func.min(minute.duration_min), func.max(minute.duration_max))
+        .where(minute.bucket_start >= start, minute.bucket_start < end)
+        .group_by(bucket, *keys)
+    )
+
+
+def rebuild_rollups(db, since, until=None):
+    """
+    Recompute the rollups of whole days from fax_completions
+
+    For completions that did not pass through XMLParser.store_completions:
+    rows loaded by the COPY reingest, and rows stored before the rollup
+    tables existed. Each day is rebuilt in its own transaction: its rollup
+    rows are deleted, the minute level is grouped from fax_completions and
+    the hour and day levels from the minute level. On PostgreSQL each day
+    takes the rollup lock exclusively, so live ingest (apply_rollups) waits
+    for the day to be rebuilt instead of racing it; on SQLite, rebuild
+    days that are not being ingested at the same time.
+
+    Args:
+        db: Database session
+        since: First day (date or datetime)
+        until: Last day, inclusive (defaults to since)
+
+    Returns:
+        int: Days rebuilt
+    """
+    dialect = db.get_bind().dialect.name
+    day = datetime(since.year, since.month, since.day)
+    last = until or since
+    last = datetime(last.year, last.month, last.day)
+    columns = ['bucket_start', *ROLLUP_KEYS, *COUNTER_COLUMNS, 'duration_min', 'duration_max']
+
+    days = 0
+    while day <= last:
+        end = day + timedelta(days=1)
+        try:
+            if dialect == 'postgresql':
+                db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {'key': _LOCK_KEY})
+            for model in ROLLUP_LEVELS.values():
+                db.execute(delete(model).where(model.bucket_start >= day, model.bucket_start < end))
+
+            db.execute(CompletionRollupMinute.__table__.insert().from_select(
+                columns, _minute_rollup_query(day, end, dialect)))
+            for level in ('hour', 'day'):
+                db.execute(ROLLUP_LEVELS[level].__table__.insert().from_select(
+                    columns, _coarser_rollup_query(level, day, end, dialect)))
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        logger.info(f"Rebuilt completion rollups for {day.date()}")
+        day = end
+        days += 1
+
+    return days
+
+
+def prune_rollups(db, minute_days=None, hour_days=None):
+    """
+    Delete fine-grained rollups older than their retention
+
+    Day rollups are kept; they are small and cover long ranges.
+
+    Args:
+        db: Database session
+        minute_days: Days of minute rollups to keep (defaults to config)
+        hour_days: Days of hour rollups to keep (defaults to config)
+
+    Returns:
+        dict: Rows deleted per level
+    """
+    now = datetime.now()
+    retention = {
+        'minute': minute_days or Config.ROLLUP_MINUTE_RETENTION_DAYS,
+        'hour': hour_days or Config.ROLLUP_HOUR_RETENTION_DAYS,
+    }
+
+    deleted = {}
+    try:
+        for level, days in retention.items():
+            model = ROLLUP_LEVELS[level]
+            cutoff = bucket_start(now - timedelta(days=days), 'day')
+            deleted[level] = db.execute(delete(model).where(model.bucket_start < cutoff)).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return deleted
+
+
+def main(argv=None):
+    """Rebuild the rollups of a range of days from fax_completions"""
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description='Rebuild completion rollups from fax_completions')
+    parser.add_argument('--since', required=True, help='First day (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Last day, inclusive (YYYY-MM-DD, defaults to today)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        since = date.fromisoformat(args.since)
+        until = date.fromisoformat(args.until) if args.until else date.today()
+    except ValueError as e:
+        print(f"Invalid date: {e}", file=sys.stderr)
+        return 2
+
+    db = SessionLocal()
+    try:
+        days = rebuild_rollups(db, since, until)
+    finally:
+        db.close()
+
+    print(f"Rebuilt completion rollups for {days} days")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,258 @@
+"""
+Buffered Bulk Writer for Fax Submission Records
+Collects fax_submissions rows in memory and writes them with multi-row
+INSERTs instead of one INSERT and commit per fax
+"""
+import time
+import logging
+from datetime import datetime
+from sqlalchemy import insert, update, select
+from app.config import Config
+from app.models import SubmissionBatch, FaxSubmission, BatchCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionWriter:
+    """
+    Buffers FaxSubmission rows and flushes them in bulk
+
+    Rows are plain dicts rather than ORM objects, so the session identity
+    map does not grow with the batch. A flush is triggered when the buffer
+    reaches flush_size rows or flush_interval seconds have passed since the
+    previous flush, and updates the batch counters in the same transaction.
+
+    When a checkpoint is given, the same transaction also advances its
+    next_index to the first index whose row has not been written, so a
+    resumed chunk continues from the last confirmed submission. The flush
+    reads back the batch status, which makes pause/cancel checks free while
+    rows are flowing.
+
+    A deadline bounds how long the submission loop runs: once the clock
+    passes it the writer reports a stop, the same way as for a pause, so a
+    long paced range can be continued by a fresh task.
+
+    Usage:
+        with SubmissionWriter(db, batch.id) as writer:
+            writer.add(submission_method='FCL', ...)
+    """
+
+    STOP_STATUSES = ('paused', 'cancelled')
+
+    def __init__(self, db_session, batch_id, flush_size=None, flush_interval=None,
+                 clock=time.monotonic, checkpoint_id=None, start=0, step=1, deadline=None):
+        """
+        Initialize writer
+
+        Args:
+            db_session: SQLAlchemy database session
+            batch_id: SubmissionBatch ID the rows belong to
+            flush_size: Rows buffered before a flush (defaults to config)
+            flush_interval: Seconds between time-based flushes (defaults to config)
+            clock: Monotonic time source
+            checkpoint_id: BatchCheckpoint advanced on every flush (optional)
+            start: First index of the range being submitted
+            step: Stride between submitted indexes
+            deadline: Clock value after which the loop should stop (optional)
+        """
+        self.db = db_session
+        self.batch_id = batch_id
+        self.flush_size = flush_size or Config.SUBMISSION_FLUSH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else Config.SUBMISSION_FLUSH_INTERVAL
+        self.clock = clock
+        self.checkpoint_id = checkpoint_id
+        self.step = step
+        self.deadline = deadline
+
+        self.submitted = 0
+        self.failed = 0
+        self.flushed = 0
+        self.next_index = start
+        self.batch_status = None
+        self._rows = []
+        self._done = set()
+        self._last_flush = clock()
+        self._last_status_check = clock()
+
+    def add(self, index=None, **fields):
+        """
+        Buffer one fax_submissions row, flushing when the buffer is due
+
+        Args:
+            index: Position of the fax in the batch; advances next_index once
+                every earlier index in the range has been added
+            **fields: FaxSubmission column values (batch_id is filled in)
+        """
+        self.buffer(index, **fields)
+
+        if (len(self._rows) >= self.flush_size
+                or self.clock() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def buffer(self, index=None, **fields):
+        """
+        Buffer one fax_submissions row without flushing
+
+        For callers that flush from elsewhere, such as the async engine,
+        which must not block its event loop on database writes.
+
+        Args:
+            index: Position of the fax in the batch
+            **fields: FaxSubmission column values (batch_id is filled in)
+        """
+        if index is not None:
+            self._mark_done(index)
+
+        fields['batch_id'] = self.batch_id
+        fields.setdefault('submitted_at', datetime.utcnow())
+        fields.setdefault('submission_status', 'submitted')
+        self._rows.append(fields)
+
+        if fields['submission_status'] == 'failed':
+            self.failed += 1
+        else:
+            self.submitted += 1
+
+    @property
+    def pending(self):
+        """Rows buffered and not yet flushed"""
+        return len(self._rows)
+
+    def _mark_done(self, index):
+        """Advance next_index over contiguous added indexes (sends may finish out of order)"""
+        if index != self.next_index:
+            self._done.add(index)
+            return
+
+        self.next_index += self.step
+        while self.next_index in self._done:
+            self._done.remove(self.next_index)
+            self.next_index += self.step
+
+    def stop_requested(self):
+        """
+        Check whether the batch has been paused or cancelled
+
+        Uses the status read back by the last flush; the database is only
+        queried when neither a flush nor a check happened in the last
+        flush_interval seconds.
+
+        Returns:
+            bool: True if the submission loop should stop (paused,
+                cancelled or past the deadline)
+        """
+        if self.status_check_due():
+            self.refresh_status()
+        return self.stopped
+
+    @property
+    def stopped(self):
+        """True if the last status read saw the batch paused or cancelled, or time is up (no query)"""
+        return self.batch_status in self.STOP_STATUSES or self.out_of_time
+
+    @property
+    def out_of_time(self):
+        """True once the deadline has passed"""
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def status_check_due(self):
+        """True if the batch status was last read flush_interval seconds ago or more"""
+        return self.clock() - self._last_status_check >= self.flush_interval
+
+    def refresh_status(self):
+        """Read the current batch status"""
+        self.batch_status = self.db.execute(
+            select(SubmissionBatch.status).where(SubmissionBatch.id == self.batch_id)
+        ).scalar()
+        self.db.commit()
+        self._last_status_check = self.clock()
+
+    def flush(self):
+        """
+        Write buffered rows, update the batch counters and advance the checkpoint
+
+        Raises:
+            SQLAlchemyError: If the write fails (the buffer is dropped)
+        """
+        self.write(*self.take())
+
+    def take(self):
+        """
+        Detach the buffered rows for a write
+
+        Returns:
+            tuple: (rows, next_index) to pass to write; next_index is the
+                checkpoint position those rows confirm
+        """
+        self._last_flush = self.clock()
+        rows, self._rows = self._rows, []
+        return rows, self.next_index
+
+    def write(self, rows, next_index):
+        """
+        Write rows detached by take, in one transaction with the batch counters
+        and the checkpoint
+
+        Split from take so the async engine can detach rows on its event
+        loop and run the write in an executor thread.
+
+        Args:
+            rows: Rows returned by take
+            next_index: Checkpoint position returned by take
+
+        Raises:
+            SQLAlchemyError: If the write fails (the rows are dropped)
+        """
+        if not rows:
+            return
+
+        submitted = sum(1 for r in rows if r['submission_status'] != 'failed')
+        failed = len(rows) - submitted
+
+        try:
+            self.db.execute(insert(FaxSubmission), rows)
+            status = self.db.execute(
+                update(SubmissionBatch)
+                .where(SubmissionBatch.id == self.batch_id)
+                .values(
+                    submitted_count=SubmissionBatch.submitted_count + submitted,
+                    failed_count=SubmissionBatch.failed_count + failed
+                )
+                .returning(SubmissionBatch.status)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if self.checkpoint_id is not None:
+                self.db.execute(
+                    update(BatchCheckpoint)
+                    .where(BatchCheckpoint.id == self.checkpoint_id)
+                    .values(next_index=next_index, updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+            self.db.commit()
+            self.flushed += len(rows)
+            self.batch_status = status
+            self._last_status_check = self.clock()
+
+            logger.debug(f"Flushed {len(rows)} submission rows for batch {self.batch_id}")
+
+        except Exception as e:
+            logger.error(f"Error flushing {len(rows)} submission rows for batch {self.batch_id}: {e}")
+            self.db.rollback()
+            raise
+
+    def close(self):
+        """Flush any remaining rows"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Rows in the buffer were really submitted, so record them even
+        # when the loop is aborted by an exception
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:
+                raise
+        return False
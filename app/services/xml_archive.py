@@ -0,0 +1,296 @@
+"""
+Segmented XML Archive
+Appends processed completion files to compressed per-day or per-hour
+segment files with a job-ID index, so the archive holds a handful of files
+per day instead of one per fax and retention drops whole segments
+"""
+import os
+import gzip
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from app.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows development hosts
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.xml.gz'
+INDEX_SUFFIX = '.idx'
+
+# Segment name format and length per granularity
+SEGMENT_FORMATS = {
+    'day': ('%Y-%m-%d', timedelta(days=1)),
+    'hour': ('%Y-%m-%dT%H', timedelta(hours=1)),
+}
+
+# Serializes appends when flock is unavailable
+_append_lock = threading.Lock()
+
+
+class SegmentArchive:
+    """
+    Compressed segment archive of processed XML and History TXT files
+
+    Each file is appended to the current segment (<name>.xml.gz) as its own
+    gzip member, so a segment is a valid gzip stream and any one file can
+    be read back from its offset. <name>.idx gets one line per file:
+
+        <job id>\\t<filename>\\t<offset>\\t<length>
+
+    The index line is written after the data, so it never points at a
+    partial member. Appends hold an exclusive flock on the segment, so
+    watcher threads and processes can share the archive directory.
+
+    Usage:
+        archive = SegmentArchive()
+        archive.append([(job_id, '/mnt/rightfax/xml/ABC_Fax Server.XML')])
+        archive.expire(90)
+    """
+
+    def __init__(self, directory=None, segment=None):
+        """
+        Initialize archive
+
+        Args:
+            directory: Archive directory (defaults to config)
+            segment: 'day' or 'hour' (defaults to config)
+        """
+        self.directory = directory or Config.XML_ARCHIVE_FOLDER
+        self.segment = segment or Config.XML_ARCHIVE_SEGMENT
+        if self.segment not in SEGMENT_FORMATS:
+            raise ValueError(f"Unknown archive segment {self.segment} (expected 'day' or 'hour')")
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+
+    def segment_name(self, when=None):
+        """Name of the segment a file archived at when belongs to"""
+        name_format, _ = SEGMENT_FORMATS[self.segment]
+        return (when or datetime.now()).strftime(name_format)
+
+    def append(self, entries):
+        """
+        Append files to the current segment and remove the originals
+
+        Args:
+            entries: (job_id, filepath) tuples
+
+        Returns:
+            int: Files archived
+
+        Raises:
+            OSError: If the segment cannot be written; the originals are kept
+        """
+        name = self.segment_name()
+        segment_path = os.path.join(self.directory, name + SEGMENT_SUFFIX)
+        index_path = os.path.join(self.directory, name + INDEX_SUFFIX)
+
+        members = []
+        for job_id, filepath in entries:
+            try:
+                with open(filepath, 'rb') as f:
+                    members.append((job_id, filepath, gzip.compress(f.read(), mtime=0)))
+            except FileNotFoundError:
+                logger.debug(f"File already archived or removed: {filepath}")
+
+        if not members:
+            return 0
+
+        with open(segment_path, 'ab') as segment, _locked(segment):
+            offset = segment.seek(0, os.SEEK_END)
+            lines = []
+            for job_id, filepath, data in members:
+                segment.write(data)
+                lines.append(f"{job_id}\t{os.path.basename(filepath)}\t{offset}\t{len(data)}\n")
+                offset += len(data)
+            segment.flush()
+            os.fsync(segment.fileno())
+
+            with open(index_path, 'a', encoding='utf-8') as index:
+                index.writelines(lines)
+
+        for _, filepath, _ in members:
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+
+        logger.debug(f"Archived {len(members)} files to {segment_path}")
+        return len(members)
+
+    def find(self, job_id):
+        """
+        Read back the archived files of a job, newest segment first
+
+        Reads only the small index files until the job is found.
+
+        Args:
+            job_id: RightFax job ID
+
+        Returns:
+            list: (filename, content bytes) tuples
+        """
+        for name in sorted(self.segments(), reverse=True):
+            found = [(filename, self.read(name, offset, length))
+                     for entry_job_id, filename, offset, length in self.read_index(name)
+                     if entry_job_id == job_id]
+            if found:
+                return found
+        return []
+
+    def iter_segment(self, name):
+        """
+        Yield every file archived in a segment
+
+        Args:
+            name: Segment name, e.g. '2025-11-14'
+
+        Yields:
+            tuple: (job_id, filename, content bytes)
+        """
+        with open(self.segment_path(name), 'rb') as segment:
+            for job_id, filename, offset, length in self.read_index(name):
+                yield job_id, filename, self.read_member(segment, offset, length)
+
+    def read(self, name, offset, length):
+        """Read one archived file from a segment"""
+        with open(self.segment_path(name), 'rb') as segment:
+            return self.read_member(segment, offset, length)
+
+    @staticmethod
+    def read_member(segment, offset, length):
+        """Read one archived file from an open segment"""
+        segment.seek(offset)
+        return gzip.decompress(segment.read(length))
+
+    def segment_path(self, name):
+        """Path of a segment's data file"""
+        return os.path.join(self.directory, name + SEGMENT_SUFFIX)
+
+    def segments(self):
+        """Names of the segments in the archive"""
+        with os.scandir(self.directory) as entries:
+            return [entry.name[:-len(INDEX_SUFFIX)] for entry in entries
+                    if entry.is_file() and entry.name.endswith(INDEX_SUFFIX)]
+
+    def expire(self, retention_days):
+        """
+        Delete whole segments older than the retention period
+
+        Only the archive directory itself is listed, so the cost grows with
+        the number of segments (days or hours), not archived files. Per-day
+        folders from the file-per-fax archive are removed whole the same way.
+
+        Args:
+            retention_days: Days to keep
+
+        Returns:
+            int: Segments, folders and rejected files deleted
+        """
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        deleted = 0
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.name == 'errors':
+                        deleted += _expire_error_files(entry.path, cutoff)
+                        continue
+                    end = segment_end(entry.name)
+                    if end and end <= cutoff:
+                        shutil.rmtree(entry.path)
+                        deleted += 1
+                    continue
+
+                for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                    if entry.name.endswith(suffix):
+                        end = segment_end(entry.name[:-len(suffix)])
+                        if end and end <= cutoff:
+                            os.remove(entry.path)
+                            if suffix == INDEX_SUFFIX:
+                                deleted += 1
+                        break
+
+        return deleted
+
+    @staticmethod
+    def job_id_for(filepath):
+        """Job ID from a RightFax file name ('<UniqueID>_<server>.XML')"""
+        return os.path.basename(filepath).split('_', 1)[0]
+
+    def read_index(self, name):
+        """(job_id, filename, offset, length) entries of a segment"""
+        entries = []
+        with open(os.path.join(self.directory, name + INDEX_SUFFIX), 'r', encoding='utf-8') as index:
+            for line in index:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 4:
+                    entries.append((parts[0], parts[1], int(parts[2]), int(parts[3])))
+        return entries
+
+
+class _locked:
+    """Exclusive flock on an open file (a process-wide lock without fcntl)"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        if fcntl:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+        else:
+            _append_lock.acquire()
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+        else:
+            _append_lock.release()
+
+
+def segment_end(name):
+    """End time of a segment or per-day folder name, or None if it is not one"""
+    for name_format, length in SEGMENT_FORMATS.values():
+        try:
+            return datetime.strptime(name, name_format) + length
+        except ValueError:
+            continue
+    return None
+
+
+def _expire_error_files(error_dir, cutoff):
+    """Delete rejected files older than cutoff (the error folder stays small)"""
+    deleted = 0
+    with os.scandir(error_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and datetime.fromtimestamp(entry.stat().st_mtime) < cutoff:
+                os.remove(entry.path)
+                deleted += 1
+    return deleted
+
+
+def main(argv=None):
+    """Print the archived files of a job: python -m app.services.xml_archive <job id>"""
+    import sys
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 1:
+        print("Usage: python -m app.services.xml_archive <job id>", file=sys.stderr)
+        return 2
+
+    found = SegmentArchive().find(args[0])
+    if not found:
+        print(f"Job {args[0]} not found in {Config.XML_ARCHIVE_FOLDER}", file=sys.stderr)
+        return 1
+
+    for filename, content in found:
+        print(f"==> {filename} <==")
+        print(content.decode('ISO-8859-1'))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -8,11 +8,26 @@ import shutil
 from datetime import datetime, timedelta
 from pathlib import Path
 from lxml import etree
+from sqlalchemy import select, values, column, cast, func, insert, update, exists, or_
+from sqlalchemy.dialects import postgresql, sqlite
 from app.config import Config
-from app.models import FaxCompletion, FaxSubmission
+from app.models import FaxCompletion, FaxCompletionXML, FaxJobStage, FaxSubmission
+from app.services.history_parser import history_path_for, parse_history, STAGE_FIELDS
+from app.services.fcl_generator import CORRELATION_TOKEN_PATTERN, correlation_field_name
+from app.services.xml_archive import SegmentArchive
+from app.services.rollups import apply_rollups
 
 logger = logging.getLogger(__name__)
 
+# fax_completions columns written by store_completions (submission_id is joined in)
+INGEST_COLUMNS = (
+    'rightfax_job_id', 'completed_at', 'submitted_at', 'duration_seconds', 'success',
+    'error_code', 'error_description', 'recipient_phone', 'pages_transmitted',
+    'account_name', 'xml_filename', 'xml_parsed_at', 'correlation_token', 'fax_handle',
+    'fax_channel', 'job_create_time', 'fax_create_time', 'fax_server', 'job_type',
+    'disposition', 'term_stat', 'good_page_count', 'bad_page_count'
+)
+
 
 class XMLParser:
     """
@@ -46,83 +61,386 @@ class XMLParser:
         try:
             logger.info(f"Processing XML file: {xml_filepath}")
 
-            # Parse XML
-            tree = etree.parse(xml_filepath)
-            root = tree.getroot()
-
-            # Extract data from XML
-            completion_data = self._extract_completion_data(root, xml_filepath)
-
+            completion_data = self.parse_xml_file(xml_filepath)
             if not completion_data:
-                logger.warning(f"No data extracted from {xml_filepath}")
-                self._move_to_error(xml_filepath)
                 return False
 
-            # Check for duplicate
-            existing = self.db.query(FaxCompletion).filter(
-                FaxCompletion.rightfax_job_id == completion_data['rightfax_job_id']
-            ).first()
+            inserted = self.store_completions([completion_data])
 
-            if existing:
+            if completion_data['rightfax_job_id'] in inserted:
+                logger.info(f"Stored completion for job {completion_data['rightfax_job_id']}")
+            else:
                 logger.info(f"Duplicate job ID {completion_data['rightfax_job_id']}, skipping")
-                self._archive_file(xml_filepath)
-                return True
 
-            # Try to find corresponding submission
-            submission = self.db.query(FaxSubmission).filter(
-                FaxSubmission.rightfax_job_id == completion_data['rightfax_job_id']
-            ).first()
+            # Archive the XML file
+            self.archive_file(xml_filepath, completion_data['rightfax_job_id'])
 
-            if submission:
-                completion_data['submission_id'] = submission.id
-                logger.debug(f"Linked completion to submission {submission.id}")
+            return True
 
-            # Create completion record
-            completion = FaxCompletion(**completion_data)
-            self.db.add(completion)
-            self.db.commit()
+        except Exception as e:
+            logger.error(f"Error processing XML file {xml_filepath}: {e}")
+            self.db.rollback()
+            return False
 
-            logger.info(f"Stored completion for job {completion_data['rightfax_job_id']}")
+    def parse_xml_file(self, xml_filepath, with_history=True):
+        """
+        Parse an XML completion file without touching the database
 
-            # Archive the XML file
-            self._archive_file(xml_filepath)
+        Malformed files and files without usable data are moved to the
+        error directory. The job's _History.TXT, when present next to the
+        XML, is parsed into 'stages'.
 
-            return True
+        Args:
+            xml_filepath: Path to XML file
+            with_history: Also parse the History TXT
+
+        Returns:
+            dict: Completion data, or None if the file was rejected
+        """
+        # Read the file once; the same buffer is parsed and stored compressed
+        with open(xml_filepath, 'rb') as f:
+            content = f.read()
 
+        completion_data = self.parse_content(content, xml_filepath)
+
+        if not completion_data:
+            self._move_to_error(xml_filepath)
+            return None
+
+        if with_history:
+            history_filepath = history_path_for(xml_filepath)
+            if history_filepath:
+                completion_data['stages'] = self._read_history(history_filepath)
+
+        return completion_data
+
+    def parse_content(self, content, xml_filepath):
+        """
+        Parse completion XML already in memory, without moving any file
+
+        Args:
+            content: XML file contents (bytes)
+            xml_filepath: File path or name the contents came from
+
+        Returns:
+            dict: Completion data, or None if the XML is malformed or unusable
+        """
+        try:
+            index_fields = self._read_index_fields(content)
         except etree.XMLSyntaxError as e:
             logger.error(f"XML parsing error in {xml_filepath}: {e}")
-            self._move_to_error(xml_filepath)
-            return False
+            return None
+
+        completion_data = self._extract_completion_data(index_fields, content, xml_filepath)
 
+        if not completion_data:
+            logger.warning(f"No data extracted from {xml_filepath}")
+            return None
+
+        return completion_data
+
+    @staticmethod
+    def _read_history(history_filepath):
+        """
+        Parse a History TXT into stage rows
+
+        Args:
+            history_filepath: Path to History TXT
+
+        Returns:
+            list: Stage dicts (empty if the file could not be read)
+        """
+        try:
+            with open(history_filepath, 'r', encoding='ISO-8859-1') as f:
+                return parse_history(f.read())
         except Exception as e:
-            logger.error(f"Error processing XML file {xml_filepath}: {e}")
+            logger.error(f"Error parsing history file {history_filepath}: {e}")
+            return []
+
+    def store_completions(self, completions):
+        """
+        Insert completions with a single set-based statement
+
+        All rows go into one INSERT ... SELECT FROM (VALUES ...). The
+        submission link is resolved by joining fax_submissions in the same
+        statement, and ON CONFLICT DO NOTHING drops duplicates, so there is
+        no per-row SELECT. The conflict target is left out because it is
+        (rightfax_job_id, completed_at) on partitioned tables and
+        rightfax_job_id on older databases.
+
+        The partitioned key only catches a re-read file, not a job exported
+        again with another completion time. Job IDs already stored within
+        XML_DEDUPE_WINDOW_DAYS of the batch are therefore dropped first, by
+        one lookup that only reads the partitions in that range.
+
+        Compressed raw XML and History TXT stages of the inserted rows are
+        written to fax_completion_xml and fax_job_stages, and the rows are
+        added to the completion rollups, in the same transaction.
+
+        Args:
+            completions: Completion data dicts as returned by parse_xml_file
+
+        Returns:
+            set: Job IDs that were inserted; the others already existed
+        """
+        rows = {}
+        for completion in completions:
+            rows.setdefault(completion['rightfax_job_id'], completion)
+        if not rows:
+            return set()
+
+        parsed_at = datetime.utcnow()
+        for row in rows.values():
+            row['xml_parsed_at'] = parsed_at
+
+        try:
+            for job_id in self._stored_job_ids(rows):
+                del rows[job_id]
+            if not rows:
+                self.db.rollback()
+                return set()
+
+            if self.db.get_bind().dialect.name == 'postgresql':
+                statement = self._completion_insert_postgres(rows)
+            else:
+                statement = self._completion_insert_generic(rows)
+
+            inserted = set(self.db.execute(statement).scalars())
+
+            # Raw XML goes to its own table, only for rows that were new
+            raw_rows = [
+                {'rightfax_job_id': job_id, 'completed_at': rows[job_id]['completed_at'],
+                 'compressed_xml': rows[job_id]['compressed_xml'], 'stored_at': parsed_at}
+                for job_id in inserted if rows[job_id].get('compressed_xml')
+            ]
+            if raw_rows:
+                self.db.execute(insert(FaxCompletionXML), raw_rows)
+
+            stage_rows = [
+                {'rightfax_job_id': job_id, 'completed_at': rows[job_id]['completed_at'],
+                 **{name: stage.get(name) for name in STAGE_FIELDS}}
+                for job_id in inserted for stage in rows[job_id].get('stages') or ()
+            ]
+            if stage_rows:
+                self.db.execute(insert(FaxJobStage), stage_rows)
+
+            apply_rollups(self.db, [rows[job_id] for job_id in inserted])
+
+            self.db.commit()
+        except Exception:
             self.db.rollback()
-            return False
+            raise
+
+        logger.debug(f"Stored {len(inserted)} of {len(rows)} completions")
+        return inserted
 
-    def _extract_completion_data(self, root, xml_filepath):
+    def _stored_job_ids(self, rows):
         """
-        Extract completion data from XML tree
+        Job IDs of rows that are already stored with a completion time
+        within XML_DEDUPE_WINDOW_DAYS of theirs
 
         Args:
-            root: XML root element
+            rows: Job ID -> completion data
+
+        Returns:
+            set: Job IDs to skip
+        """
+        times = [row['completed_at'] for row in rows.values() if row.get('completed_at')]
+        if not times:
+            return set()
+
+        window = timedelta(days=Config.XML_DEDUPE_WINDOW_DAYS)
+        return set(self.db.execute(
+            select(FaxCompletion.rightfax_job_id).where(
+                FaxCompletion.rightfax_job_id.in_(list(rows)),
+                FaxCompletion.completed_at.between(min(times) - window, max(times) + window)
+            )
+        ).scalars())
+
+    def reconcile_submission_links(self):
+        """
+        Link completions whose FCL submission row was written after them
+
+        Two set-based UPDATEs: completions still without a submission get
+        it by correlation token, and FCL submissions still without a job ID
+        get the job ID of their linked completion. Partial indexes limit
+        both to rows still waiting for a link.
+
+        Returns:
+            dict: Completions and submissions linked
+        """
+        by_token = (
+            select(func.min(FaxSubmission.id))
+            .where(FaxSubmission.correlation_token == FaxCompletion.correlation_token)
+            .scalar_subquery()
+        )
+        unlinked_completions = (
+            update(FaxCompletion)
+            .where(FaxCompletion.submission_id.is_(None),
+                   FaxCompletion.correlation_token.isnot(None),
+                   exists().where(FaxSubmission.correlation_token == FaxCompletion.correlation_token))
+            .values(submission_id=by_token)
+            .execution_options(synchronize_session=False)
+        )
+
+        job_id = (
+            select(FaxCompletion.rightfax_job_id)
+            .where(FaxCompletion.submission_id == FaxSubmission.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        unlinked_submissions = (
+            update(FaxSubmission)
+            .where(FaxSubmission.rightfax_job_id.is_(None),
+                   FaxSubmission.correlation_token.isnot(None),
+                   exists().where(FaxCompletion.submission_id == FaxSubmission.id))
+            .values(rightfax_job_id=job_id)
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            completions = self.db.execute(unlinked_completions).rowcount
+            submissions = self.db.execute(unlinked_submissions).rowcount
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if completions or submissions:
+            logger.info(f"Linked {completions} completions and {submissions} submissions by correlation token")
+        return {'completions': completions, 'submissions': submissions}
+
+    def _completion_insert_postgres(self, rows):
+        """
+        INSERT ... SELECT FROM (VALUES ...) LEFT JOIN fax_submissions ... ON CONFLICT DO NOTHING
+
+        Args:
+            rows: Completion data keyed by job ID
+
+        Returns:
+            Insert: Statement returning the inserted job IDs
+        """
+        table = FaxCompletion.__table__
+
+        incoming = values(
+            *[column(name, table.c[name].type) for name in INGEST_COLUMNS],
+            name='incoming'
+        ).data([tuple(row.get(name) for name in INGEST_COLUMNS) for row in rows.values()])
+
+        # A job ID can appear on more than one submission row; link the first
+        links = (
+            select(FaxSubmission.rightfax_job_id, func.min(FaxSubmission.id).label('submission_id'))
+            .where(FaxSubmission.rightfax_job_id.in_(list(rows)))
+            .group_by(FaxSubmission.rightfax_job_id)
+            .subquery('links')
+        )
+
+        # FCL submissions have no job ID; they are found by correlation token
+        tokens = [row['correlation_token'] for row in rows.values() if row.get('correlation_token')]
+        token_links = (
+            select(FaxSubmission.correlation_token, func.min(FaxSubmission.id).label('submission_id'))
+            .where(FaxSubmission.correlation_token.in_(tokens))
+            .group_by(FaxSubmission.correlation_token)
+            .subquery('token_links')
+        )
+
+        # Postgres types VALUES columns from their contents, so an all-NULL
+        # column would arrive as text; cast each one to its column type
+        query = (
+            select(*[cast(incoming.c[name], table.c[name].type) for name in INGEST_COLUMNS],
+                   func.coalesce(links.c.submission_id, token_links.c.submission_id))
+            .select_from(
+                incoming
+                .outerjoin(links, links.c.rightfax_job_id == incoming.c.rightfax_job_id)
+                .outerjoin(token_links, token_links.c.correlation_token
+                           == cast(incoming.c.correlation_token, table.c.correlation_token.type))
+            )
+            .where(incoming.c.rightfax_job_id.isnot(None))
+        )
+
+        return (
+            postgresql.insert(FaxCompletion)
+            .from_select([*INGEST_COLUMNS, 'submission_id'], query)
+            .on_conflict_do_nothing()
+            .returning(FaxCompletion.rightfax_job_id)
+        )
+
+    def _completion_insert_generic(self, rows):
+        """
+        Multi-row INSERT ... ON CONFLICT DO NOTHING for SQLite (benchmarks, tests)
+
+        SQLite cannot alias the columns of a VALUES list, so the submission
+        link is a correlated subquery per row instead of a join.
+
+        Args:
+            rows: Completion data keyed by job ID
+
+        Returns:
+            Insert: Statement returning the inserted job IDs
+        """
+        return (
+            sqlite.insert(FaxCompletion)
+            .values([
+                {
+                    **{name: row.get(name) for name in INGEST_COLUMNS},
+                    'submission_id': self._submission_link(job_id, row.get('correlation_token'))
+                }
+                for job_id, row in rows.items()
+            ])
+            .on_conflict_do_nothing()
+            .returning(FaxCompletion.rightfax_job_id)
+        )
+
+    @staticmethod
+    def _submission_link(job_id, correlation_token):
+        """Scalar subquery for the submission of a job, by job ID and else by correlation token"""
+        by_job_id = select(func.min(FaxSubmission.id)).where(FaxSubmission.rightfax_job_id == job_id)
+        if not correlation_token:
+            return by_job_id.scalar_subquery()
+
+        by_token = select(func.min(FaxSubmission.id)).where(FaxSubmission.correlation_token == correlation_token)
+        return func.coalesce(by_job_id.scalar_subquery(), by_token.scalar_subquery())
+
+    @staticmethod
+    def _read_index_fields(content):
+        """
+        Collect the IndexField Name/Value attributes from an XML buffer
+
+        Completion files are a few KB, so one parse of the in-memory buffer
+        followed by iterfind is cheaper than a streaming iterparse, whose
+        per-event overhead outweighs the tree it avoids building.
+
+        Args:
+            content: XML file contents (bytes)
+
+        Returns:
+            dict: IndexField values by name (empty values are skipped)
+
+        Raises:
+            etree.XMLSyntaxError: If the XML is malformed
+        """
+        index_fields = {}
+        for field in etree.fromstring(content).iterfind('.//IndexField'):
+            name = field.get('Name')
+            value = field.get('Value')
+            if name and value:
+                index_fields[name] = value
+
+        return index_fields
+
+    def _extract_completion_data(self, index_fields, content, xml_filepath):
+        """
+        Build completion data from the IndexField values
+
+        Args:
+            index_fields: IndexField values by name
+            content: XML file contents (bytes), kept compressed per XML_RAW_RETENTION
             xml_filepath: Path to XML file
 
         Returns:
             dict: Completion data for database
         """
         try:
-            # Read raw XML for storage
-            with open(xml_filepath, 'r', encoding='ISO-8859-1') as f:
-                raw_xml = f.read()
-
-            # Find all IndexField elements
-            index_fields = {}
-            for field in root.findall('.//IndexField'):
-                name = field.get('Name')
-                value = field.get('Value')
-                if name and value:
-                    index_fields[name] = value
-
             # Extract required fields
             unique_id = index_fields.get('UniqueID')
             if not unique_id:
@@ -168,7 +486,6 @@ class XMLParser:
                 'pages_transmitted': good_pages,
                 'account_name': index_fields.get('User ID'),
                 'xml_filename': os.path.basename(xml_filepath),
-                'raw_xml': raw_xml,
                 'fax_handle': index_fields.get('Fax Handle'),
                 'fax_channel': index_fields.get('Fax Channel'),
                 'job_create_time': job_create_time,
@@ -181,11 +498,21 @@ class XMLParser:
                 'bad_page_count': bad_pages
             }
 
+            # Correlation token of an FCL submission, echoed in the billing field
+            correlation_token = index_fields.get(correlation_field_name())
+            if correlation_token and CORRELATION_TOKEN_PATTERN.match(correlation_token):
+                completion_data['correlation_token'] = correlation_token
+
             # Add error information if failed
             if not success:
                 completion_data['error_code'] = str(term_stat)
                 completion_data['error_description'] = f"Disposition: {disposition}, TermStat: {term_stat}"
 
+            # Keep the raw XML compressed, or only for failures, or not at all
+            retention = Config.XML_RAW_RETENTION
+            if retention == 'all' or (retention == 'failed' and not success):
+                completion_data['compressed_xml'] = FaxCompletionXML.compress(content)
+
             return completion_data
 
         except Exception as e:
@@ -249,28 +576,56 @@ class XMLParser:
             logger.error(f"Error parsing duration {duration_str}: {e}")
             return None
 
-    def _archive_file(self, xml_filepath):
+    def archive_file(self, xml_filepath, job_id=None):
         """
-        Move processed XML file to archive directory
+        Archive a processed XML file and its History TXT
 
         Args:
             xml_filepath: Path to XML file
+            job_id: RightFax job ID (taken from the file name if omitted)
         """
-        try:
-            # Create date-based subdirectory
-            today = datetime.now().strftime('%Y-%m-%d')
-            archive_dir = os.path.join(self.archive_directory, today)
-            Path(archive_dir).mkdir(parents=True, exist_ok=True)
+        self.archive_files([(job_id, xml_filepath)])
 
-            # Move file
-            filename = os.path.basename(xml_filepath)
-            archive_path = os.path.join(archive_dir, filename)
+    def archive_files(self, entries):
+        """
+        Archive processed XML files and their History TXT files
 
-            shutil.move(xml_filepath, archive_path)
-            logger.debug(f"Archived XML file to {archive_path}")
+        With XML_ARCHIVE_MODE=segments (the default) the files are appended
+        to the current compressed segment under one lock; with 'files' each
+        one is moved into a per-day folder.
 
-        except Exception as e:
-            logger.error(f"Error archiving file {xml_filepath}: {e}")
+        Args:
+            entries: (job_id or None, xml_filepath) tuples
+        """
+        files = []
+        for job_id, xml_filepath in entries:
+            job_id = job_id or SegmentArchive.job_id_for(xml_filepath)
+            files.append((job_id, xml_filepath))
+
+            # The History TXT travels with its XML
+            history_filepath = history_path_for(xml_filepath)
+            if history_filepath:
+                files.append((job_id, history_filepath))
+
+        if Config.XML_ARCHIVE_MODE == 'segments':
+            try:
+                SegmentArchive(self.archive_directory).append(files)
+            except Exception as e:
+                logger.error(f"Error archiving {len(files)} files to segment: {e}")
+            return
+
+        # Create date-based subdirectory
+        today = datetime.now().strftime('%Y-%m-%d')
+        archive_dir = os.path.join(self.archive_directory, today)
+        Path(archive_dir).mkdir(parents=True, exist_ok=True)
+
+        for _, filepath in files:
+            try:
+                archive_path = os.path.join(archive_dir, os.path.basename(filepath))
+                shutil.move(filepath, archive_path)
+                logger.debug(f"Archived file to {archive_path}")
+            except Exception as e:
+                logger.error(f"Error archiving file {filepath}: {e}")
 
     def _move_to_error(self, xml_filepath):
         """
@@ -289,6 +644,10 @@ class XMLParser:
             shutil.move(xml_filepath, error_path)
             logger.warning(f"Moved malformed XML to {error_path}")
 
+            history_filepath = history_path_for(xml_filepath)
+            if history_filepath:
+                shutil.move(history_filepath, os.path.join(error_dir, os.path.basename(history_filepath)))
+
         except Exception as e:
             logger.error(f"Error moving file to error directory: {e}")
 
@@ -296,25 +655,92 @@ class XMLParser:
     def cleanup_old_archives():
         """
         Clean up old archived XML files based on retention policy
+
+        Whole segments (and legacy per-day folders) past the retention
+        period are deleted without opening or stat-ing the files in them.
         """
         try:
-            archive_dir = Config.XML_ARCHIVE_FOLDER
             retention_days = Config.XML_RETENTION_DAYS
-            cutoff_date = datetime.now() - timedelta(days=retention_days)
 
             logger.info(f"Cleaning up archives older than {retention_days} days")
 
-            deleted_count = 0
-            for root, dirs, files in os.walk(archive_dir):
-                for filename in files:
-                    filepath = os.path.join(root, filename)
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
+            deleted_count = SegmentArchive(Config.XML_ARCHIVE_FOLDER).expire(retention_days)
 
-                    if file_mtime < cutoff_date:
-                        os.remove(filepath)
-                        deleted_count += 1
-
-            logger.info(f"Deleted {deleted_count} old archive files")
+            logger.info(f"Deleted {deleted_count} expired archive segments")
 
         except Exception as e:
             logger.error(f"Error cleaning up archives: {e}")
+
+    def compact_raw_xml(self, chunk_size=1000):
+        """
+        Move raw XML still held in fax_completions.raw_xml into
+        fax_completion_xml and apply XML_RAW_RETENTION to stored XML
+
+        Legacy rows are handled chunk_size at a time, each chunk in its own
+        transaction, so the job can be interrupted and run again.
+
+        Args:
+            chunk_size: Rows moved per transaction
+
+        Returns:
+            dict: Rows moved, dropped by retention, and deleted from fax_completion_xml
+        """
+        retention = Config.XML_RAW_RETENTION
+        moved = dropped = 0
+
+        while True:
+            legacy = self.db.query(
+                FaxCompletion.id, FaxCompletion.rightfax_job_id, FaxCompletion.completed_at, FaxCompletion.success,
+                FaxCompletion.raw_xml
+            ).filter(FaxCompletion.raw_xml.isnot(None)).order_by(FaxCompletion.id).limit(chunk_size).all()
+            if not legacy:
+                break
+
+            keep = [
+                {'rightfax_job_id': row.rightfax_job_id, 'completed_at': row.completed_at,
+                 'compressed_xml': FaxCompletionXML.compress(row.raw_xml.encode('ISO-8859-1', errors='replace'))}
+                for row in legacy
+                if retention == 'all' or (retention == 'failed' and not row.success)
+            ]
+            existing = set(self.db.scalars(
+                select(FaxCompletionXML.rightfax_job_id)
+                .where(FaxCompletionXML.rightfax_job_id.in_([row['rightfax_job_id'] for row in keep]))
+            )) if keep else set()
+            keep = [row for row in keep if row['rightfax_job_id'] not in existing]
+
+            try:
+                if keep:
+                    self.db.execute(insert(FaxCompletionXML), keep)
+                self.db.query(FaxCompletion).filter(
+                    FaxCompletion.id.in_([row.id for row in legacy])
+                ).update({FaxCompletion.raw_xml: None}, synchronize_session=False)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+            moved += len(keep)
+            dropped += len(legacy) - len(keep)
+
+        # Drop stored XML the current retention no longer keeps
+        deleted = 0
+        if retention in ('failed', 'none'):
+            stale = self.db.query(FaxCompletionXML)
+            if retention == 'failed':
+                # No foreign key links the tables; match the completion on job ID
+                # and completion time (NULL on rows stored before partitioning)
+                stale = stale.filter(exists().where(
+                    FaxCompletion.rightfax_job_id == FaxCompletionXML.rightfax_job_id,
+                    or_(FaxCompletionXML.completed_at.is_(None),
+                        FaxCompletion.completed_at == FaxCompletionXML.completed_at),
+                    FaxCompletion.success == True
+                ))
+            try:
+                deleted = stale.delete(synchronize_session=False)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+        logger.info(f"Compacted raw XML: {moved} moved, {dropped} dropped, {deleted} deleted by retention")
+        return {'moved': moved, 'dropped': dropped, 'deleted': deleted}
@@ -4,13 +4,20 @@ Monitors directory for new XML files from RightFax and triggers processing
 """
 import os
 import time
+import queue
 import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from app.config import Config
 from app.database import SessionLocal
 from app.services.xml_parser import XMLParser
+from app.services.completion_writer import CompletionWriter
+from app.services.partitions import maintain_partitions
+from app.services.rollups import prune_rollups
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,15 +25,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Readiness fallback when no close-write event arrives: a file is ready
+# once its size and mtime have not changed for READY_STABLE_SECONDS,
+# checked at intervals backing off from READY_POLL_MIN to READY_POLL_MAX
+READY_STABLE_SECONDS = 0.5
+READY_POLL_MIN = 0.05
+READY_POLL_MAX = 1.0
+READY_TIMEOUT = 30
+
+# Per-file processing stages, in order
+STAGES = ('detected', 'ready', 'parsed', 'stored', 'archived')
+
 
 class XMLFileHandler(FileSystemEventHandler):
     """
     Handler for XML file system events
+
+    Only detects files; processing happens in the XMLProcessingPool so the
+    observer thread never blocks on a slow file. A close-write or a rename
+    into the directory marks the file as completely written.
     """
 
-    def __init__(self):
+    def __init__(self, pool):
+        """
+        Initialize handler
+
+        Args:
+            pool: XMLProcessingPool that processes detected files
+        """
         super().__init__()
-        self.processing = set()  # Track files currently being processed
+        self.pool = pool
 
     def on_created(self, event):
         """
@@ -42,111 +70,800 @@ class XMLFileHandler(FileSystemEventHandler):
         if not event.src_path.lower().endswith('.xml'):
             return
 
-        # Avoid processing the same file multiple times
-        if event.src_path in self.processing:
+        logger.info(f"New XML file detected: {event.src_path}")
+        self.pool.submit(event.src_path)
+
+    def on_closed(self, event):
+        """
+        Handle close-after-write event: the writer is done with the file
+
+        Args:
+            event: File system event
+        """
+        if event.is_directory or not event.src_path.lower().endswith('.xml'):
             return
 
-        logger.info(f"New XML file detected: {event.src_path}")
+        self.pool.mark_ready(event.src_path)
+
+    def on_moved(self, event):
+        """
+        Handle rename event: a file renamed into place is complete
+
+        Args:
+            event: File system event
+        """
+        if event.is_directory or not event.dest_path.lower().endswith('.xml'):
+            return
+        if os.path.dirname(event.dest_path) != os.path.dirname(event.src_path):
+            return  # moved out, e.g. archived
+
+        logger.info(f"New XML file detected: {event.dest_path}")
+        self.pool.submit(event.dest_path, ready=True)
+
 
-        # Wait a moment to ensure file is completely written
-        time.sleep(1)
+class StageTimings:
+    """
+    Rolling per-stage latency of processed files
+
+    Every file carries a timestamp per stage (detected, ready, parsed,
+    stored, archived). The gaps between consecutive stages are kept for the
+    last window files, so the metrics show where ingestion latency goes.
+    """
 
-        # Process the file
-        self._process_file(event.src_path)
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._durations = {stage: deque(maxlen=window) for stage in STAGES[1:]}
+        self._totals = deque(maxlen=window)
 
-    def _process_file(self, filepath):
+    def record(self, filepath, stamps):
         """
-        Process an XML file
+        Record a fully processed file
+
+        Args:
+            filepath: Path the file was processed from
+            stamps: Stage name -> time.time() timestamp
+        """
+        gaps = {}
+        for previous, stage in zip(STAGES, STAGES[1:]):
+            if previous in stamps and stage in stamps:
+                gaps[stage] = (stamps[stage] - stamps[previous]) * 1000
+
+        total = (stamps['archived'] - stamps['detected']) * 1000
+        with self._lock:
+            for stage, gap in gaps.items():
+                self._durations[stage].append(gap)
+            self._totals.append(total)
+
+        logger.debug(
+            f"Stage timings for {os.path.basename(filepath)}: "
+            + ', '.join(f"{stage} +{gap:.0f}ms" for stage, gap in gaps.items())
+            + f" (total {total:.0f}ms)"
+        )
+
+    def summary(self):
+        """
+        Returns:
+            dict: p50/p95 milliseconds per stage gap and end to end
+        """
+        with self._lock:
+            series = {f"to_{stage}": sorted(values) for stage, values in self._durations.items()}
+            series['total'] = sorted(self._totals)
+
+        summary = {}
+        for name, values in series.items():
+            if values:
+                summary[name] = {
+                    'p50_ms': round(values[len(values) // 2], 1),
+                    'p95_ms': round(values[min(int(len(values) * 0.95), len(values) - 1)], 1)
+                }
+        return summary
+
+
+class XMLProcessingPool:
+    """
+    Bounded queue feeding a pool of XML parse/ingest workers
+
+    submit() blocks once max_queue files are waiting, which holds back the
+    observer instead of letting the backlog grow without limit. Files that
+    are already queued or in progress are not queued twice.
+
+    In 'thread' mode each worker parses and stores its files. In 'process'
+    mode the lxml parse runs in a process pool, so parsing is not limited
+    by the GIL, while the worker threads keep the database writes in this
+    process. In 'celery' mode the workers only wait for files to be ready
+    and enqueue them for the process_xml_file task, so parsing and storage
+    scale out across Celery worker containers. A Redis marker keeps a file
+    from being queued twice while its task is waiting.
+
+    A worker processes a file as soon as it is marked ready by a
+    close-write event. Without one (network shares, polling mode) it falls
+    back to watching size and mtime with backoff.
+    """
+
+    def __init__(self, workers=None, mode=None, max_queue=None, writer=None):
+        """
+        Initialize pool and start its workers
+
+        Args:
+            workers: Worker count (defaults to config)
+            mode: 'thread', 'process' or 'celery' (defaults to config)
+            max_queue: Files waiting before submit() blocks (defaults to config)
+            writer: CompletionWriter for batch ingestion; without one every
+                file is stored with its own INSERT and commit
+        """
+        self.workers = workers or Config.XML_WORKERS
+        self.mode = mode or Config.XML_WORKER_MODE
+        self.writer = writer
+        self.timings = StageTimings()
+        if writer:
+            writer.on_complete = self._written
+            writer.on_failed = self._write_failed
+
+        self.processed = 0
+        self.errors = 0
+        self.already_queued = 0
+        self.ready_by_event = 0
+        self.ready_by_polling = 0
+        self._queue = queue.Queue(maxsize=max_queue or Config.XML_QUEUE_SIZE)
+        self._pending = OrderedDict()  # filepath -> {'stamps': {...}, 'ready': Event}, queued or in progress
+        self._in_progress = 0
+        self._lock = threading.Lock()
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers) if self.mode == 'process' else None
+        self._threads = [
+            threading.Thread(target=self._run, name=f"xml-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, filepath, ready=False):
+        """
+        Queue a file for processing
 
         Args:
             filepath: Path to XML file
+            ready: The file is known to be completely written
+
+        Returns:
+            bool: False if the file was already queued or in progress
+        """
+        with self._lock:
+            record = self._pending.get(filepath)
+            if record:
+                if ready:
+                    record['ready'].set()
+                return False
+
+            record = {'stamps': {'detected': time.time()}, 'ready': threading.Event(),
+                      'observed': (_file_state(filepath), time.monotonic())}
+            if ready:
+                record['ready'].set()
+            self._pending[filepath] = record
+
+        self._queue.put(filepath)
+        return True
+
+    def mark_ready(self, filepath):
         """
-        self.processing.add(filepath)
+        Mark a file as completely written (close-write event)
 
-        try:
-            # Check if file still exists and is readable
-            if not os.path.exists(filepath):
-                logger.warning(f"File disappeared: {filepath}")
+        Queues the file if its creation was never reported.
+        """
+        with self._lock:
+            record = self._pending.get(filepath)
+            if record:
+                record['ready'].set()
                 return
 
-            # Wait until file is no longer being written
-            if not self._wait_for_file_ready(filepath):
-                logger.warning(f"File not ready: {filepath}")
+        if os.path.exists(filepath):
+            self.submit(filepath, ready=True)
+
+    def is_pending(self, filepath):
+        """True if the file is queued or being processed"""
+        with self._lock:
+            return filepath in self._pending
+
+    def stats(self):
+        """
+        Backpressure metrics
+
+        Returns:
+            dict: Queue depth, files in progress, the age of the oldest
+                file not yet processed and per-stage latency
+        """
+        with self._lock:
+            oldest = next(iter(self._pending.values()), None)
+            in_progress = self._in_progress
+
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'in_progress': in_progress,
+            'oldest_pending_age_seconds': round(time.time() - oldest['stamps']['detected'], 3) if oldest else 0,
+            'awaiting_batch': self.writer.pending() if self.writer else 0,
+            'processed': self.processed,
+            'errors': self.errors,
+            'ready_by_event': self.ready_by_event,
+            'ready_by_polling': self.ready_by_polling,
+            'already_queued': self.already_queued,
+            'celery_queue_depth': self._celery_queue_depth(),
+            'stage_latency': self.timings.summary()
+        }
+
+    def _celery_queue_depth(self):
+        """Tasks waiting on the Celery XML queue (0 outside 'celery' mode)"""
+        if self.mode != 'celery':
+            return 0
+        try:
+            from app.redis_client import get_redis
+            return get_redis().llen(Config.XML_CELERY_QUEUE)
+        except Exception as e:
+            logger.warning(f"Could not read Celery XML queue depth: {e}")
+            return 0
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            filepath = self._queue.get()
+            if filepath is None:
                 return
 
-            # Process with XMLParser
-            db = SessionLocal()
+            with self._lock:
+                record = self._pending.get(filepath)
+                self._in_progress += 1
+
+            outcome = False
             try:
-                parser = XMLParser(db)
-                parser.process_xml_file(filepath)
+                outcome = self._process_file(filepath, record)
+
+            except Exception as e:
+                logger.error(f"Error processing file {filepath}: {e}")
+
             finally:
-                db.close()
+                with self._lock:
+                    self._in_progress -= 1
+                    # A file handed to the writer stays pending, so sweeps do
+                    # not queue it again, until the writer reports back
+                    if not record.get('deferred'):
+                        self._pending.pop(filepath, None)
+                        if outcome:
+                            self.processed += 1
+                        elif outcome is not None:
+                            self.errors += 1
+
+    def _written(self, filepath, stamps):
+        """Writer callback: the file was stored (or was a duplicate) and archived"""
+        with self._lock:
+            self._pending.pop(filepath, None)
+            self.processed += 1
+        self.timings.record(filepath, stamps)
+
+    def _write_failed(self, filepath):
+        """Writer callback: the file was not stored and may be queued again"""
+        with self._lock:
+            self._pending.pop(filepath, None)
+            self.errors += 1
+
+    def _process_file(self, filepath, record):
+        """
+        Process an XML file
 
-        except Exception as e:
-            logger.error(f"Error processing file {filepath}: {e}")
+        Args:
+            filepath: Path to XML file
+            record: Pending record with the stage timestamps and ready event
+
+        Returns:
+            bool: True if the file was parsed and stored or queued for
+                storage, None if it was already gone or queued
+        """
+        stamps = record['stamps']
+
+        # Check if file still exists and is readable
+        if not os.path.exists(filepath):
+            logger.debug(f"File already processed or removed: {filepath}")
+            return None
+
+        # Wait until file is no longer being written
+        if not self._wait_until_ready(filepath, record['ready'], *record['observed']):
+            logger.warning(f"File not ready: {filepath}")
+            return False
+        stamps['ready'] = time.time()
+
+        if self.mode == 'celery':
+            return self._enqueue(filepath, stamps)
 
+        if self._executor:
+            completion_data = self._executor.submit(parse_xml_file, filepath).result()
+        else:
+            completion_data = parse_xml_file(filepath)
+        stamps['parsed'] = time.time()
+
+        if not completion_data:
+            return False
+
+        if self.writer:
+            record['deferred'] = True
+            self.writer.add(completion_data, filepath, stamps)
+            return True
+
+        db = SessionLocal()
+        try:
+            parser = XMLParser(db)
+            if completion_data['rightfax_job_id'] in parser.store_completions([completion_data]):
+                logger.info(f"Stored completion for job {completion_data['rightfax_job_id']}")
+            else:
+                logger.info(f"Duplicate job ID {completion_data['rightfax_job_id']}, skipping")
+            stamps['stored'] = time.time()
+            parser.archive_file(filepath, completion_data['rightfax_job_id'])
+            stamps['archived'] = time.time()
+            self.timings.record(filepath, stamps)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing completion from {filepath}: {e}")
+            return False
         finally:
-            self.processing.discard(filepath)
+            db.close()
 
-    def _wait_for_file_ready(self, filepath, timeout=30, check_interval=0.5):
+    def _enqueue(self, filepath, stamps):
         """
-        Wait for file to be completely written
+        Hand a ready file to the Celery XML workers
+
+        The queued marker lasts XML_CLAIM_TTL seconds, or until the task
+        has handled the file, so reconciliation sweeps do not queue a file
+        again while its task is still waiting.
 
         Args:
-            filepath: Path to file
-            timeout: Maximum time to wait (seconds)
-            check_interval: Time between checks (seconds)
+            filepath: Path to XML file
+            stamps: Stage timestamps
 
         Returns:
-            bool: True if file is ready, False if timeout
+            bool: True if queued, None if a task for it is already waiting
         """
-        start_time = time.time()
-        last_size = -1
+        from app.redis_client import claim
+        from app.tasks.xml_tasks import process_xml_file
 
-        while time.time() - start_time < timeout:
-            try:
-                current_size = os.path.getsize(filepath)
+        token = claim(f"xml:queued:{filepath}", Config.XML_CLAIM_TTL)
+        if not token:
+            with self._lock:
+                self.already_queued += 1
+            return None
+
+        process_xml_file.delay(filepath, queued_token=token, detected_at=stamps['detected'])
+        logger.debug(f"Queued {filepath} on Celery queue {Config.XML_CELERY_QUEUE}")
+        return True
 
-                if current_size == last_size and current_size > 0:
-                    # File size hasn't changed, assume it's complete
-                    return True
+    def _wait_until_ready(self, filepath, ready_event, last_state=None, stable_since=None):
+        """
+        Wait for a file to be completely written
+
+        Returns at once when a close-write event has arrived or arrives
+        while waiting. Otherwise the file is ready when its size and mtime
+        have not changed for READY_STABLE_SECONDS, counting from the state
+        seen at detection, so a file that waited in the queue is usually
+        ready on the first check. Checks start at READY_POLL_MIN and back
+        off to READY_POLL_MAX, so small files are picked up quickly and
+        slow writers are not polled hard.
 
-                last_size = current_size
-                time.sleep(check_interval)
+        Args:
+            filepath: Path to file
+            ready_event: Event set by a close-write or rename
+            last_state: (size, mtime_ns) seen at detection
+            stable_since: Monotonic time last_state was seen
 
-            except OSError:
-                # File may not be accessible yet
-                time.sleep(check_interval)
+        Returns:
+            bool: True if file is ready, False on timeout
+        """
+        deadline = time.monotonic() + READY_TIMEOUT
+        interval = READY_POLL_MIN
+
+        while time.monotonic() < deadline:
+            if ready_event.is_set():
+                with self._lock:
+                    self.ready_by_event += 1
+                return True
+
+            state = _file_state(filepath)
+            now = time.monotonic()
+            if state is None or state[0] == 0 or state != last_state:
+                last_state = state
+                stable_since = now
+            elif now - stable_since >= READY_STABLE_SECONDS:
+                with self._lock:
+                    self.ready_by_polling += 1
+                return True
+
+            ready_event.wait(interval)
+            interval = min(interval * 2, READY_POLL_MAX)
 
         logger.warning(f"Timeout waiting for file to be ready: {filepath}")
         return False
 
+    def close(self):
+        """Finish the queued files, stop the workers and flush the writer"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
 
-def start_xml_watcher():
+        if self._executor:
+            self._executor.shutdown()
+        if self.writer:
+            self.writer.close()
+
+
+def _file_state(filepath):
+    """(size, mtime_ns) of a file, or None if it cannot be read"""
+    try:
+        stat = os.stat(filepath)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None
+
+
+def parse_xml_file(filepath):
     """
-    Start the XML file watcher service
+    Parse an XML completion file (runs in pool processes in 'process' mode)
+
+    Args:
+        filepath: Path to XML file
+
+    Returns:
+        dict: Completion data, or None if the file was rejected
+    """
+    return XMLParser(None).parse_xml_file(filepath)
+
+
+class BacklogSweeper:
+    """
+    Finds XML files that no event reported and queues them
+
+    The first sweep at startup picks up files that arrived while the
+    watcher was down. Later sweeps run every interval seconds and catch
+    files whose events were lost, e.g. to an inotify queue overflow. They
+    skip files younger than min_age seconds, since those still have an
+    event in flight.
+
+    Processed files are moved out of the XML directory, so a sweep only
+    lists the current backlog and stays cheap however many files have been
+    ingested.
+
+    Each periodic pass also links, in bulk, completions that were stored
+    before their FCL submission row (see
+    XMLParser.reconcile_submission_links).
+    """
+
+    def __init__(self, pool, xml_directory, interval=None, min_age=None):
+        """
+        Initialize sweeper
+
+        Args:
+            pool: XMLProcessingPool to queue files on
+            xml_directory: Directory to sweep
+            interval: Seconds between reconciliation sweeps (defaults to config)
+            min_age: Minimum file age for reconciliation sweeps (defaults to config)
+        """
+        self.pool = pool
+        self.xml_directory = xml_directory
+        self.interval = interval if interval is not None else Config.XML_RECONCILE_INTERVAL
+        self.min_age = min_age if min_age is not None else Config.XML_RECONCILE_MIN_AGE
+
+        self.swept = 0
+        self.recovered = 0
+        self.linked = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='xml-sweeper', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def sweep(self, min_age=0):
+        """
+        Queue unprocessed XML files, oldest first
+
+        Args:
+            min_age: Skip files modified less than this many seconds ago
+
+        Returns:
+            int: Files queued
+        """
+        cutoff = time.time() - min_age
+        found = []
+
+        with os.scandir(self.xml_directory) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith('.xml') or self.pool.is_pending(entry.path):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue  # archived between listing and stat
+                if mtime <= cutoff:
+                    found.append((mtime, entry.path))
+
+        # Files untouched for min_age seconds are complete; no need to watch them settle
+        settled = time.time() - self.min_age
+
+        queued = 0
+        for mtime, filepath in sorted(found):
+            if self._stop.is_set():
+                break
+            if self.pool.submit(filepath, ready=mtime <= settled):
+                queued += 1
+
+        self.swept += 1
+        return queued
+
+    def _run(self):
+        """Startup sweep, then periodic reconciliation"""
+        try:
+            queued = self.sweep()
+            logger.info(f"Startup sweep queued {queued} XML files")
+        except Exception as e:
+            logger.error(f"Error sweeping XML directory {self.xml_directory}: {e}")
+
+        while not self._stop.wait(self.interval):
+            try:
+                queued = self.sweep(self.min_age)
+                if queued:
+                    self.recovered += queued
+                    logger.warning(f"Reconciliation queued {queued} XML files that no event reported")
+            except Exception as e:
+                logger.error(f"Error sweeping XML directory {self.xml_directory}: {e}")
+
+            self.reconcile_links()
+
+    def reconcile_links(self):
+        """Link completions to FCL submissions that were written after them"""
+        db = SessionLocal()
+        try:
+            linked = XMLParser(db).reconcile_submission_links()
+            self.linked += linked['completions']
+        except Exception as e:
+            logger.error(f"Error reconciling submission links: {e}")
+        finally:
+            db.close()
+
+
+class DirectoryScanner:
+    """
+    Polling detector for directories where inotify events never arrive,
+    such as the SMB/CIFS shares RightFax usually writes to
+
+    Each pass stats the directory itself first. If its mtime has not
+    changed, no file was added or removed, and the pass ends there. Only a
+    changed directory is listed, using names only with no per-file stat,
+    and the listing is diffed against the previous one. Processed files
+    leave the directory, so even a listing only covers the backlog.
+
+    A directory mtime within MTIME_GRANULARITY seconds of now is not
+    trusted, because a file created in the same timestamp tick as the last
+    listing would not move it.
+
+    The first pass lists the directory and queues every file in it.
+    """
+
+    MTIME_GRANULARITY = 2
+
+    def __init__(self, pool, xml_directory, interval=None):
+        """
+        Initialize scanner
+
+        Args:
+            pool: XMLProcessingPool to queue new files on
+            xml_directory: Directory to poll
+            interval: Seconds between passes (defaults to config)
+        """
+        self.pool = pool
+        self.xml_directory = xml_directory
+        self.interval = interval if interval is not None else Config.XML_POLL_INTERVAL
+
+        self.passes = 0
+        self.listings = 0
+        self.last_pass_ms = 0
+        self._names = set()
+        self._dir_mtime = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='xml-scanner', daemon=True)
+
+    def start(self):
+        # The first pass queues the files already present, so they are
+        # processed even without the startup sweep; with it, the pool
+        # drops the second submit of a file
+        self._names = set()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _list(self):
+        """XML file names currently in the directory"""
+        with os.scandir(self.xml_directory) as entries:
+            return {entry.name for entry in entries if entry.name.lower().endswith('.xml')}
+
+    def scan(self):
+        """
+        Run one pass
+
+        Returns:
+            int: New files queued
+        """
+        started = time.perf_counter()
+        self.passes += 1
+
+        stat = os.stat(self.xml_directory)
+        if stat.st_mtime_ns == self._dir_mtime and time.time() - stat.st_mtime > self.MTIME_GRANULARITY:
+            self.last_pass_ms = round((time.perf_counter() - started) * 1000, 3)
+            return 0
+
+        self._dir_mtime = stat.st_mtime_ns
+        names = self._list()
+        self.listings += 1
+        new = names - self._names
+        self._names = names
+
+        queued = 0
+        for name in new:
+            if self.pool.submit(os.path.join(self.xml_directory, name)):
+                logger.info(f"New XML file detected: {name}")
+                queued += 1
+
+        self.last_pass_ms = round((time.perf_counter() - started) * 1000, 3)
+        return queued
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"Error scanning XML directory {self.xml_directory}: {e}")
+
+
+class XMLObserver(Observer):
+    """
+    Observer that also runs the backlog sweeper and polling scanner, and
+    shuts down the processing pool
     """
-    xml_directory = Config.RIGHTFAX_XML_DIRECTORY
+
+    def __init__(self, pool, sweeper=None, scanner=None):
+        super().__init__()
+        self.pool = pool
+        self.sweeper = sweeper
+        self.scanner = scanner
+
+    def start(self):
+        super().start()
+        if self.scanner:
+            self.scanner.start()
+        # Sweep after events are flowing so no file falls between the two
+        if self.sweeper:
+            self.sweeper.start()
+
+    def stop(self):
+        if self.sweeper:
+            self.sweeper.stop()
+        if self.scanner:
+            self.scanner.stop()
+        super().stop()
+        self.pool.close()
+
+    def stats(self):
+        """Processing pool metrics plus sweeper and scanner counters"""
+        stats = self.pool.stats()
+        if self.sweeper:
+            stats['sweeps'] = self.sweeper.swept
+            stats['recovered_by_sweep'] = self.sweeper.recovered
+            stats['linked_by_reconcile'] = self.sweeper.linked
+        if self.scanner:
+            stats['poll_passes'] = self.scanner.passes
+            stats['poll_listings'] = self.scanner.listings
+            stats['poll_last_pass_ms'] = self.scanner.last_pass_ms
+        return stats
+
+
+def create_xml_observer(xml_directory=None, ingest_mode=None, sweep=True, watch_mode=None, worker_mode=None):
+    """
+    Create and start an observer that processes XML files in a directory
+
+    Args:
+        xml_directory: Directory to watch (defaults to config)
+        ingest_mode: 'batch' or 'single' (defaults to config)
+        sweep: Process files already in the directory and reconcile
+            periodically (see BacklogSweeper)
+        watch_mode: 'events' (inotify) or 'poll' for network shares
+            (defaults to config)
+        worker_mode: 'thread', 'process' or 'celery' (defaults to config)
+
+    Returns:
+        XMLObserver: Running observer; call stop() and join() to shut it
+            down, and stats() for backpressure metrics
+    """
+    xml_directory = xml_directory or Config.RIGHTFAX_XML_DIRECTORY
+    ingest_mode = ingest_mode or Config.XML_INGEST_MODE
+    watch_mode = watch_mode or Config.XML_WATCH_MODE
+    worker_mode = worker_mode or Config.XML_WORKER_MODE
 
     # Ensure directory exists
     Path(xml_directory).mkdir(parents=True, exist_ok=True)
 
-    logger.info(f"Starting XML file watcher for directory: {xml_directory}")
+    logger.info(f"Starting XML file watcher for directory: {xml_directory} "
+                f"({watch_mode} detection, {ingest_mode} ingestion)")
+
+    # Create observer, processing pool and detector; Celery workers store files themselves
+    writer = CompletionWriter() if ingest_mode == 'batch' and worker_mode != 'celery' else None
+    pool = XMLProcessingPool(mode=worker_mode, writer=writer)
+    if pool.mode == 'celery':
+        logger.info(f"Queuing ready XML files on Celery queue {Config.XML_CELERY_QUEUE}")
+    else:
+        logger.info(f"Processing XML files with {pool.workers} {pool.mode} workers")
 
-    # Create observer and handler
-    event_handler = XMLFileHandler()
-    observer = Observer()
-    observer.schedule(event_handler, xml_directory, recursive=False)
+    scanner = DirectoryScanner(pool, xml_directory) if watch_mode == 'poll' else None
+    sweeper = BacklogSweeper(pool, xml_directory) if sweep else None
+    observer = XMLObserver(pool, sweeper, scanner)
+    if not scanner:
+        observer.schedule(XMLFileHandler(pool), xml_directory, recursive=False)
 
     # Start watching
     observer.start()
+    return observer
+
+
+def _maintain_partitions():
+    """Create upcoming partitions and drop expired ones, logging any error"""
+    try:
+        maintain_partitions()
+    except Exception as e:
+        logger.error(f"Error maintaining partitions: {e}")
+
+
+def _prune_rollups():
+    """Delete minute and hour rollups past their retention, logging any error"""
+    db = SessionLocal()
+    try:
+        deleted = prune_rollups(db)
+        if any(deleted.values()):
+            logger.info(f"Pruned completion rollups: {deleted}")
+    except Exception as e:
+        logger.error(f"Error pruning completion rollups: {e}")
+    finally:
+        db.close()
+
+
+def start_xml_watcher():
+    """
+    Start the XML file watcher service
+    """
+    from app.redis_client import publish_stats
+
+    # Completions need today's partitions before the first insert
+    _maintain_partitions()
+    observer = create_xml_observer()
 
     try:
         logger.info("XML file watcher started successfully")
 
-        # Keep the watcher running
+        # Keep the watcher running, publish backpressure metrics, keep
+        # partitions created ahead and apply the rollup retention
+        last_published = 0
+        last_maintained = time.monotonic()
         while True:
             time.sleep(1)
+            if time.monotonic() - last_published >= Config.XML_STATS_INTERVAL:
+                publish_stats('xml_watcher', observer.stats(), ttl=Config.XML_STATS_INTERVAL * 3)
+                last_published = time.monotonic()
+            if time.monotonic() - last_maintained >= Config.PARTITION_MAINTENANCE_INTERVAL:
+                _maintain_partitions()
+                _prune_rollups()
+                last_maintained = time.monotonic()
 
     except KeyboardInterrupt:
         logger.info("Stopping XML file watcher...")
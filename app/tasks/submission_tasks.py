@@ -1,124 +1,498 @@
 """
 Celery tasks for fax submission
 """
+import math
 import time
+import asyncio
 import logging
+from datetime import datetime, timedelta
+from celery import chord, group
+from sqlalchemy import update
 from app.celery_app import celery
+from app.config import Config
 from app.database import SessionLocal
-from app.models import SubmissionBatch, FaxSubmission
-from app.services.fcl_generator import FCLGenerator
-from app.services.rightfax_api import RightFaxAPIClient
+from app.models import SubmissionBatch, FaxSubmission, BatchCheckpoint
+from app.services.fcl_generator import FCLGenerator, new_correlation_token
+from app.services.rightfax_api import get_api_client
+from app.services.rightfax_async import AsyncRightFaxAPIClient
+from app.services.rate_scheduler import LoadProfile, RateScheduler, batch_rate_report
+from app.services.submission_writer import SubmissionWriter
+from app.redis_client import publish_stats
 
 logger = logging.getLogger(__name__)
 
 
 @celery.task(name='submit_batch')
-def submit_batch(batch_id):
+def submit_batch(batch_id, resume=False):
     """
     Submit a batch of faxes
+
+    The batch is planned as one or more chunks, each with a BatchCheckpoint
+    recording the first index not yet confirmed in the database. Batches in
+    'fanout' execution mode are split into chunks of Config.BATCH_CHUNK_SIZE
+    that run as parallel sub-tasks; the chord callback decides the final
+    batch status.
+
+    Interval and profile batches are paced by RateScheduler against
+    deadlines measured from batch.started_at. A run that is still going
+    after Config.SUBMISSION_TASK_SECONDS stops at its checkpoint and
+    re-enqueues itself as a resume, so long profiles are not killed by the
+    Celery task time limit.
+
+    Args:
+        batch_id: Batch ID
+        resume: Continue the unfinished checkpoints no other task has claimed
+            instead of starting over
     """
     db = SessionLocal()
+    batch = None
     try:
         batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
         if not batch:
             logger.error(f"Batch {batch_id} not found")
             return
 
+        if batch.status == 'cancelled':
+            logger.info(f"Batch {batch_id} was cancelled before it started")
+            return
+
+        if resume and batch.checkpoints:
+            unfinished = [cp for cp in batch.checkpoints if cp.status != 'completed']
+            checkpoints = [cp for cp in unfinished if claim_checkpoint(db, cp)]
+            if unfinished and not checkpoints:
+                db.rollback()
+                logger.info(f"Batch {batch_id} chunks are already claimed by another task")
+                return
+            _reanchor_schedule(batch)
+            logger.info(f"Resuming batch {batch_id}: {sum(cp.remaining for cp in checkpoints)} "
+                        f"faxes left in {len(checkpoints)} chunks")
+        else:
+            batch.submitted_count = 0
+            batch.failed_count = 0
+            batch.started_at = datetime.utcnow()
+            batch.checkpoints = [
+                BatchCheckpoint(chunk_start=start, chunk_stop=stop, chunk_step=step, next_index=start)
+                for start, stop, step in plan_batch_chunks(batch)
+            ]
+            checkpoints = batch.checkpoints
+            logger.info(f"Starting submission for batch {batch_id}: {batch.total_count} faxes")
+
         # Update status to in_progress
         batch.status = 'in_progress'
+        batch.completed_at = None
         db.commit()
 
-        logger.info(f"Starting submission for batch {batch_id}: {batch.total_count} faxes")
+        if len(checkpoints) > 1:
+            dispatch_batch_chunks(batch, checkpoints)
+            return
+
+        for checkpoint in checkpoints:
+            run_checkpoint(batch, db, checkpoint)
 
-        if batch.submission_method == 'FCL':
-            submit_via_fcl(batch, db)
-        elif batch.submission_method == 'API':
-            submit_via_api(batch, db)
+        # Paused or cancelled batches keep their status
+        db.refresh(batch)
+        if batch.status in SubmissionWriter.STOP_STATUSES:
+            logger.info(f"Batch {batch_id} stopped ({batch.status}) at "
+                        f"{batch.submitted_count + batch.failed_count}/{batch.total_count}")
+            return
+
+        # Out of time: continue the remainder in a fresh task
+        if any(cp.status == 'pending' for cp in checkpoints):
+            logger.info(f"Batch {batch_id} reached the task time budget at "
+                        f"{batch.submitted_count + batch.failed_count}/{batch.total_count}; continuing")
+            submit_batch.delay(batch_id, resume=True)
+            return
 
         # Update status to completed
         batch.status = 'completed'
-        batch.submitted_count = batch.total_count
+        batch.completed_at = datetime.utcnow()
         db.commit()
 
-        logger.info(f"Batch {batch_id} submission completed")
+        logger.info(f"Batch {batch_id} submission completed: {batch_rate_report(batch)}")
 
     except Exception as e:
         logger.error(f"Error submitting batch {batch_id}: {e}")
-        batch.status = 'failed'
+        db.rollback()
+        if batch is not None:
+            batch.status = 'failed'
+            db.commit()
+    finally:
+        db.close()
+
+
+def _should_fan_out(batch: SubmissionBatch):
+    """Decide whether a batch runs as parallel chunks"""
+    return batch.execution_mode == 'fanout' and batch.total_count > Config.BATCH_CHUNK_SIZE
+
+
+def plan_batch_chunks(batch: SubmissionBatch):
+    """
+    Split a batch into the index ranges its chunks submit
+
+    Serial batches are a single range. Fan-out batches that are immediate
+    get contiguous ranges; paced ones get interleaved (strided) ranges so
+    that each chunk follows the batch-wide deadlines and together they
+    reproduce the target rate. Paced chunks run for the whole schedule, so
+    there are at most Config.PACED_FANOUT_SLOTS of them: more than the
+    worker slots would leave some queued until others finish, and those
+    would then burst through their missed deadlines.
+
+    Args:
+        batch: SubmissionBatch to plan
+
+    Returns:
+        list: (start, stop, step) tuples
+    """
+    if not _should_fan_out(batch):
+        return [(0, batch.total_count, 1)]
+
+    chunk_size = Config.BATCH_CHUNK_SIZE
+
+    if batch.timing_type == 'immediate':
+        return [
+            (start, min(start + chunk_size, batch.total_count), 1)
+            for start in range(0, batch.total_count, chunk_size)
+        ]
+
+    chunk_count = min(math.ceil(batch.total_count / chunk_size), max(Config.PACED_FANOUT_SLOTS, 1))
+    return [(offset, batch.total_count, chunk_count) for offset in range(chunk_count)]
+
+
+def _reanchor_schedule(batch: SubmissionBatch):
+    """
+    Move a paced batch's schedule start so a resume continues at the
+    current target rate instead of bursting through missed deadlines
+    """
+    profile = LoadProfile.for_batch(batch)
+    if profile is None:
+        return
+
+    done = (batch.submitted_count or 0) + (batch.failed_count or 0)
+    batch.started_at = datetime.utcnow() - timedelta(seconds=profile.time_for_count(done))
+
+
+def dispatch_batch_chunks(batch: SubmissionBatch, checkpoints):
+    """
+    Submit a batch's unfinished chunks as a Celery chord
+
+    Args:
+        batch: SubmissionBatch to fan out
+        checkpoints: BatchCheckpoints of the chunks to run
+
+    Returns:
+        AsyncResult of the chord callback
+    """
+    chunks = [submit_batch_chunk.s(batch.id, checkpoint.id) for checkpoint in checkpoints]
+
+    logger.info(f"Fanning out batch {batch.id} into {len(chunks)} chunks of up to "
+                f"{Config.BATCH_CHUNK_SIZE} faxes")
+
+    return chord(group(chunks))(finalize_batch.s(batch.id))
+
+
+def claim_checkpoint(db, checkpoint: BatchCheckpoint):
+    """
+    Mark a pending or failed checkpoint in_progress for this task
+
+    The conditional UPDATE matches no row once another task has claimed
+    the checkpoint, so a checkpoint is never run by two tasks at once.
+    The claim is committed with the caller's transaction.
+
+    Args:
+        db: Database session
+        checkpoint: BatchCheckpoint to claim
+
+    Returns:
+        bool: True if this task now owns the checkpoint
+    """
+    claimed = db.execute(
+        update(BatchCheckpoint)
+        .where(BatchCheckpoint.id == checkpoint.id,
+               BatchCheckpoint.status.in_(['pending', 'failed']))
+        .values(status='in_progress', updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return claimed == 1
+
+
+def run_checkpoint(batch: SubmissionBatch, db, checkpoint: BatchCheckpoint):
+    """
+    Submit the unconfirmed remainder of one chunk
+
+    The checkpoint ends 'completed' when its range is exhausted, 'pending'
+    when the loop stopped for a pause or cancel or ran out of its
+    Config.SUBMISSION_TASK_SECONDS budget, and 'failed' on error.
+
+    Args:
+        batch: SubmissionBatch being submitted
+        db: Database session
+        checkpoint: BatchCheckpoint of the chunk
+
+    Returns:
+        dict: Counts of submitted and failed faxes and the new next_index
+    """
+    checkpoint.status = 'in_progress'
+    checkpoint.updated_at = datetime.utcnow()
+    db.commit()
+
+    deadline = None
+    if Config.SUBMISSION_TASK_SECONDS > 0:
+        deadline = time.monotonic() + Config.SUBMISSION_TASK_SECONDS
+
+    submit = submit_via_fcl if batch.submission_method == 'FCL' else submit_via_api
+    try:
+        result = submit(batch, db, checkpoint.next_index, checkpoint.chunk_stop,
+                        checkpoint.chunk_step, checkpoint_id=checkpoint.id, deadline=deadline)
+    except Exception:
+        db.rollback()
+        checkpoint.status = 'failed'
+        checkpoint.updated_at = datetime.utcnow()
         db.commit()
+        raise
+
+    checkpoint.status = 'completed' if result['next_index'] >= checkpoint.chunk_stop else 'pending'
+    checkpoint.updated_at = datetime.utcnow()
+    db.commit()
+
+    return result
+
+
+@celery.task(name='submit_batch_chunk', bind=True)
+def submit_batch_chunk(self, batch_id, checkpoint_id):
+    """
+    Submit the checkpointed range of one chunk of a fanned-out batch
+
+    Errors are returned rather than raised so that one failing chunk
+    does not prevent the chord callback from running. A chunk that runs
+    out of its time budget replaces itself with a new task for the rest
+    of its range, which keeps its place in the chord.
+
+    Returns:
+        dict: Chunk range with submitted/failed counts and optional error
+    """
+    result = {'checkpoint_id': checkpoint_id, 'submitted': 0, 'failed': 0, 'error': None}
+    out_of_time = False
+
+    db = SessionLocal()
+    try:
+        batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+        checkpoint = db.query(BatchCheckpoint).filter(BatchCheckpoint.id == checkpoint_id).first()
+        if not batch or not checkpoint:
+            result['error'] = f"Batch {batch_id} checkpoint {checkpoint_id} not found"
+            return result
+
+        result.update(start=checkpoint.chunk_start, stop=checkpoint.chunk_stop, step=checkpoint.chunk_step)
+        result.update(run_checkpoint(batch, db, checkpoint))
+
+        logger.info(f"Batch {batch_id} chunk {result['start']}-{result['stop']} done: "
+                    f"{result['submitted']} submitted, {result['failed']} failed")
+
+        db.refresh(batch)
+        out_of_time = (checkpoint.status == 'pending'
+                       and batch.status not in SubmissionWriter.STOP_STATUSES)
+
+    except Exception as e:
+        logger.error(f"Error submitting batch {batch_id} checkpoint {checkpoint_id}: {e}")
+        db.rollback()
+        result['error'] = str(e)
     finally:
         db.close()
 
+    # Outside the try: replace() raises to end this task
+    if out_of_time:
+        logger.info(f"Batch {batch_id} checkpoint {checkpoint_id} reached the task time budget; continuing")
+        return self.replace(submit_batch_chunk.si(batch_id, checkpoint_id))
 
-def submit_via_fcl(batch: SubmissionBatch, db):
-    """Submit faxes using FCL file method"""
-    fcl_gen = FCLGenerator()
+    return result
 
-    for i in range(batch.total_count):
-        try:
-            # Generate FCL file
-            fcl_filename = fcl_gen.generate_fcl(
-                recipient_phone=batch.recipient_phone,
-                recipient_name=batch.recipient_name or f"Recipient {i+1}",
-                account_name=batch.account_name,
-                attachment_filename=batch.attachment_filename
-            )
 
-            # Create submission record
-            submission = FaxSubmission(
-                batch_id=batch.id,
-                submission_method='FCL',
-                recipient_phone=batch.recipient_phone,
-                recipient_name=batch.recipient_name,
-                account_name=batch.account_name,
-                fcl_filename=fcl_filename,
-                submission_status='submitted'
-            )
-            db.add(submission)
+@celery.task(name='finalize_batch')
+def finalize_batch(chunk_results, batch_id):
+    """
+    Set the final status of a fanned-out batch
 
-            # Update batch count
-            batch.submitted_count = i + 1
-            db.commit()
+    The counters are already maintained by each chunk's SubmissionWriter.
+    Paused and cancelled batches keep their status.
 
-            logger.debug(f"Submitted fax {i+1}/{batch.total_count} via FCL: {fcl_filename}")
+    Args:
+        chunk_results: List of dicts returned by submit_batch_chunk
+        batch_id: Batch ID
+    """
+    db = SessionLocal()
+    try:
+        batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+        if not batch:
+            logger.error(f"Batch {batch_id} not found")
+            return
 
-            # Apply interval if needed
-            if batch.timing_type == 'interval' and batch.interval_seconds:
-                if i < batch.total_count - 1:  # Don't sleep after last fax
-                    time.sleep(batch.interval_seconds)
+        errors = [r for r in chunk_results if r.get('error')]
+        for r in errors:
+            logger.error(f"Batch {batch_id} checkpoint {r['checkpoint_id']} failed: {r['error']}")
 
-        except Exception as e:
-            logger.error(f"Error submitting fax {i+1} via FCL: {e}")
-            submission = FaxSubmission(
-                batch_id=batch.id,
-                submission_method='FCL',
-                recipient_phone=batch.recipient_phone,
-                recipient_name=batch.recipient_name,
-                account_name=batch.account_name,
-                submission_status='failed',
-                error_message=str(e)
-            )
-            db.add(submission)
-            db.commit()
+        if batch.status in SubmissionWriter.STOP_STATUSES:
+            logger.info(f"Batch {batch_id} stopped ({batch.status}) at "
+                        f"{batch.submitted_count + batch.failed_count}/{batch.total_count}")
+            return
 
+        batch.status = 'failed' if errors else 'completed'
+        batch.completed_at = datetime.utcnow()
+        db.commit()
 
-def submit_via_api(batch: SubmissionBatch, db):
-    """Submit faxes using RightFax REST API"""
-    api_client = RightFaxAPIClient()
+        logger.info(f"Batch {batch_id} fan-out finished: {batch.submitted_count} submitted, "
+                    f"{batch.failed_count} failed across {len(chunk_results)} chunks: "
+                    f"{batch_rate_report(batch)}")
 
-    for i in range(batch.total_count):
-        try:
-            # Submit via API
-            response = api_client.submit_fax(
-                recipient_phone=batch.recipient_phone,
-                recipient_name=batch.recipient_name or f"Recipient {i+1}",
-                account_name=batch.account_name,
-                attachment_path=batch.attachment_filename
+    except Exception as e:
+        logger.error(f"Error finalizing batch {batch_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def submit_via_fcl(batch: SubmissionBatch, db, start=0, stop=None, step=1, checkpoint_id=None,
+                   deadline=None):
+    """
+    Submit faxes using FCL file method
+
+    Args:
+        batch: SubmissionBatch to submit
+        db: Database session
+        start: Index of the first fax to submit
+        stop: Index after the last fax to submit (defaults to total_count)
+        step: Stride between submitted indexes
+        checkpoint_id: BatchCheckpoint advanced as rows are written (optional)
+        deadline: time.monotonic() value at which to stop and leave the rest (optional)
+
+    Returns:
+        dict: Counts of submitted and failed faxes and the next unconfirmed index
+    """
+    fcl_gen = FCLGenerator()
+    stop = batch.total_count if stop is None else stop
+    scheduler = RateScheduler.for_batch(batch)
+
+    # Render the FCL content once; each fax only fills in the recipient name
+    template = fcl_gen.prepare_template(
+        recipient_phone=batch.recipient_phone,
+        account_name=batch.account_name,
+        attachment_filename=batch.attachment_filename
+    )
+
+    # Paced batches write each file at its deadline; immediate batches
+    # write blocks of files in parallel
+    indexes = range(start, stop, step)
+    block_size = 1 if scheduler else Config.FCL_WRITE_BLOCK_SIZE
+
+    with SubmissionWriter(db, batch.id, checkpoint_id=checkpoint_id, start=start, step=step,
+                          deadline=deadline) as writer:
+        for offset in range(0, len(indexes), block_size):
+            block = indexes[offset:offset + block_size]
+            if writer.stop_requested():
+                break
+            if scheduler and not scheduler.wait_for(block[0], should_stop=writer.stop_requested):
+                break
+
+            tokens = [new_correlation_token() for _ in block]
+            results = fcl_gen.generate_batch(
+                template,
+                [batch.recipient_name or f"Recipient {i+1}" for i in block],
+                tokens
             )
 
-            # Create submission record
-            submission = FaxSubmission(
-                batch_id=batch.id,
+            for i, token, (fcl_filename, error) in zip(block, tokens, results):
+                if error:
+                    logger.error(f"Error submitting fax {i+1} via FCL: {error}")
+                    writer.add(
+                        index=i,
+                        submission_method='FCL',
+                        recipient_phone=batch.recipient_phone,
+                        recipient_name=batch.recipient_name,
+                        account_name=batch.account_name,
+                        submission_status='failed',
+                        error_message=str(error)
+                    )
+                    continue
+
+                # Buffer submission record (flushed in bulk with the batch counters)
+                writer.add(
+                    index=i,
+                    submission_method='FCL',
+                    recipient_phone=batch.recipient_phone,
+                    recipient_name=batch.recipient_name,
+                    account_name=batch.account_name,
+                    fcl_filename=fcl_filename,
+                    correlation_token=token,
+                    submission_status='submitted'
+                )
+
+                logger.debug(f"Submitted fax {i+1}/{batch.total_count} via FCL: {fcl_filename}")
+
+    if scheduler:
+        logger.info(f"Batch {batch.id} range {start}-{stop}/{step} max schedule lag: {scheduler.max_lag:.3f}s")
+
+    return {'submitted': writer.submitted, 'failed': writer.failed, 'next_index': writer.next_index}
+
+
+def submit_via_api(batch: SubmissionBatch, db, start=0, stop=None, step=1, checkpoint_id=None,
+                   deadline=None):
+    """
+    Submit faxes using RightFax REST API
+
+    Args:
+        batch: SubmissionBatch to submit
+        db: Database session
+        start: Index of the first fax to submit
+        stop: Index after the last fax to submit (defaults to total_count)
+        step: Stride between submitted indexes
+        checkpoint_id: BatchCheckpoint advanced as rows are written (optional)
+        deadline: time.monotonic() value at which to stop and leave the rest (optional)
+
+    Returns:
+        dict: Counts of submitted and failed faxes and the next unconfirmed index
+    """
+    if batch.api_concurrency and batch.api_concurrency > 1:
+        return submit_via_api_async(batch, db, start, stop, step, checkpoint_id, deadline)
+
+    api_client = get_api_client()
+    stop = batch.total_count if stop is None else stop
+    scheduler = RateScheduler.for_batch(batch)
+
+    # Read and encode the attachment once for every send in this range
+    attachment = None
+    if batch.attachment_filename:
+        attachment = api_client.prepare_attachment(batch.attachment_filename)
+
+    with SubmissionWriter(db, batch.id, checkpoint_id=checkpoint_id, start=start, step=step,
+                          deadline=deadline) as writer:
+        for i in range(start, stop, step):
+            if writer.stop_requested():
+                break
+            if scheduler and not scheduler.wait_for(i, should_stop=writer.stop_requested):
+                break
+
+            try:
+                # Submit via API
+                response = api_client.submit_fax(
+                    recipient_phone=batch.recipient_phone,
+                    recipient_name=batch.recipient_name or f"Recipient {i+1}",
+                    account_name=batch.account_name,
+                    attachment=attachment
+                )
+            except Exception as e:
+                logger.error(f"Error submitting fax {i+1} via API: {e}")
+                writer.add(
+                    index=i,
+                    submission_method='API',
+                    recipient_phone=batch.recipient_phone,
+                    recipient_name=batch.recipient_name,
+                    account_name=batch.account_name,
+                    submission_status='failed',
+                    error_message=str(e)
+                )
+                continue
+
+            # Buffer submission record (flushed in bulk with the batch counters)
+            writer.add(
+                index=i,
                 submission_method='API',
                 recipient_phone=batch.recipient_phone,
                 recipient_name=batch.recipient_name,
@@ -127,32 +501,170 @@ def submit_via_api(batch: SubmissionBatch, db):
                 api_response_code=response.get('status_code'),
                 submission_status='submitted'
             )
-            db.add(submission)
-
-            # Update batch count
-            batch.submitted_count = i + 1
-            db.commit()
 
             logger.debug(f"Submitted fax {i+1}/{batch.total_count} via API: {response.get('job_id')}")
 
-            # Apply interval if needed
-            if batch.timing_type == 'interval' and batch.interval_seconds:
-                if i < batch.total_count - 1:
-                    time.sleep(batch.interval_seconds)
+    if scheduler:
+        logger.info(f"Batch {batch.id} range {start}-{stop}/{step} max schedule lag: {scheduler.max_lag:.3f}s")
 
-        except Exception as e:
-            logger.error(f"Error submitting fax {i+1} via API: {e}")
-            submission = FaxSubmission(
-                batch_id=batch.id,
-                submission_method='API',
-                recipient_phone=batch.recipient_phone,
-                recipient_name=batch.recipient_name,
-                account_name=batch.account_name,
-                submission_status='failed',
-                error_message=str(e)
-            )
-            db.add(submission)
-            db.commit()
+    publish_stats('api_pool', api_client.pool_stats())
+
+    return {'submitted': writer.submitted, 'failed': writer.failed, 'next_index': writer.next_index}
+
+
+def submit_via_api_async(batch: SubmissionBatch, db, start=0, stop=None, step=1, checkpoint_id=None,
+                        deadline=None):
+    """
+    Submit faxes through the asyncio engine
+
+    Keeps up to batch.api_concurrency requests in flight. Produces the same
+    FaxSubmission rows as submit_via_api.
+
+    Args:
+        batch: SubmissionBatch to submit
+        db: Database session
+        start: Index of the first fax to submit
+        stop: Index after the last fax to submit (defaults to total_count)
+        step: Stride between submitted indexes
+        checkpoint_id: BatchCheckpoint advanced as rows are written (optional)
+        deadline: time.monotonic() value at which to stop and leave the rest (optional)
+
+    Returns:
+        dict: Counts of submitted and failed faxes and the next unconfirmed index
+    """
+    stop = batch.total_count if stop is None else stop
+    scheduler = RateScheduler.for_batch(batch)
+    concurrency = min(batch.api_concurrency, Config.API_MAX_CONCURRENCY)
+
+    # Read batch fields once; writer commits expire the ORM instance
+    fields = {
+        'batch_id': batch.id,
+        'total_count': batch.total_count,
+        'recipient_phone': batch.recipient_phone,
+        'recipient_name': batch.recipient_name,
+        'account_name': batch.account_name
+    }
+
+    # Read and encode the attachment once for every send in this range
+    attachment = None
+    if batch.attachment_filename:
+        attachment = get_api_client().prepare_attachment(batch.attachment_filename)
+
+    logger.info(f"Batch {batch.id} range {start}-{stop}/{step}: async API engine, concurrency {concurrency}")
+
+    with SubmissionWriter(db, batch.id, checkpoint_id=checkpoint_id, start=start, step=step,
+                          deadline=deadline) as writer:
+        pool_stats = asyncio.run(_run_async_api_engine(fields, attachment, range(start, stop, step),
+                                                       scheduler, writer, concurrency))
+
+    publish_stats('api_pool_async', dict(pool_stats, batch_id=fields['batch_id']))
+
+    if scheduler:
+        logger.info(f"Batch {batch.id} range {start}-{stop}/{step} max schedule lag: {scheduler.max_lag:.3f}s")
+
+    return {'submitted': writer.submitted, 'failed': writer.failed, 'next_index': writer.next_index}
+
+
+async def _run_async_api_engine(fields, attachment, indexes, scheduler, writer, concurrency):
+    """
+    Event loop body for submit_via_api_async
+
+    A semaphore bounds in-flight requests, so only `concurrency` send
+    coroutines exist at any time regardless of batch size. Sends only
+    buffer their rows; a flusher task writes them and reads the batch
+    status in an executor thread, so database round trips never stall the
+    requests in flight.
+
+    Returns:
+        dict: Connection pool statistics of the run
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = set()
+    wake = asyncio.Event()
+    finished = asyncio.Event()
+
+    async def flush_periodically():
+        interval = max(writer.flush_interval, 0.05)
+        while not finished.is_set():
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+
+            # One call at a time, so the session is never used concurrently
+            if writer.pending:
+                await loop.run_in_executor(None, writer.write, *writer.take())
+            elif writer.status_check_due():
+                await loop.run_in_executor(None, writer.refresh_status)
+
+    flusher = asyncio.create_task(flush_periodically())
+
+    def should_stop():
+        # A failed write ends the flusher; stop sending like the serial engine does
+        return writer.stopped or flusher.done()
+
+    async with AsyncRightFaxAPIClient(concurrency=concurrency) as api_client:
+
+        async def send(i):
+            try:
+                response = await api_client.submit_fax(
+                    recipient_phone=fields['recipient_phone'],
+                    recipient_name=fields['recipient_name'] or f"Recipient {i+1}",
+                    account_name=fields['account_name'],
+                    attachment=attachment
+                )
+            except Exception as e:
+                logger.error(f"Error submitting fax {i+1} via async API: {e}")
+                writer.buffer(
+                    index=i,
+                    submission_method='API',
+                    recipient_phone=fields['recipient_phone'],
+                    recipient_name=fields['recipient_name'],
+                    account_name=fields['account_name'],
+                    submission_status='failed',
+                    error_message=str(e)
+                )
+            else:
+                writer.buffer(
+                    index=i,
+                    submission_method='API',
+                    recipient_phone=fields['recipient_phone'],
+                    recipient_name=fields['recipient_name'],
+                    account_name=fields['account_name'],
+                    rightfax_job_id=response.get('job_id'),
+                    api_response_code=response.get('status_code'),
+                    submission_status='submitted'
+                )
+                logger.debug(f"Submitted fax {i+1}/{fields['total_count']} via async API: {response.get('job_id')}")
+            finally:
+                semaphore.release()
+                if writer.pending >= writer.flush_size:
+                    wake.set()
+
+        try:
+            for i in indexes:
+                if should_stop():
+                    break
+                if scheduler and not await scheduler.wait_for_async(i, should_stop=should_stop):
+                    break
+
+                await semaphore.acquire()
+                task = asyncio.create_task(send(i))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        finally:
+            # Rows still buffered are written by the writer's close();
+            # awaiting the flusher re-raises a failed write
+            finished.set()
+            wake.set()
+            await flusher
+
+        return api_client.pool_stats()
 
 
 @celery.task(name='submit_single_fax')
@@ -169,11 +681,13 @@ def submit_single_fax(batch_id, index):
 
         if batch.submission_method == 'FCL':
             fcl_gen = FCLGenerator()
+            token = new_correlation_token()
             fcl_filename = fcl_gen.generate_fcl(
                 recipient_phone=batch.recipient_phone,
                 recipient_name=batch.recipient_name or f"Recipient {index}",
                 account_name=batch.account_name,
-                attachment_filename=batch.attachment_filename
+                attachment_filename=batch.attachment_filename,
+                correlation_token=token
             )
 
             submission = FaxSubmission(
@@ -183,10 +697,11 @@ def submit_single_fax(batch_id, index):
                 recipient_name=batch.recipient_name,
                 account_name=batch.account_name,
                 fcl_filename=fcl_filename,
+                correlation_token=token,
                 submission_status='submitted'
             )
         else:  # API
-            api_client = RightFaxAPIClient()
+            api_client = get_api_client()
             response = api_client.submit_fax(
                 recipient_phone=batch.recipient_phone,
                 recipient_name=batch.recipient_name or f"Recipient {index}",
@@ -206,7 +721,7 @@ def submit_single_fax(batch_id, index):
             )
 
         db.add(submission)
-        batch.submitted_count += 1
+        batch.submitted_count = SubmissionBatch.submitted_count + 1
         db.commit()
 
     except Exception as e:
@@ -1,28 +1,63 @@
 """
 Celery tasks for XML processing
 """
+import os
+import time
 import logging
 from app.celery_app import celery
+from app.config import Config
 from app.services.xml_parser import XMLParser
 from app.database import SessionLocal
+from app.redis_client import claim, release
 
 logger = logging.getLogger(__name__)
 
 
-@celery.task(name='process_xml_file')
-def process_xml_file(xml_filepath):
+@celery.task(name='process_xml_file', acks_late=True)
+def process_xml_file(xml_filepath, queued_token=None, detected_at=None):
     """
     Process a single XML completion file
+
+    Routed to the XML_CELERY_QUEUE queue, where the watcher enqueues files
+    in XML_WORKER_MODE=celery. Running it twice for one file is safe: a
+    Redis claim lets only one worker process the file at a time, and a file
+    that was already archived is skipped. Claims expire after XML_CLAIM_TTL,
+    so a worker that dies does not hold a file forever.
+
+    Args:
+        xml_filepath: Path to XML file
+        queued_token: Token of the watcher's queued marker, released once
+            the file is handled so a later sweep may queue it again
+        detected_at: time.time() the watcher detected the file
+
+    Returns:
+        bool: True if the file was processed by this call
     """
+    token = claim(f"xml:file:{xml_filepath}", Config.XML_CLAIM_TTL)
+    if not token:
+        logger.info(f"XML file claimed by another worker, skipping: {xml_filepath}")
+        return False
+
     db = SessionLocal()
     try:
+        if not os.path.exists(xml_filepath):
+            logger.debug(f"File already processed or removed: {xml_filepath}")
+            return False
+
         parser = XMLParser(db)
-        parser.process_xml_file(xml_filepath)
-        logger.info(f"Processed XML file: {xml_filepath}")
+        processed = parser.process_xml_file(xml_filepath)
+        if processed:
+            latency = f" ({(time.time() - detected_at) * 1000:.0f}ms after detection)" if detected_at else ''
+            logger.info(f"Processed XML file: {xml_filepath}{latency}")
+        return processed
     except Exception as e:
         logger.error(f"Error processing XML file {xml_filepath}: {e}")
+        return False
     finally:
         db.close()
+        release(f"xml:file:{xml_filepath}", token)
+        if queued_token:
+            release(f"xml:queued:{xml_filepath}", queued_token)
 
 
 @celery.task(name='cleanup_old_archives')
@@ -36,3 +71,79 @@ def cleanup_old_archives():
         logger.info("Cleaned up old XML archives")
     except Exception as e:
         logger.error(f"Error cleaning up archives: {e}")
+
+
+@celery.task(name='compact_raw_xml')
+def compact_raw_xml(chunk_size=1000):
+    """
+    Move legacy raw XML into compressed storage and apply XML_RAW_RETENTION
+    """
+    db = SessionLocal()
+    try:
+        parser = XMLParser(db)
+        return parser.compact_raw_xml(chunk_size)
+    except Exception as e:
+        logger.error(f"Error compacting raw XML: {e}")
+    finally:
+        db.close()
+
+
+@celery.task(name='reconcile_submission_links')
+def reconcile_submission_links():
+    """
+    Link FCL submissions and completions by correlation token in bulk
+    """
+    db = SessionLocal()
+    try:
+        parser = XMLParser(db)
+        return parser.reconcile_submission_links()
+    except Exception as e:
+        logger.error(f"Error reconciling submission links: {e}")
+    finally:
+        db.close()
+
+
+@celery.task(name='rebuild_rollups')
+def rebuild_rollups(days=1):
+    """
+    Recompute the completion rollups of the last days (today included) from fax_completions
+    """
+    from datetime import date, timedelta
+    from app.services import rollups
+
+    db = SessionLocal()
+    try:
+        today = date.today()
+        return rollups.rebuild_rollups(db, today - timedelta(days=days - 1), today)
+    except Exception as e:
+        logger.error(f"Error rebuilding completion rollups: {e}")
+    finally:
+        db.close()
+
+
+@celery.task(name='prune_rollups')
+def prune_rollups():
+    """
+    Delete minute and hour rollups older than their retention
+    """
+    from app.services import rollups
+
+    db = SessionLocal()
+    try:
+        return rollups.prune_rollups(db)
+    except Exception as e:
+        logger.error(f"Error pruning completion rollups: {e}")
+    finally:
+        db.close()
+
+
+@celery.task(name='maintain_partitions')
+def maintain_partitions():
+    """
+    Create upcoming time partitions and drop the ones past DB_RETENTION_DAYS
+    """
+    try:
+        from app.services.partitions import maintain_partitions
+        return maintain_partitions()
+    except Exception as e:
+        logger.error(f"Error maintaining partitions: {e}")
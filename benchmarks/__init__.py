@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for the RightFax Testing Platform
+Run with: python -m benchmarks.run --help
+"""
@@ -0,0 +1,215 @@
+"""
+Benchmark Harness
+Local stand-ins, measurement helpers, and results/baseline handling shared
+by the benchmark scenarios
+"""
+import json
+import math
+import socket
+import asyncio
+import logging
+import threading
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from aiohttp import web
+from sqlalchemy import create_engine
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = Path(__file__).parent
+RESULTS_DIR = BENCHMARK_DIR / 'results'
+BASELINE_FILE = BENCHMARK_DIR / 'baseline.json'
+
+# Metric name suffix -> True when higher is better
+METRIC_DIRECTIONS = {
+    '_per_minute': True,
+    '_per_second': True,
+    '_ms': False,
+    '_seconds': False,
+}
+
+# PRD targets: (scenario, metric, limit, higher_is_better)
+PRD_TARGETS = {
+    'REQ-TECH-010': ('api_submission', 'throughput_per_minute', 100, True),
+    'REQ-TECH-011': ('xml_processing', 'latency_p95_seconds', 5, False),
+    'REQ-TECH-012': ('api_queries', 'latency_p95_ms', 2000, False),
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def latency_summary(values, unit, digits=3):
+    """p50/p95/p99/max of latencies, keyed latency_<stat>_<unit>"""
+    summary = {}
+    for name, pct in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)):
+        value = percentile(values, pct)
+        summary[f"latency_{name}_{unit}"] = round(value, digits) if value is not None else None
+    return summary
+
+
+def utc_timestamp(naive_utc):
+    """Epoch seconds of a naive UTC datetime as stored by the models"""
+    return naive_utc.replace(tzinfo=timezone.utc).timestamp()
+
+
+def bind_database(database_url):
+    """
+    Point the application's engine and sessions at another database
+
+    The runner binds a throwaway SQLite database unless --database-url
+    names another one.
+    """
+    import app.database as database
+
+    engine = create_engine(database_url)
+    database.engine = engine
+    database.SessionLocal.remove()
+    database.SessionLocal.configure(bind=engine)
+    database.create_schema(engine)
+    return engine
+
+
+class SimulatorThread:
+    """
+    RightFax simulator running on its own event loop thread
+
+    Usage:
+        with SimulatorThread(simulator) as url:
+            Config.RIGHTFAX_API_URL = url
+    """
+
+    def __init__(self, simulator, host='127.0.0.1'):
+        self.simulator = simulator
+        self.host = host
+        self.port = _free_port(host)
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return f"http://{self.host}:{self.port}"
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        return False
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.simulator.create_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+
+def _free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def write_results(results, path=None):
+    """
+    Write a results file
+
+    Returns:
+        Path: File written (benchmarks/results/<UTC timestamp>.json by default)
+    """
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = Path(path) if path else RESULTS_DIR / f"{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    path.write_text(json.dumps(results, indent=2, default=str) + '\n')
+    return path
+
+
+def load_baseline(path=None):
+    """Load the stored baseline (None if there is none yet)"""
+    path = Path(path) if path else BASELINE_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def metric_direction(metric):
+    """True if higher is better, False if lower is better, None if not compared"""
+    for suffix, higher_is_better in METRIC_DIRECTIONS.items():
+        if metric.endswith(suffix):
+            return higher_is_better
+    return None
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Find metrics that regressed beyond tolerance
+
+    Args:
+        results: Results of this run
+        baseline: Stored baseline results
+        tolerance: Allowed relative change in the bad direction (0.2 = 20%)
+
+    Runs on another database engine than the baseline, and scenarios that
+    ran with different parameters, are not comparable and are skipped.
+
+    Returns:
+        list: Regression descriptions
+    """
+    regressions = []
+    base_database = baseline.get('environment', {}).get('database')
+    database = results.get('environment', {}).get('database')
+    if base_database and database and base_database != database:
+        logger.warning(f"Skipping baseline comparison: baseline ran on {base_database}, this run on {database}")
+        return regressions
+
+    for scenario, metrics in results['scenarios'].items():
+        base_params = baseline.get('params', {}).get(scenario)
+        if base_params is not None and base_params != results.get('params', {}).get(scenario):
+            logger.warning(f"Skipping baseline comparison for {scenario}: parameters differ from baseline")
+            continue
+
+        base_metrics = baseline.get('scenarios', {}).get(scenario, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            higher_is_better = metric_direction(metric)
+            if higher_is_better is None or not isinstance(value, (int, float)) \
+                    or not isinstance(base, (int, float)) or base == 0:
+                continue
+
+            change = (value - base) / abs(base)
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{scenario}.{metric}: {value} vs baseline {base} ({change:+.1%})")
+
+    return regressions
+
+
+def check_prd_targets(results):
+    """
+    Check the PRD performance targets for the scenarios that ran
+
+    Returns:
+        dict: Requirement ID -> {'value', 'target', 'passed'}
+    """
+    checks = {}
+    for requirement, (scenario, metric, limit, higher_is_better) in PRD_TARGETS.items():
+        value = results['scenarios'].get(scenario, {}).get(metric)
+        if value is None:
+            continue
+        passed = value >= limit if higher_is_better else value <= limit
+        checks[requirement] = {'value': value, 'target': limit, 'passed': passed}
+    return checks
+
+
+def git_commit():
+    """Current commit hash, if the tree is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
@@ -0,0 +1,140 @@
+"""
+Benchmark Runner
+Runs the benchmark scenarios, writes a results file, and compares it with
+the stored baseline and the PRD performance targets
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios api_submission,xml_processing --count 500
+    python -m benchmarks.run --update-baseline
+
+Exits with status 1 when a metric regressed beyond --tolerance or a PRD
+target was missed.
+"""
+import sys
+import json
+import shutil
+import argparse
+import logging
+import tempfile
+from datetime import datetime
+
+
+def parse_args(argv=None):
+    from benchmarks.harness import BASELINE_FILE
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run',
+                                     description='RightFax Testing Platform performance benchmarks')
+    parser.add_argument('--scenarios', default='api_submission,fcl_submission,xml_processing,api_queries',
+                        help='Comma-separated scenarios to run')
+    parser.add_argument('--count', type=int, default=1000,
+                        help='Faxes per submission batch (default: 1000)')
+    parser.add_argument('--api-concurrency', type=int, default=1,
+                        help='api_concurrency of the API batch; >1 uses the async engine (default: 1)')
+    parser.add_argument('--api-latency', default='fixed:20',
+                        help='Simulator API latency distribution in ms (default: fixed:20)')
+    parser.add_argument('--xml-files', type=int, default=500,
+                        help='Completion XML files to write (default: 500)')
+    parser.add_argument('--xml-rate', type=float, default=50,
+                        help='XML files written per second (default: 50)')
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='Completions seeded for the query benchmark (default: 1000000)')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Timed requests per query endpoint (default: 20)')
+    parser.add_argument('--database-url',
+                        help='Database to run against (default: a throwaway SQLite database). '
+                             'The application database is only used when its URL is passed here')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE),
+                        help='Baseline file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative regression against the baseline (default: 0.2)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store this run as the new baseline')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--keep-data', action='store_true',
+                        help='Keep the seeded completions so later runs against --database-url reuse them')
+    parser.add_argument('--ignore-targets', action='store_true',
+                        help='Do not fail on missed PRD targets')
+    parser.add_argument('--verbose', action='store_true', help='Show application logs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Configure logging before the application modules add their handlers
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from benchmarks import harness
+
+    # Never touch the application database unless it is named explicitly
+    workdir = None
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        workdir = tempfile.mkdtemp(prefix='rightfax-bench-db-')
+        database_url = f"sqlite:///{workdir}/bench.db"
+    harness.bind_database(database_url)
+
+    from benchmarks import scenarios
+
+    selected = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(selected) - set(scenarios.SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}. "
+              f"Available: {', '.join(scenarios.SCENARIOS)}", file=sys.stderr)
+        return 2
+
+    results = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': harness.git_commit(),
+        'environment': scenarios.environment(),
+        'params': {},
+        'scenarios': {}
+    }
+
+    try:
+        for name in selected:
+            print(f"Running {name}...", flush=True)
+            results['params'][name] = scenarios.scenario_params(name, args)
+            results['scenarios'][name] = scenarios.run_scenario(name, args)
+            print(json.dumps(results['scenarios'][name], indent=2), flush=True)
+    finally:
+        scenarios.cleanup(keep_query_rows=args.keep_data)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    path = harness.write_results(results, args.output)
+    print(f"Results written to {path}")
+
+    failed = False
+
+    targets = harness.check_prd_targets(results)
+    for requirement, check in targets.items():
+        outcome = 'PASS' if check['passed'] else 'FAIL'
+        print(f"{requirement}: {outcome} ({check['value']} vs target {check['target']})")
+        if not check['passed'] and not args.ignore_targets:
+            failed = True
+
+    baseline = harness.load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+    else:
+        regressions = harness.compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            failed = True
+        else:
+            print(f"No regressions beyond {args.tolerance:.0%} against baseline from {baseline.get('commit')}")
+
+    if args.update_baseline:
+        harness.write_results(results, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,374 @@
+"""
+Benchmark Scenarios
+Each scenario drives one part of the pipeline against local stand-ins and
+returns a flat dict of metrics
+"""
+import os
+import time
+import random
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import insert, func
+from app.config import Config
+from app.database import SessionLocal
+from app.models import (
+    SubmissionBatch, FaxSubmission, FaxCompletion, FaxCompletionXML, FaxJobStage, BatchCheckpoint
+)
+from app.services.rollups import apply_rollups, rebuild_rollups
+from benchmarks.harness import SimulatorThread, latency_summary, utc_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Rows created by the benchmarks carry these markers so they can be removed
+JOB_ID_PREFIX = 'BENCH'
+QUERY_JOB_ID_PREFIX = 'BENCHQ'
+BATCH_NAME_PREFIX = 'benchmark-'
+
+
+def run_submission(method, count, concurrency=1, latency_ms='fixed:20'):
+    """
+    Submit one immediate batch through submit_batch against the simulator
+
+    Args:
+        method: 'API' or 'FCL'
+        count: Faxes in the batch
+        concurrency: api_concurrency of the batch (API only)
+        latency_ms: Simulator API latency distribution
+
+    Returns:
+        dict: Metrics
+    """
+    import app.services.rightfax_api as rightfax_api
+    from app.services.rightfax_simulator import RightFaxSimulator
+    from app.tasks.submission_tasks import submit_batch
+
+    workdir = Path(tempfile.mkdtemp(prefix='rightfax-bench-'))
+    fcl_directory = str(workdir / 'fcl')
+    simulator = RightFaxSimulator(
+        fcl_directory=fcl_directory,
+        xml_directory=str(workdir / 'xml'),
+        latency_ms=latency_ms,
+        send_seconds='fixed:1',
+        http_errors='',
+        failure_rate=0,
+        write_history=False
+    )
+
+    with SimulatorThread(simulator) as url:
+        Config.RIGHTFAX_API_URL = url
+        Config.RIGHTFAX_FCL_DIRECTORY = fcl_directory
+        rightfax_api._shared_client = None  # pick up the simulator URL
+
+        db = SessionLocal()
+        try:
+            batch = SubmissionBatch(
+                batch_name=f"{BATCH_NAME_PREFIX}{method.lower()}",
+                total_count=count,
+                submission_method=method,
+                timing_type='immediate',
+                execution_mode='serial',
+                api_concurrency=concurrency if method == 'API' else None,
+                recipient_phone='5550100',
+                account_name='BENCH',
+                status='pending'
+            )
+            db.add(batch)
+            db.commit()
+            batch_id = batch.id
+        finally:
+            db.close()
+
+        started = time.perf_counter()
+        submit_batch(batch_id)
+        elapsed = time.perf_counter() - started
+
+        # FCL submission is done once RightFax has picked every file up
+        drained = None
+        if method == 'FCL':
+            deadline = time.monotonic() + 60
+            while simulator.counters['fcl_consumed'] < count and time.monotonic() < deadline:
+                time.sleep(0.05)
+            drained = round(time.perf_counter() - started, 3)
+
+        db = SessionLocal()
+        try:
+            batch = db.query(SubmissionBatch).filter(SubmissionBatch.id == batch_id).first()
+            submitted, failed, status = batch.submitted_count, batch.failed_count, batch.status
+        finally:
+            db.close()
+
+    metrics = {
+        'faxes': count,
+        'status': status,
+        'submitted': submitted,
+        'failed': failed,
+        'duration_seconds': round(elapsed, 3),
+        'throughput_per_minute': round(submitted / elapsed * 60, 1)
+    }
+    if drained is not None:
+        metrics['picked_up_seconds'] = drained
+    return metrics
+
+
+def run_xml_processing(count, rate, timeout=120):
+    """
+    Write completion XML files at a fixed rate into a watched directory and
+    measure the delay until each one is stored
+
+    Args:
+        count: Files to write
+        rate: Files per second
+        timeout: Seconds to wait for the last file after writing ends
+
+    Returns:
+        dict: Metrics
+    """
+    from app.services.rightfax_simulator import render_completion
+    from app.services.xml_watcher import create_xml_observer
+
+    workdir = Path(tempfile.mkdtemp(prefix='rightfax-bench-'))
+    xml_directory = workdir / 'xml'
+    xml_directory.mkdir()
+    Config.XML_ARCHIVE_FOLDER = str(workdir / 'archive')
+
+    run_prefix = f"{JOB_ID_PREFIX}X{int(time.time())}"
+    written = {}
+    observer = create_xml_observer(str(xml_directory))
+
+    try:
+        start = time.monotonic()
+        for i in range(count):
+            now = datetime.now()
+            job = {
+                'unique_id': f"{run_prefix}{i:06d}",
+                'fax_handle': f"{i:08d}",
+                'to_number': '5550100',
+                'to_name': 'Benchmark',
+                'user_id': 'BENCH',
+                'billing_1': '',
+                'billing_2': '',
+                'channel': 1,
+                'created_at': now - timedelta(seconds=30),
+                'completed_at': now,
+                'duration_seconds': 30
+            }
+            xml, _ = render_completion(job, 'BENCH')
+
+            path = xml_directory / f"{job['unique_id']}_Fax Server.XML"
+            written[job['unique_id']] = time.time()
+            path.write_text(xml, encoding='ISO-8859-1')
+
+            delay = start + (i + 1) / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Wait for the watcher to store everything
+        deadline = time.monotonic() + timeout
+        db = SessionLocal()
+        try:
+            while time.monotonic() < deadline:
+                stored = db.query(func.count(FaxCompletion.id)).filter(
+                    FaxCompletion.rightfax_job_id.like(f"{run_prefix}%")
+                ).scalar()
+                db.rollback()
+                if stored >= count:
+                    break
+                time.sleep(0.2)
+
+            rows = db.query(FaxCompletion.rightfax_job_id, FaxCompletion.xml_parsed_at).filter(
+                FaxCompletion.rightfax_job_id.like(f"{run_prefix}%")
+            ).all()
+        finally:
+            db.close()
+
+    finally:
+        observer.stop()
+        observer.join()
+
+    latencies = [utc_timestamp(parsed_at) - written[job_id] for job_id, parsed_at in rows]
+    span = (max(utc_timestamp(parsed_at) for _, parsed_at in rows) - min(written.values())) if rows else 0
+
+    return {
+        'files': count,
+        'stored': len(rows),
+        'throughput_per_second': round(len(rows) / span, 2) if span > 0 else None,
+        **latency_summary(latencies, 'seconds')
+    }
+
+
+def seed_completions(rows, chunk_size=10000):
+    """
+    Ensure the database holds at least rows benchmark completions
+
+    Rows are added to the completion rollups in the same transaction, as
+    XMLParser.store_completions does, so the dashboard queries read the
+    same tables they read in production.
+
+    Returns:
+        int: Rows inserted by this call
+    """
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(FaxCompletion.id)).filter(
+            FaxCompletion.rightfax_job_id.like(f"{QUERY_JOB_ID_PREFIX}%")
+        ).scalar()
+
+        now = datetime.utcnow()
+        accounts = ['API', 'TESTACCOUNT', 'BENCH']
+        inserted = 0
+
+        for offset in range(existing, rows, chunk_size):
+            batch = []
+            for i in range(offset, min(offset + chunk_size, rows)):
+                completed_at = now - timedelta(seconds=random.randint(0, 30 * 86400))
+                duration = random.randint(20, 120)
+                success = random.random() < 0.95
+                batch.append({
+                    'rightfax_job_id': f"{QUERY_JOB_ID_PREFIX}{i:09d}",
+                    'submitted_at': completed_at - timedelta(seconds=duration),
+                    'completed_at': completed_at,
+                    'duration_seconds': duration,
+                    'success': success,
+                    'error_code': None if success else '3',
+                    'recipient_phone': '5550100',
+                    'pages_transmitted': random.randint(1, 3),
+                    'account_name': random.choice(accounts),
+                    'xml_filename': f"{QUERY_JOB_ID_PREFIX}{i:09d}_Fax Server.XML",
+                    'xml_parsed_at': completed_at
+                })
+            db.execute(insert(FaxCompletion), batch)
+            apply_rollups(db, batch)
+            db.commit()
+            inserted += len(batch)
+            logger.info(f"Seeded {offset + len(batch)}/{rows} completions")
+
+        return inserted
+    finally:
+        db.close()
+
+
+def run_api_queries(rows, repeat):
+    """
+    Time the dashboard API endpoints with rows completions in the database
+
+    Args:
+        rows: Completions to seed
+        repeat: Timed requests per endpoint
+
+    Returns:
+        dict: Metrics
+    """
+    from app.main import app
+
+    seeded = seed_completions(rows)
+    client = app.test_client()
+
+    # Time the queries themselves, not the shared stats cache
+    Config.API_STATS_CACHE_SECONDS = 0
+
+    endpoints = {
+        'stats': '/api/stats',
+        'completions': '/api/completions?limit=100',
+        'batches': '/api/batches?limit=50'
+    }
+
+    metrics = {'rows': rows, 'seeded': seeded}
+    all_latencies = []
+
+    for name, url in endpoints.items():
+        client.get(url)  # warm up
+
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+        all_latencies.extend(latencies)
+        summary = latency_summary(latencies, 'ms', digits=1)
+        metrics[f"{name}_p50_ms"] = summary['latency_p50_ms']
+        metrics[f"{name}_p95_ms"] = summary['latency_p95_ms']
+
+    metrics.update(latency_summary(all_latencies, 'ms', digits=1))
+    return metrics
+
+
+def cleanup(keep_query_rows=False):
+    """
+    Delete rows created by the benchmarks
+
+    The completion rollups of the days the deleted completions fell on are
+    rebuilt afterwards, so the benchmark leaves no counts behind.
+
+    Args:
+        keep_query_rows: Keep the seeded completions for the next run
+    """
+    db = SessionLocal()
+    try:
+        def benchmark_rows(query, model):
+            query = query.filter(model.rightfax_job_id.like(f"{JOB_ID_PREFIX}%"))
+            if keep_query_rows:
+                query = query.filter(~model.rightfax_job_id.like(f"{QUERY_JOB_ID_PREFIX}%"))
+            return query
+
+        first, last = benchmark_rows(
+            db.query(func.min(FaxCompletion.completed_at), func.max(FaxCompletion.completed_at)), FaxCompletion
+        ).one()
+
+        for model in (FaxJobStage, FaxCompletionXML, FaxCompletion):
+            benchmark_rows(db.query(model), model).delete(synchronize_session=False)
+
+        batch_ids = [row.id for row in db.query(SubmissionBatch.id).filter(
+            SubmissionBatch.batch_name.like(f"{BATCH_NAME_PREFIX}%"))]
+        if batch_ids:
+            db.query(FaxSubmission).filter(FaxSubmission.batch_id.in_(batch_ids)).delete(synchronize_session=False)
+            db.query(BatchCheckpoint).filter(BatchCheckpoint.batch_id.in_(batch_ids)).delete(synchronize_session=False)
+            db.query(SubmissionBatch).filter(SubmissionBatch.id.in_(batch_ids)).delete(synchronize_session=False)
+
+        db.commit()
+
+        if first is not None:
+            rebuild_rollups(db, first, last)
+    finally:
+        db.close()
+
+
+SCENARIOS = ('api_submission', 'fcl_submission', 'xml_processing', 'api_queries')
+
+
+def run_scenario(name, args):
+    """Run one scenario with the CLI arguments"""
+    if name == 'api_submission':
+        return run_submission('API', args.count, args.api_concurrency, args.api_latency)
+    if name == 'fcl_submission':
+        return run_submission('FCL', args.count)
+    if name == 'xml_processing':
+        return run_xml_processing(args.xml_files, args.xml_rate)
+    if name == 'api_queries':
+        return run_api_queries(args.rows, args.repeat)
+    raise ValueError(f"Unknown scenario {name}")
+
+
+def scenario_params(name, args):
+    """Parameters that must match for two runs of a scenario to be comparable"""
+    return {
+        'api_submission': {'count': args.count, 'api_concurrency': args.api_concurrency,
+                           'api_latency': args.api_latency},
+        'fcl_submission': {'count': args.count},
+        'xml_processing': {'xml_files': args.xml_files, 'xml_rate': args.xml_rate},
+        'api_queries': {'rows': args.rows, 'repeat': args.repeat},
+    }[name]
+
+
+def environment():
+    """Describe where the benchmark ran"""
+    from app.database import engine
+    return {
+        'database': engine.dialect.name,
+        'cpu_count': os.cpu_count(),
+        'host': os.uname().nodename if hasattr(os, 'uname') else None
+    }
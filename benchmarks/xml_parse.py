@@ -0,0 +1,102 @@
+"""
+XML Parse Micro-benchmark
+Per-file cost of turning a completion XML into completion data, comparing
+the original path (parse the file, read it again for raw_xml) with the
+single-read path, and with a streaming iterparse of the same buffer
+
+Usage:
+    python -m benchmarks.xml_parse
+    python -m benchmarks.xml_parse --file "samples/API6916A8558FEC_Fax Server.XML" --iterations 20000
+"""
+import sys
+import argparse
+import logging
+import timeit
+from io import BytesIO
+from lxml import etree
+from benchmarks.harness import BENCHMARK_DIR
+
+SAMPLE_FILE = BENCHMARK_DIR.parent / 'samples' / 'API6916A8558FEC_Fax Server.XML'
+
+
+def legacy_read(parser, xml_filepath):
+    """The original path: etree.parse, a second read for raw_xml, and a .//IndexField walk"""
+    root = etree.parse(xml_filepath).getroot()
+
+    with open(xml_filepath, 'rb') as f:
+        raw_xml = f.read()
+
+    index_fields = {}
+    for field in root.findall('.//IndexField'):
+        name = field.get('Name')
+        value = field.get('Value')
+        if name and value:
+            index_fields[name] = value
+
+    return parser._extract_completion_data(index_fields, raw_xml, xml_filepath)
+
+
+def iterparse_read(parser, xml_filepath):
+    """Single read, streaming iterparse of only the IndexField elements"""
+    with open(xml_filepath, 'rb') as f:
+        content = f.read()
+
+    index_fields = {}
+    for _, element in etree.iterparse(BytesIO(content), events=('end',), tag=('IndexField', 'IndexFields')):
+        if element.tag == 'IndexFields':
+            break
+        name = element.get('Name')
+        value = element.get('Value')
+        if name and value:
+            index_fields[name] = value
+        element.clear()
+
+    return parser._extract_completion_data(index_fields, content, xml_filepath)
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(prog='python -m benchmarks.xml_parse',
+                                        description='Per-file XML parse cost before and after the single-read path')
+    argparser.add_argument('--file', default=str(SAMPLE_FILE), help='Completion XML file to parse')
+    argparser.add_argument('--iterations', type=int, default=10000, help='Parses per measurement')
+    argparser.add_argument('--repeat', type=int, default=5, help='Measurements; the fastest is reported')
+    args = argparser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.services.xml_parser import XMLParser
+
+    parser = XMLParser(None)
+    xml_filepath = args.file
+
+    paths = {
+        'before (parse file + re-read for raw_xml)': lambda: legacy_read(parser, xml_filepath),
+        'after (single read, parse buffer)': lambda: parser.parse_xml_file(xml_filepath, with_history=False),
+        'single read, iterparse buffer': lambda: iterparse_read(parser, xml_filepath),
+    }
+
+    # Every path must produce the same completion data
+    expected = paths['after (single read, parse buffer)']()
+    for name, func in paths.items():
+        completion = func()
+        if completion != expected:
+            print(f"{name} produced different completion data:", file=sys.stderr)
+            for key in sorted(set(completion) | set(expected)):
+                if completion.get(key) != expected.get(key):
+                    print(f"  {key}: {completion.get(key)!r} != {expected.get(key)!r}", file=sys.stderr)
+            return 1
+
+    print(f"File: {xml_filepath}")
+    timings = {}
+    for name, func in paths.items():
+        best = min(timeit.repeat(func, number=args.iterations, repeat=args.repeat))
+        timings[name] = best / args.iterations * 1e6
+        print(f"{name:45} {timings[name]:8.1f} us/file")
+
+    before, after = list(timings.values())[:2]
+    print(f"speedup: {before / after:.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
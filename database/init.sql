@@ -14,22 +14,48 @@ CREATE TABLE IF NOT EXISTS submission_batches (
     created_by VARCHAR(100),
     total_count INTEGER NOT NULL,
     submission_method VARCHAR(10) NOT NULL CHECK (submission_method IN ('FCL', 'API')),
-    timing_type VARCHAR(20) NOT NULL CHECK (timing_type IN ('immediate', 'interval')),
+    timing_type VARCHAR(20) NOT NULL CHECK (timing_type IN ('immediate', 'interval', 'profile')),
     interval_seconds INTEGER,
+    load_profile TEXT,
+    execution_mode VARCHAR(10) NOT NULL DEFAULT 'serial' CHECK (execution_mode IN ('serial', 'fanout')),
+    api_concurrency INTEGER,
     recipient_phone VARCHAR(50) NOT NULL,
     recipient_name VARCHAR(255),
     account_name VARCHAR(100) NOT NULL,
     attachment_filename VARCHAR(255),
-    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'in_progress', 'completed', 'cancelled', 'failed')),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'in_progress', 'paused', 'completed', 'cancelled', 'failed')),
     submitted_count INTEGER DEFAULT 0,
+    failed_count INTEGER DEFAULT 0,
+    started_at TIMESTAMP,
     completed_at TIMESTAMP,
     notes TEXT
 );
 
+-- Table: batch_checkpoints
+-- Stores the resume position of each chunk of a batch, range(chunk_start, chunk_stop, chunk_step)
+CREATE TABLE IF NOT EXISTS batch_checkpoints (
+    id SERIAL PRIMARY KEY,
+    batch_id INTEGER NOT NULL REFERENCES submission_batches(id) ON DELETE CASCADE,
+    chunk_start INTEGER NOT NULL,
+    chunk_stop INTEGER NOT NULL,
+    chunk_step INTEGER NOT NULL DEFAULT 1,
+    next_index INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'in_progress', 'completed', 'failed')),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Time-partitioned tables: fax_submissions, fax_completions and the completion
+-- side tables are range-partitioned by submission/completion time. Partitions
+-- (daily or monthly, PARTITION_INTERVAL) are created ahead of time by
+-- app.services.partitions, and retention (DB_RETENTION_DAYS) drops whole
+-- partitions. Primary and unique keys include the partition key, so foreign
+-- keys between these tables are not enforced. The DEFAULT partitions catch
+-- rows for which no partition exists yet.
+
 -- Table: fax_submissions
 -- Stores individual fax submission records within batches
 CREATE TABLE IF NOT EXISTS fax_submissions (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     batch_id INTEGER REFERENCES submission_batches(id) ON DELETE CASCADE,
     submitted_at TIMESTAMP NOT NULL DEFAULT NOW(),
     submission_method VARCHAR(10) NOT NULL CHECK (submission_method IN ('FCL', 'API')),
@@ -38,17 +64,20 @@ CREATE TABLE IF NOT EXISTS fax_submissions (
     recipient_name VARCHAR(255),
     account_name VARCHAR(100) NOT NULL,
     fcl_filename VARCHAR(255),
+    correlation_token VARCHAR(50), -- FCL only; echoed by RightFax into the completion XML
     api_response_code INTEGER,
     submission_status VARCHAR(20) NOT NULL DEFAULT 'submitted' CHECK (submission_status IN ('submitted', 'failed', 'pending_retry')),
-    error_message TEXT
-);
+    error_message TEXT,
+    PRIMARY KEY (id, submitted_at)
+) PARTITION BY RANGE (submitted_at);
+CREATE TABLE IF NOT EXISTS fax_submissions_default PARTITION OF fax_submissions DEFAULT;
 
 -- Table: fax_completions
 -- Stores parsed data from RightFax XML completion files
 CREATE TABLE IF NOT EXISTS fax_completions (
-    id SERIAL PRIMARY KEY,
-    rightfax_job_id VARCHAR(100) UNIQUE NOT NULL,
-    submission_id INTEGER REFERENCES fax_submissions(id),
+    id SERIAL,
+    rightfax_job_id VARCHAR(100) NOT NULL,
+    submission_id INTEGER, -- fax_submissions.id
     submitted_at TIMESTAMP,
     completed_at TIMESTAMP NOT NULL,
     duration_seconds INTEGER,
@@ -61,7 +90,8 @@ CREATE TABLE IF NOT EXISTS fax_completions (
     call_attempts INTEGER,
     xml_filename VARCHAR(255),
     xml_parsed_at TIMESTAMP NOT NULL DEFAULT NOW(),
-    raw_xml TEXT,
+    correlation_token VARCHAR(50), -- from the XML billing field of FCL submissions
+    raw_xml TEXT, -- legacy; new rows keep their XML in fax_completion_xml
     -- Additional fields from XML
     fax_handle VARCHAR(50),
     fax_channel VARCHAR(10),
@@ -72,9 +102,75 @@ CREATE TABLE IF NOT EXISTS fax_completions (
     disposition INTEGER,
     term_stat INTEGER,
     good_page_count INTEGER,
-    bad_page_count INTEGER
+    bad_page_count INTEGER,
+    PRIMARY KEY (id, completed_at),
+    -- A re-read XML file repeats its completion time, so duplicates still conflict;
+    -- ingest also skips job IDs stored within XML_DEDUPE_WINDOW_DAYS
+    UNIQUE (rightfax_job_id, completed_at)
+) PARTITION BY RANGE (completed_at);
+CREATE TABLE IF NOT EXISTS fax_completions_default PARTITION OF fax_completions DEFAULT;
+
+-- Table: fax_completion_xml
+-- Stores the raw completion XML, zlib-compressed, apart from fax_completions
+-- so list and stats queries never read it (XML_RAW_RETENTION decides which jobs keep it)
+CREATE TABLE IF NOT EXISTS fax_completion_xml (
+    rightfax_job_id VARCHAR(100) NOT NULL, -- fax_completions.rightfax_job_id
+    completed_at TIMESTAMP NOT NULL, -- partition key, from fax_completions
+    compressed_xml BYTEA NOT NULL,
+    stored_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (rightfax_job_id, completed_at)
+) PARTITION BY RANGE (completed_at);
+CREATE TABLE IF NOT EXISTS fax_completion_xml_default PARTITION OF fax_completion_xml DEFAULT;
+
+-- Table: fax_job_stages
+-- Stores per-stage conversion and transmission timings parsed from each job's _History.TXT
+CREATE TABLE IF NOT EXISTS fax_job_stages (
+    id SERIAL,
+    rightfax_job_id VARCHAR(100) NOT NULL, -- fax_completions.rightfax_job_id
+    completed_at TIMESTAMP NOT NULL, -- partition key, from fax_completions
+    sequence INTEGER NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    event_time TIMESTAMP,
+    stage VARCHAR(100) NOT NULL,
+    attempt INTEGER,
+    result VARCHAR(255),
+    success BOOLEAN,
+    output_type VARCHAR(100),
+    duration_ms INTEGER,
+    server_name VARCHAR(100), -- work server for conversions, fax server for transmissions
+    channel INTEGER,
+    status_code VARCHAR(50),
+    PRIMARY KEY (id, completed_at)
+) PARTITION BY RANGE (completed_at);
+CREATE TABLE IF NOT EXISTS fax_job_stages_default PARTITION OF fax_job_stages DEFAULT;
+
+-- Tables: fax_completion_rollup_minute / _hour / _day
+-- Completion counters per time bucket, account, fax server and channel,
+-- updated with every ingested batch so dashboards never group raw completions
+-- (duration columns cover successful completions only)
+CREATE TABLE IF NOT EXISTS fax_completion_rollup_minute (
+    bucket_start TIMESTAMP NOT NULL,
+    account_name VARCHAR(100) NOT NULL DEFAULT '',
+    fax_server VARCHAR(100) NOT NULL DEFAULT '',
+    fax_channel VARCHAR(10) NOT NULL DEFAULT '',
+    completions INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    duration_count INTEGER NOT NULL DEFAULT 0, -- successful calls with a duration
+    duration_sum INTEGER NOT NULL DEFAULT 0,
+    duration_min INTEGER,
+    duration_max INTEGER,
+    duration_le_30 INTEGER NOT NULL DEFAULT 0, -- histogram, non-cumulative, seconds
+    duration_le_60 INTEGER NOT NULL DEFAULT 0,
+    duration_le_120 INTEGER NOT NULL DEFAULT 0,
+    duration_le_300 INTEGER NOT NULL DEFAULT 0,
+    duration_gt_300 INTEGER NOT NULL DEFAULT 0,
+    pages_transmitted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, account_name, fax_server, fax_channel)
 );
 
+CREATE TABLE IF NOT EXISTS fax_completion_rollup_hour (LIKE fax_completion_rollup_minute INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS fax_completion_rollup_day (LIKE fax_completion_rollup_minute INCLUDING ALL);
+
 -- Table: system_config
 -- Stores application configuration
 CREATE TABLE IF NOT EXISTS system_config (
@@ -97,6 +193,8 @@ CREATE TABLE IF NOT EXISTS rightfax_accounts (
 );
 
 -- Create indexes for performance
+CREATE INDEX IF NOT EXISTS idx_checkpoints_batch ON batch_checkpoints(batch_id);
+
 CREATE INDEX IF NOT EXISTS idx_submissions_batch ON fax_submissions(batch_id);
 CREATE INDEX IF NOT EXISTS idx_submissions_job_id ON fax_submissions(rightfax_job_id);
 CREATE INDEX IF NOT EXISTS idx_submissions_timestamp ON fax_submissions(submitted_at);
@@ -109,9 +207,44 @@ CREATE INDEX IF NOT EXISTS idx_completions_time_range ON fax_completions(complet
 CREATE INDEX IF NOT EXISTS idx_completions_account_time ON fax_completions(account_name, completed_at DESC);
 CREATE INDEX IF NOT EXISTS idx_completions_duration ON fax_completions(duration_seconds) WHERE success = true;
 
+CREATE INDEX IF NOT EXISTS idx_job_stages_job_id ON fax_job_stages(rightfax_job_id);
+CREATE INDEX IF NOT EXISTS idx_job_stages_event_time ON fax_job_stages(event_time);
+CREATE INDEX IF NOT EXISTS idx_job_stages_stage_server ON fax_job_stages(stage, server_name);
+
 CREATE INDEX IF NOT EXISTS idx_submissions_job_lookup ON fax_submissions(rightfax_job_id, batch_id);
+
+-- FCL correlation: submissions are linked to completions by token, and the
+-- partial indexes keep the bulk reconciliation to rows still waiting for a link
+ALTER TABLE fax_submissions ADD COLUMN IF NOT EXISTS correlation_token VARCHAR(50);
+ALTER TABLE fax_completions ADD COLUMN IF NOT EXISTS correlation_token VARCHAR(50);
+CREATE INDEX IF NOT EXISTS idx_submissions_correlation ON fax_submissions(correlation_token);
+CREATE INDEX IF NOT EXISTS idx_submissions_unlinked ON fax_submissions(id)
+    WHERE rightfax_job_id IS NULL AND correlation_token IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_completions_unlinked ON fax_completions(correlation_token)
+    WHERE submission_id IS NULL AND correlation_token IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_batches_status_time ON submission_batches(status, created_at DESC);
 
+-- Databases created before partitioning keep their plain tables; the side
+-- tables still need the completion time written with every row
+ALTER TABLE fax_completion_xml ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP;
+ALTER TABLE fax_job_stages ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP;
+
+-- Databases created before execution modes, load profiles, the async API
+-- engine and pause/resume get the newer batch columns with the model
+-- defaults, and the widened timing_type and status checks
+ALTER TABLE submission_batches ADD COLUMN IF NOT EXISTS execution_mode VARCHAR(10) NOT NULL DEFAULT 'serial'
+    CHECK (execution_mode IN ('serial', 'fanout'));
+ALTER TABLE submission_batches ADD COLUMN IF NOT EXISTS load_profile TEXT;
+ALTER TABLE submission_batches ADD COLUMN IF NOT EXISTS started_at TIMESTAMP;
+ALTER TABLE submission_batches ADD COLUMN IF NOT EXISTS api_concurrency INTEGER;
+ALTER TABLE submission_batches ADD COLUMN IF NOT EXISTS failed_count INTEGER DEFAULT 0;
+ALTER TABLE submission_batches DROP CONSTRAINT IF EXISTS submission_batches_timing_type_check;
+ALTER TABLE submission_batches ADD CONSTRAINT submission_batches_timing_type_check
+    CHECK (timing_type IN ('immediate', 'interval', 'profile'));
+ALTER TABLE submission_batches DROP CONSTRAINT IF EXISTS submission_batches_status_check;
+ALTER TABLE submission_batches ADD CONSTRAINT submission_batches_status_check
+    CHECK (status IN ('pending', 'in_progress', 'paused', 'completed', 'cancelled', 'failed'));
+
 -- Insert default configuration values
 INSERT INTO system_config (config_key, config_value, description) VALUES
     ('rightfax_api_url', '', 'RightFax REST API base URL'),
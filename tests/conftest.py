@@ -0,0 +1,24 @@
+"""
+Shared fixtures: a throwaway SQLite database built from the models
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import Config
+from app.database import Base
+import app.models  # noqa: F401  register models
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Session on an empty SQLite database; archives go to a temporary folder"""
+    monkeypatch.setattr(Config, 'XML_ARCHIVE_FOLDER', str(tmp_path / 'archive'))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
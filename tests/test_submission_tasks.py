@@ -0,0 +1,89 @@
+"""
+Tests for batch chunk planning, checkpoint claims and time-bounded submission runs
+"""
+import pytest
+from flask import Flask
+from sqlalchemy.orm import sessionmaker
+from app.config import Config
+from app.models import SubmissionBatch, BatchCheckpoint
+from app.routes import api
+from app.services.submission_writer import SubmissionWriter
+from app.tasks.submission_tasks import plan_batch_chunks, claim_checkpoint
+
+
+def _batch(total, timing_type):
+    return SubmissionBatch(total_count=total, timing_type=timing_type, execution_mode='fanout')
+
+
+@pytest.fixture(autouse=True)
+def chunking(monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_CHUNK_SIZE', 100)
+    monkeypatch.setattr(Config, 'PACED_FANOUT_SLOTS', 4)
+
+
+def test_immediate_fanout_uses_contiguous_chunks():
+    chunks = plan_batch_chunks(_batch(1000, 'immediate'))
+
+    assert len(chunks) == 10
+    assert chunks[0] == (0, 100, 1)
+
+
+@pytest.mark.parametrize('total, expected', [(250, 3), (1000, 4)])
+def test_paced_fanout_is_capped_at_worker_slots(total, expected):
+    chunks = plan_batch_chunks(_batch(total, 'interval'))
+
+    assert len(chunks) == expected
+    # The strided ranges still cover every index exactly once
+    indexes = sorted(i for start, stop, step in chunks for i in range(start, stop, step))
+    assert indexes == list(range(total))
+
+
+def test_writer_stops_at_deadline():
+    now = [0.0]
+    writer = SubmissionWriter(None, 1, flush_interval=60, clock=lambda: now[0], deadline=10)
+
+    assert not writer.stopped
+    now[0] = 10
+    assert writer.stopped
+    assert writer.stop_requested()
+
+
+def _paused_batch(db):
+    batch = SubmissionBatch(total_count=10, submission_method='API', timing_type='immediate',
+                            recipient_phone='5550100', account_name='loadtest', status='paused')
+    batch.checkpoints = [BatchCheckpoint(chunk_start=0, chunk_stop=10, chunk_step=1, next_index=4)]
+    db.add(batch)
+    db.commit()
+    return batch
+
+
+def test_checkpoint_is_claimed_once(db):
+    checkpoint = _paused_batch(db).checkpoints[0]
+
+    assert claim_checkpoint(db, checkpoint)
+    db.commit()
+    assert not claim_checkpoint(db, checkpoint)
+
+
+def test_resume_queues_one_task(db, monkeypatch):
+    batch_id = _paused_batch(db).id
+    queued = []
+
+    class FakeTask:
+        def delay(self, *args, **kwargs):
+            queued.append((args, kwargs))
+            return type('Result', (), {'id': 'task-1'})()
+
+    monkeypatch.setattr(api, 'SessionLocal', sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(api, 'get_celery', FakeTask)
+    app = Flask(__name__)
+    app.register_blueprint(api.bp)
+    client = app.test_client()
+
+    first = client.post(f'/api/batches/{batch_id}/resume')
+    second = client.post(f'/api/batches/{batch_id}/resume')
+
+    assert first.status_code == 200
+    assert first.get_json()['remaining'] == 6
+    assert second.status_code == 400
+    assert queued == [((batch_id,), {'resume': True})]
@@ -0,0 +1,56 @@
+"""
+Tests for XMLParser storage maintenance
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.config import Config
+from app.models import FaxCompletion, FaxCompletionXML
+from app.services.xml_parser import XMLParser
+
+COMPLETED_AT = datetime(2025, 11, 14, 12, 0)
+
+
+def _completion(job_id, success, raw_xml=None, offset=0):
+    return FaxCompletion(
+        rightfax_job_id=job_id,
+        completed_at=COMPLETED_AT + timedelta(minutes=offset),
+        success=success,
+        raw_xml=raw_xml
+    )
+
+
+def _stored_xml(job_id, offset=0):
+    return FaxCompletionXML(
+        rightfax_job_id=job_id,
+        completed_at=COMPLETED_AT + timedelta(minutes=offset),
+        compressed_xml=FaxCompletionXML.compress(f"<xml>{job_id}</xml>".encode('ISO-8859-1'))
+    )
+
+
+@pytest.mark.parametrize('retention, kept', [
+    ('all', {'LEGACY_OK', 'LEGACY_FAILED', 'STORED_OK', 'STORED_FAILED'}),
+    ('failed', {'LEGACY_FAILED', 'STORED_FAILED'}),
+    ('none', set()),
+])
+def test_compact_raw_xml_applies_retention(db, monkeypatch, retention, kept):
+    """Legacy XML is moved or dropped, and stored XML is pruned, per XML_RAW_RETENTION"""
+    monkeypatch.setattr(Config, 'XML_RAW_RETENTION', retention)
+    db.add_all([
+        _completion('LEGACY_OK', True, raw_xml='<xml>ok</xml>', offset=1),
+        _completion('LEGACY_FAILED', False, raw_xml='<xml>failed</xml>', offset=2),
+        _completion('STORED_OK', True, offset=3),
+        _completion('STORED_FAILED', False, offset=4),
+        _stored_xml('STORED_OK', offset=3),
+        _stored_xml('STORED_FAILED', offset=4),
+    ])
+    db.commit()
+
+    result = XMLParser(db).compact_raw_xml(chunk_size=1)
+
+    stored = {row.rightfax_job_id for row in db.query(FaxCompletionXML)}
+    assert stored == kept
+    assert db.query(FaxCompletion).filter(FaxCompletion.raw_xml.isnot(None)).count() == 0
+    assert result['moved'] == len(kept & {'LEGACY_OK', 'LEGACY_FAILED'})
+    assert result['dropped'] == 2 - result['moved']
+    assert result['deleted'] == len({'STORED_OK', 'STORED_FAILED'} - kept)
+